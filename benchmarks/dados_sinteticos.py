@@ -0,0 +1,115 @@
+"""
+Gerador de históricos sintéticos de cotações e dividendos para os benchmarks.
+
+Os DataFrames saem direto no esquema canônico (src.esquema), com preços em passeio
+aleatório geométrico e um dividendo por mês, como os FIIs da carteira.
+"""
+import string
+import numpy as np
+import pandas as pd
+from src.esquema import validar
+
+PREGOES_POR_ANO = 252
+
+# Pregão da B3 em UTC (das 10h às 17h no horário de Brasília)
+ABERTURA_UTC_SEGUNDOS = 13 * 3600
+DURACAO_PREGAO_SEGUNDOS = 7 * 3600
+
+
+def tickers_sinteticos(quantidade):
+    """Tickers fictícios no formato dos FIIs da B3 (AAAA11.SA, AAAB11.SA, ...), já em ordem."""
+    letras = string.ascii_uppercase
+    return [''.join(letras[(i // 26 ** p) % 26] for p in (3, 2, 1, 0)) + '11.SA' for i in range(quantidade)]
+
+
+def gerar_historico(quantidade_tickers=10, anos=2, semente=0, fim=None):
+    """
+    Gera cotações diárias e dividendos mensais para 'quantidade_tickers' ativos.
+
+    Args:
+        quantidade_tickers (int): Número de ativos (ex.: 10 a 5000).
+        anos (float): Anos de histórico (PREGOES_POR_ANO pregões por ano).
+        semente (int): Semente do gerador aleatório, para execuções reprodutíveis.
+        fim (str | pd.Timestamp, optional): Último pregão; padrão é hoje.
+
+    Returns:
+        tuple: (df_cotacoes, df_dividendos) no esquema canônico.
+    """
+    rng = np.random.default_rng(semente)
+    fim = pd.Timestamp(fim if fim is not None else pd.Timestamp.today()).normalize()
+    datas = pd.bdate_range(end=fim, periods=int(anos * PREGOES_POR_ANO)).to_numpy(dtype='datetime64[ns]')
+    tickers = tickers_sinteticos(quantidade_tickers)
+    n_tickers, n_datas = len(tickers), len(datas)
+
+    # Passeio aleatório geométrico a partir de um preço inicial por ativo
+    iniciais = rng.uniform(5, 150, size=(n_tickers, 1))
+    retornos = rng.normal(0.0002, 0.012, size=(n_tickers, n_datas))
+    precos = (iniciais * np.exp(np.cumsum(retornos, axis=1))).round(2).astype('float32')
+
+    codigos = np.repeat(np.arange(n_tickers), n_datas)
+    df_cotacoes = pd.DataFrame({
+        'date': np.tile(datas, n_tickers),
+        'ticker': pd.Categorical.from_codes(codigos, categories=tickers),
+        'valor_cotação': precos.ravel(),
+    })
+
+    # Um dividendo no primeiro pregão de cada mês, entre 0,6% e 1,1% do preço do dia
+    meses = datas.astype('datetime64[M]')
+    primeiros = np.flatnonzero(np.r_[True, meses[1:] != meses[:-1]])
+    rendimentos = rng.uniform(0.006, 0.011, size=(n_tickers, len(primeiros)))
+    dividendos = (precos[:, primeiros] * rendimentos).round(4).astype('float32')
+
+    df_dividendos = pd.DataFrame({
+        'date': np.tile(datas[primeiros], n_tickers),
+        'ticker': pd.Categorical.from_codes(np.repeat(np.arange(n_tickers), len(primeiros)), categories=tickers),
+        'dividendo': dividendos.ravel(),
+    })
+    return validar(df_cotacoes, 'cotacoes'), validar(df_dividendos, 'dividendos')
+
+
+def precos_medios_sinteticos(df_cotacoes, semente=0):
+    """Preço médio fictício por ativo: a cotação mais recente com ±20% de variação."""
+    rng = np.random.default_rng(semente)
+    ultimos = df_cotacoes.groupby('ticker', observed=True)['valor_cotação'].last()
+    fatores = rng.uniform(0.8, 1.2, size=len(ultimos))
+    return {str(ticker): round(float(valor * fator), 2) for (ticker, valor), fator in zip(ultimos.items(), fatores)}
+
+
+def gerar_barras(dias, fechamentos, segundos, semente=0):
+    """
+    Barras intradiárias OHLCV de um ativo: em cada pregão, uma ponte browniana que sai
+    do fechamento anterior e chega ao fechamento do dia.
+
+    Args:
+        dias (np.ndarray): Pregões, em epoch (segundos) da meia-noite UTC.
+        fechamentos (np.ndarray): Fechamento de cada pregão.
+        segundos (int): Duração de cada barra (ex.: 300 para 5m).
+        semente (int): Semente do gerador aleatório.
+
+    Returns:
+        dict: tempo (int64, epoch) e abertura, maxima, minima, fechamento e volume (float32),
+              no formato de dados_online._extrair_barras.
+    """
+    rng = np.random.default_rng(semente)
+    por_dia = DURACAO_PREGAO_SEGUNDOS // segundos
+    fechamentos = np.asarray(fechamentos, dtype='float64')
+    anteriores = np.log(np.r_[fechamentos[:1], fechamentos[:-1]])[:, None]
+    finais = np.log(fechamentos)[:, None]
+
+    # Passeio de cada dia, forçado a terminar no fechamento (ponte)
+    fracao = np.arange(1, por_dia + 1) / por_dia
+    passeio = np.cumsum(rng.normal(0, 0.002, size=(len(fechamentos), por_dia)), axis=1)
+    passeio -= passeio[:, -1:] * fracao
+    precos = np.exp(anteriores + (finais - anteriores) * fracao + passeio)
+    aberturas = np.concatenate([np.exp(anteriores), precos[:, :-1]], axis=1)
+    folgas = np.abs(rng.normal(0, 0.001, size=(2,) + precos.shape))
+
+    return {
+        'tempo': (np.asarray(dias, dtype='int64')[:, None] + ABERTURA_UTC_SEGUNDOS
+                  + np.arange(por_dia) * segundos).ravel(),
+        'abertura': aberturas.ravel().astype('float32'),
+        'maxima': (np.maximum(aberturas, precos) * (1 + folgas[0])).ravel().astype('float32'),
+        'minima': (np.minimum(aberturas, precos) * (1 - folgas[1])).ravel().astype('float32'),
+        'fechamento': precos.ravel().astype('float32'),
+        'volume': rng.integers(100, 5000, size=precos.size).astype('float32'),
+    }
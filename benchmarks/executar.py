@@ -0,0 +1,391 @@
+"""
+Benchmarks do projeto: busca online, carga de dados, tabela e gráficos.
+
+Mede tempo de execução, pico de memória (tracemalloc) e requisições por segundo para
+históricos sintéticos de vários tamanhos, servidos por benchmarks.servidor_falso, e grava
+os resultados em JSON para comparar execuções ao longo do tempo.
+
+Uso, a partir da raiz do projeto:
+    python -m benchmarks.executar                              # 10 e 100 tickers
+    python -m benchmarks.executar --tickers 10 1000 5000 --anos 5 --latencia-ms 50
+    python -m benchmarks.executar --sem-rede                   # só tabela e gráficos
+    python -m benchmarks.executar --comparar benchmarks/resultados/anterior.json
+"""
+import os
+import io
+import sys
+import json
+import shutil
+import logging
+import platform
+import argparse
+import warnings
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+from time import perf_counter
+from datetime import datetime
+from contextlib import contextmanager, redirect_stdout
+import numpy as np
+import pandas as pd
+from benchmarks.dados_sinteticos import gerar_historico, gerar_barras, precos_medios_sinteticos
+from benchmarks.servidor_falso import ServidorFalso
+from src import (dados_online, cache_compartilhado, cache_respostas, primeira_tela, analise, simulacao, intradiario,
+                 avaliacao)
+from src.carrega_dados import carregar_dados
+from src.indice_series import SeriesPorTicker, indexar
+from src.tabela import calcular_dividendos_yields
+from src.grafico import gerar_grafico, gerar_grafico_dividendos
+
+PASTA_RESULTADOS = os.path.join('benchmarks', 'resultados')
+
+# Tickers usados nos casos de gráfico (um gráfico por ticker)
+AMOSTRA_GRAFICOS = 50
+
+# Orçamento de pontos igual ao da interface
+MAX_PONTOS_GRAFICO = primeira_tela.MAX_PONTOS_GRAFICO
+
+# Importações da interface até a prévia da primeira tela e depois dela (carga, tabela e gráficos)
+IMPORTACOES_PRIMEIRA_TELA = 'import streamlit, src.ativos_precos, src.metricas, src.primeira_tela'
+IMPORTACOES_INTERFACE = (IMPORTACOES_PRIMEIRA_TELA + ', pandas, src.cache_figuras, src.tabela, src.carrega_dados, '
+                         'src.indice_series, src.historico_local')
+
+
+def _silenciar_avisos():
+    # Avisos de bibliotecas que não dizem respeito às medições: o FutureWarning do plotly
+    # ao converter datas do pandas e os do Streamlit por rodar fora de 'streamlit run'
+    warnings.filterwarnings('ignore', category=FutureWarning, module=r'_plotly_utils\.')
+    avisos_streamlit = ('missing ScriptRunContext', 'streamlit run')
+    for nome in ('streamlit', 'streamlit.runtime.scriptrunner_utils.script_run_context'):
+        # Filtro em vez de nível: o Streamlit redefine o nível dos seus loggers ao configurar-se
+        logging.getLogger(nome).addFilter(
+            lambda registro: not any(aviso in registro.getMessage() for aviso in avisos_streamlit))
+
+
+@contextmanager
+def _silencioso():
+    # Os buscadores imprimem uma linha por ticker; nos benchmarks isso só atrapalha
+    with redirect_stdout(io.StringIO()):
+        yield
+
+
+def medir(funcao, repeticoes=1, memoria_na_mesma_execucao=False):
+    """
+    Executa 'funcao' 'repeticoes' vezes e mede o tempo de cada execução. O pico de
+    memória vem de uma execução extra sob tracemalloc (que deixaria o tempo mais lento),
+    ou da própria execução medida, quando ela é cara demais para repetir (busca online).
+
+    Returns:
+        dict: tempo_s (mediana), tempo_min_s e pico_memoria_mb.
+    """
+    tempos = []
+    pico = None
+    for _ in range(repeticoes):
+        if memoria_na_mesma_execucao:
+            tracemalloc.start()
+        inicio = perf_counter()
+        with _silencioso():
+            funcao()
+        tempos.append(perf_counter() - inicio)
+        if memoria_na_mesma_execucao:
+            pico = max(pico or 0, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+    if pico is None:
+        tracemalloc.start()
+        with _silencioso():
+            funcao()
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        'tempo_s': round(statistics.median(tempos), 6),
+        'tempo_min_s': round(min(tempos), 6),
+        'pico_memoria_mb': round(pico / 1024 ** 2, 3),
+    }
+
+
+def _limpar_caches():
+    # Cada caso de rede começa frio: sem histórico, sem cache de respostas e disjuntores fechados
+    shutil.rmtree('data', ignore_errors=True)
+    with cache_compartilhado._lock:
+        cache_compartilhado._memoria.clear()
+    with dados_online._lock_disjuntores:
+        dados_online._disjuntores.clear()
+    with cache_respostas._lock:
+        cache_respostas._ocupado.clear()
+
+
+def casos_de_rede(servidor, args):
+    """
+    Buscadores online e carregar_dados contra o servidor falso. Os buscadores usam os
+    limites de --requisicoes-por-segundo/--max-simultaneas; carregar_dados usa os limites
+    padrão do aplicativo (dados_online.REQUISICOES_POR_SEGUNDO), como em produção.
+    """
+    tickers = servidor.tickers
+    limites = dict(requisicoes_por_segundo=args.requisicoes_por_segundo, max_simultaneas=args.max_simultaneas)
+    casos = {
+        'buscar_dados_cotacoes_yahoo': lambda: dados_online.buscar_dados_cotacoes_yahoo(tickers, **limites),
+        'buscar_dividendos_yahoo': lambda: dados_online.buscar_dividendos_yahoo(tickers, **limites),
+        'buscar_cotacoes_e_dividendos_yahoo': lambda: dados_online.buscar_cotacoes_e_dividendos_yahoo(tickers, **limites),
+        'carregar_dados (sem cache)': lambda: carregar_dados(tickers),
+    }
+
+    resultados = []
+    for nome, funcao in casos.items():
+        _limpar_caches()
+        servidor.zerar_contadores()
+        resultado = medir(funcao, memoria_na_mesma_execucao=True)
+        resultado.update({
+            'caso': nome,
+            'requisicoes': servidor.requisicoes,
+            'erros_http': servidor.erros,
+            'bytes_recebidos': servidor.bytes_enviados,
+            'requisicoes_por_s': round(servidor.requisicoes / resultado['tempo_s'], 2),
+        })
+        resultados.append(resultado)
+
+        if nome.startswith('carregar_dados'):
+            # Segunda chamada: mesma chave, atendida pelo cache compartilhado
+            servidor.zerar_contadores()
+            resultado = medir(funcao, args.repeticoes)
+            resultado.update({'caso': 'carregar_dados (cache)', 'requisicoes': servidor.requisicoes})
+            resultados.append(resultado)
+
+    # Cache de respostas em disco (desligado nos casos acima): respostas válidas, atendidas
+    # sem requisição, e vencidas, revalidadas por ETag (HTTP 304, sem corpo)
+    buscar = casos['buscar_cotacoes_e_dividendos_yahoo']
+    _limpar_caches()
+    dados_online.USAR_CACHE_RESPOSTAS = True
+    try:
+        with _silencioso():
+            buscar()
+        for nome, preparar in (('cache de respostas', lambda: None), ('revalidação 304', cache_respostas.expirar)):
+            preparar()
+            servidor.zerar_contadores()
+            resultado = medir(buscar, memoria_na_mesma_execucao=True)
+            resultado.update({
+                'caso': f'buscar_cotacoes_e_dividendos_yahoo ({nome})',
+                'requisicoes': servidor.requisicoes,
+                'nao_modificadas': servidor.nao_modificadas,
+                'bytes_recebidos': servidor.bytes_enviados,
+                'requisicoes_por_s': round(servidor.requisicoes / resultado['tempo_s'], 2),
+            })
+            resultados.append(resultado)
+    finally:
+        dados_online.USAR_CACHE_RESPOSTAS = False
+    return resultados
+
+
+def casos_de_inicializacao(args, pasta_projeto):
+    """
+    Tempo de um processo Python novo até importar os módulos da interface: só os usados
+    pela prévia da primeira tela e todos. O interpretador vazio serve de referência.
+    """
+    casos = {
+        'processo novo (referência)': 'pass',
+        'importações até a primeira tela': IMPORTACOES_PRIMEIRA_TELA,
+        'importações da interface (todas)': IMPORTACOES_INTERFACE,
+    }
+    resultados = []
+    for nome, codigo in casos.items():
+        tempos = []
+        for _ in range(args.repeticoes):
+            inicio = perf_counter()
+            subprocess.run([sys.executable, '-c', codigo], cwd=pasta_projeto, check=True, capture_output=True)
+            tempos.append(perf_counter() - inicio)
+        resultados.append({
+            'caso': nome,
+            'tempo_s': round(statistics.median(tempos), 6),
+            'tempo_min_s': round(min(tempos), 6),
+            'pico_memoria_mb': None,
+        })
+    return resultados
+
+
+def casos_locais(df_cotacoes, df_dividendos, args):
+    """Indexação, tabela e gráficos sobre os DataFrames sintéticos (sem rede)."""
+    tickers = list(df_cotacoes['ticker'].cat.categories)
+    precos_medios = precos_medios_sinteticos(df_cotacoes)
+    amostra = tickers[:AMOSTRA_GRAFICOS]
+    indice_cotacoes = indexar(df_cotacoes, 'valor_cotação')
+    indice_dividendos = indexar(df_dividendos, 'dividendo')
+    mercado = simulacao.mercado_historico(indice_cotacoes, indice_dividendos, tickers)
+    reinvestir, aportes = simulacao.grade_de_cenarios(np.linspace(0, 1, 6), np.arange(0, 3500, 500))
+    quantidades = simulacao.posicoes_iniciais(mercado)
+    # Série longa: os 520 dias da interface, limitados ao histórico gerado (precisa de num_dias + 1 pregões)
+    dias_longos = min(520, len(indice_cotacoes.serie(tickers[0])[0]) - 1)
+    # Barras de 5m sintéticas do primeiro ativo nos mesmos pregões, gravadas em blocos diários
+    datas_barras, fechamentos_barras = indice_cotacoes.ultimos(tickers[0], dias_longos)
+    barras = intradiario.BarrasOHLCV(**gerar_barras(datas_barras.astype('datetime64[s]').astype('int64'),
+                                                    fechamentos_barras, 300), segundos=300)
+    intradiario.gravar_blocos(tickers[0], '5m', barras)
+    # Livro com duas compras por ativo (uma no início e outra no meio do histórico)
+    datas_historico = np.unique(indice_cotacoes.datas)
+    livro = avaliacao.Lancamentos(tickers, np.repeat(np.arange(len(tickers)), 2),
+                                  np.tile(datas_historico[[0, len(datas_historico) // 2]], len(tickers)),
+                                  np.full(2 * len(tickers), 100.0),
+                                  np.repeat([precos_medios[t] for t in tickers], 2))
+
+    casos = {
+        'indexar (SeriesPorTicker)': lambda: (SeriesPorTicker(df_cotacoes, 'valor_cotação'),
+                                              SeriesPorTicker(df_dividendos, 'dividendo')),
+        'calcular_dividendos_yields': lambda: calcular_dividendos_yields(tickers, precos_medios,
+                                                                         indice_dividendos, indice_cotacoes),
+        'gerar_grafico (15 dias)': lambda: [gerar_grafico(t, 15, precos_medios, indice_cotacoes) for t in amostra],
+        'gerar_grafico (série longa, LTTB)': lambda: [gerar_grafico(t, dias_longos, precos_medios, indice_cotacoes,
+                                                                 max_pontos=MAX_PONTOS_GRAFICO) for t in amostra],
+        'gerar_grafico (candles, barras de 5m)': lambda: gerar_grafico(tickers[0], dias_longos, precos_medios,
+                                                                       indice_cotacoes, barras=barras, modo='candles'),
+        'intradiario.ler_blocos (5m)': lambda: intradiario.ler_blocos(tickers[0], '5m', dias_longos),
+        'intradiario.reamostrar (5m -> 1h)': lambda: barras.reamostrar(3600),
+        'gerar_grafico_dividendos (12 meses)': lambda: [gerar_grafico_dividendos(t, 12, indice_dividendos)
+                                                        for t in amostra],
+        'calcular_analise (sem cache)': lambda: (analise._cache.limpar(),
+                                                 analise.calcular_analise(indice_cotacoes, indice_dividendos,
+                                                                          precos_medios)),
+        'calcular_avaliacao (sem cache)': lambda: (avaliacao._cache.limpar(),
+                                                   avaliacao.calcular_avaliacao(livro, indice_cotacoes,
+                                                                                indice_dividendos)),
+        'simulacao.simular (42 cenários)': lambda: simulacao.simular(mercado, quantidades, reinvestir, aportes),
+        'primeira_tela.gravar': lambda: primeira_tela.gravar(indice_cotacoes, indice_dividendos, {},
+                                                             tickers, precos_medios),
+        'primeira_tela.ler': lambda: primeira_tela.ler(tickers, precos_medios),
+    }
+
+    resultados = []
+    for nome, funcao in casos.items():
+        resultado = medir(funcao, args.repeticoes)
+        resultado['caso'] = nome
+        if nome.startswith('gerar_grafico') and 'candles' not in nome:
+            resultado['chamadas'] = len(amostra)
+            resultado['por_chamada_ms'] = round(resultado['tempo_s'] / len(amostra) * 1000, 3)
+        if 'série longa' in nome or '5m' in nome:
+            resultado['num_dias'] = dias_longos
+        if '5m' in nome:
+            resultado['barras'] = len(barras)
+        resultados.append(resultado)
+    return resultados
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar(args):
+    """Roda todos os casos para cada tamanho de carteira e devolve o documento de resultados."""
+    documento = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit_atual(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'versoes': {'numpy': np.__version__, 'pandas': pd.__version__},
+        'parametros': {chave: valor for chave, valor in vars(args).items() if chave not in ('saida', 'comparar')},
+        'resultados': [],
+    }
+
+    # Os caminhos relativos (data/...) passam a apontar para uma pasta temporária
+    pasta_original = os.getcwd()
+    pasta_trabalho = tempfile.mkdtemp(prefix='benchmarks_')
+    usar_cache_respostas = dados_online.USAR_CACHE_RESPOSTAS
+    url_original = dados_online.YAHOO_CHART_URL
+    os.chdir(pasta_trabalho)
+    dados_online.USAR_CACHE_RESPOSTAS = False
+    try:
+        print("== inicialização ==")
+        for resultado in casos_de_inicializacao(args, pasta_original):
+            resultado.update({'tickers': 0, 'anos': 0, 'linhas_cotacoes': 0})
+            _imprimir(resultado)
+            documento['resultados'].append(resultado)
+
+        for quantidade in args.tickers:
+            print(f"== {quantidade} tickers, {args.anos} anos ==")
+            inicio = perf_counter()
+            df_cotacoes, df_dividendos = gerar_historico(quantidade, args.anos, args.semente)
+            tempo_geracao = perf_counter() - inicio
+            print(f" dados sintéticos: {len(df_cotacoes)} cotações, {len(df_dividendos)} dividendos "
+                  f"({tempo_geracao:.2f}s)")
+
+            resultados = casos_locais(df_cotacoes, df_dividendos, args)
+            if not args.sem_rede:
+                servidor = ServidorFalso.sintetico(quantidade, args.anos, args.semente,
+                                                   latencia_ms=args.latencia_ms, taxa_erro=args.taxa_erro)
+                with servidor:
+                    dados_online.YAHOO_CHART_URL = servidor.url
+                    resultados += casos_de_rede(servidor, args)
+
+            for resultado in resultados:
+                resultado.update({'tickers': quantidade, 'anos': args.anos, 'linhas_cotacoes': len(df_cotacoes)})
+                _imprimir(resultado)
+            documento['resultados'] += resultados
+    finally:
+        os.chdir(pasta_original)
+        dados_online.USAR_CACHE_RESPOSTAS = usar_cache_respostas
+        dados_online.YAHOO_CHART_URL = url_original
+        shutil.rmtree(pasta_trabalho, ignore_errors=True)
+    return documento
+
+
+def _imprimir(resultado):
+    extra = ''
+    if 'requisicoes_por_s' in resultado:
+        extra = f", {resultado['requisicoes']} req ({resultado['requisicoes_por_s']:.1f} req/s)"
+    elif 'por_chamada_ms' in resultado:
+        extra = f", {resultado['por_chamada_ms']:.2f} ms/gráfico"
+    memoria = '' if resultado['pico_memoria_mb'] is None else f"{resultado['pico_memoria_mb']:>9.1f} MB"
+    print(f" {resultado['caso']:<40} {resultado['tempo_s'] * 1000:>10.1f} ms {memoria}{extra}")
+
+
+def comparar(atual, anterior):
+    """Imprime a razão de tempo (atual / anterior) de cada caso presente nos dois documentos."""
+    referencia = {(r['caso'], r['tickers']): r for r in anterior['resultados']}
+    print(f"Comparação com {anterior.get('commit')} ({anterior.get('data')}):")
+    for resultado in atual['resultados']:
+        antigo = referencia.get((resultado['caso'], resultado['tickers']))
+        if antigo is None or not antigo['tempo_s']:
+            continue
+        razao = resultado['tempo_s'] / antigo['tempo_s']
+        print(f" {resultado['caso']:<40} {resultado['tickers']:>6} tickers  x{razao:.2f}"
+              f"{'  (mais lento)' if razao > 1.1 else ''}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de busca, carga, tabela e gráficos.")
+    parser.add_argument('--tickers', type=int, nargs='+', default=[10, 100],
+                        help="Tamanhos de carteira a medir (ex.: 10 1000 5000).")
+    parser.add_argument('--anos', type=float, default=3, help="Anos de histórico sintético.")
+    parser.add_argument('--repeticoes', type=int, default=5, help="Repetições dos casos locais.")
+    parser.add_argument('--latencia-ms', type=float, default=20, help="Latência do servidor falso.")
+    parser.add_argument('--taxa-erro', type=float, default=0, help="Fração de respostas 429/500.")
+    parser.add_argument('--requisicoes-por-segundo', type=float, default=0,
+                        help="Limite de taxa dos buscadores (0 = sem limite).")
+    parser.add_argument('--max-simultaneas', type=int, default=dados_online.MAX_SIMULTANEAS)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--sem-rede', action='store_true', help="Mede apenas tabela, índices e gráficos.")
+    parser.add_argument('--saida', help="Arquivo JSON de resultados (padrão: benchmarks/resultados/<data>.json).")
+    parser.add_argument('--comparar', help="Arquivo de resultados anterior para comparar.")
+    args = parser.parse_args(argv)
+    _silenciar_avisos()
+
+    saida = os.path.abspath(args.saida or os.path.join(
+        PASTA_RESULTADOS, datetime.now().strftime('%Y-%m-%d_%H%M%S') + '.json'))
+    documento = executar(args)
+
+    os.makedirs(os.path.dirname(saida), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(documento, arquivo, ensure_ascii=False, indent=2)
+    print(f"Resultados gravados em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            comparar(documento, json.load(arquivo))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
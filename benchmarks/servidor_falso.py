@@ -0,0 +1,288 @@
+"""
+Servidor local que imita o endpoint v8/finance/chart do Yahoo para os benchmarks.
+
+Responde a partir de um histórico sintético (benchmarks.dados_sinteticos) ou de respostas
+reais gravadas antes com gravar_respostas, com latência, taxa de erro e quantidade de
+tickers configuráveis. Consultas intradiárias (interval=5m, 15m, 60m...) recebem barras
+OHLCV sintéticas geradas a partir dos fechamentos diários. As respostas levam ETag e
+Last-Modified e requisições condicionais com o mesmo conteúdo recebem 304.
+
+Uso, a partir da raiz do projeto:
+    python -m benchmarks.servidor_falso --tickers 100 --anos 3 --latencia-ms 80 --taxa-erro 0.02
+    python -m benchmarks.servidor_falso --gravacoes data/gravacoes   # respostas gravadas
+
+Para apontar o aplicativo para ele:
+    YAHOO_CHART_URL=http://127.0.0.1:8765/v8/finance/chart/{ticker} streamlit run interface.py
+"""
+import os
+import json
+import time
+import random
+import argparse
+import zlib
+import threading
+import numpy as np
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+from benchmarks.dados_sinteticos import gerar_historico, gerar_barras
+from src.indice_series import indexar
+
+# Deslocamento da B3 em relação ao UTC (meta.gmtoffset) e horário do fechamento em UTC
+GMTOFFSET_B3 = -3 * 3600
+FECHAMENTO_UTC_SEGUNDOS = 13 * 3600
+
+# Duração das barras intradiárias aceitas em 'interval', em segundos
+SEGUNDOS_INTERVALO = {'1m': 60, '2m': 120, '5m': 300, '15m': 900, '30m': 1800, '60m': 3600, '90m': 5400, '1h': 3600}
+
+
+def _series_de_dataframes(df_cotacoes, df_dividendos):
+    # Converte o esquema canônico em arrays de epoch/valor por ticker, como o Yahoo entrega
+    cotacoes = indexar(df_cotacoes, 'valor_cotação')
+    dividendos = indexar(df_dividendos, 'dividendo')
+    series = {}
+    for ticker in cotacoes.tickers:
+        datas, valores = cotacoes.serie(ticker)
+        datas_div, valores_div = dividendos.serie(ticker)
+        series[ticker] = (
+            datas.astype('datetime64[s]').astype('int64') + FECHAMENTO_UTC_SEGUNDOS,
+            valores.astype('float64').round(2),
+            datas_div.astype('datetime64[s]').astype('int64') + FECHAMENTO_UTC_SEGUNDOS,
+            valores_div.astype('float64').round(6),
+        )
+    return series
+
+
+def _series_de_gravacoes(pasta):
+    # Lê as respostas gravadas por gravar_respostas (um JSON do chart por ticker)
+    series = {}
+    for nome in sorted(os.listdir(pasta)):
+        if not nome.endswith('.json'):
+            continue
+        with open(os.path.join(pasta, nome), encoding='utf-8') as arquivo:
+            result = json.load(arquivo)['chart']['result'][0]
+        fechamentos = np.asarray(result['indicators']['quote'][0]['close'], dtype='float64')
+        eventos = list(result.get('events', {}).get('dividends', {}).values())
+        series[nome[:-len('.json')]] = (
+            np.asarray(result['timestamp'], dtype='int64'),
+            fechamentos,
+            np.asarray([evento['date'] for evento in eventos], dtype='int64'),
+            np.asarray([evento['amount'] for evento in eventos], dtype='float64'),
+        )
+    return series
+
+
+class ServidorFalso:
+    """
+    Servidor HTTP (em uma thread) com as séries de cada ticker em memória.
+
+    Args:
+        series (dict): ticker -> (epochs, fechamentos, epochs_dividendos, dividendos).
+        latencia_ms (float): Atraso fixo de cada resposta.
+        taxa_erro (float): Fração das requisições respondidas com 429 ou 500.
+        porta (int): Porta local; 0 escolhe uma livre.
+        semente (int): Semente do sorteio dos erros.
+
+    Uso:
+        with ServidorFalso.sintetico(100, anos=3) as servidor:
+            dados_online.YAHOO_CHART_URL = servidor.url
+    """
+
+    def __init__(self, series, latencia_ms=0.0, taxa_erro=0.0, porta=0, semente=0):
+        self.series = series
+        self.latencia_ms = latencia_ms
+        self.taxa_erro = taxa_erro
+        self.requisicoes = 0
+        self.erros = 0
+        self.nao_modificadas = 0
+        self.bytes_enviados = 0
+        self.ultima_modificacao = formatdate(time.time(), usegmt=True)
+        self._aleatorio = random.Random(semente)
+        self._barras = {}
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', porta), self._manipulador())
+        self._servidor.daemon_threads = True
+        self._thread = None
+
+    @classmethod
+    def sintetico(cls, quantidade_tickers, anos=2, semente=0, **kwargs):
+        """Servidor com histórico sintético de 'quantidade_tickers' ativos."""
+        df_cotacoes, df_dividendos = gerar_historico(quantidade_tickers, anos, semente)
+        return cls(_series_de_dataframes(df_cotacoes, df_dividendos), semente=semente, **kwargs)
+
+    @classmethod
+    def de_gravacoes(cls, pasta, **kwargs):
+        """Servidor que repete as respostas gravadas em 'pasta'."""
+        return cls(_series_de_gravacoes(pasta), **kwargs)
+
+    @property
+    def tickers(self):
+        return list(self.series)
+
+    @property
+    def url(self):
+        """Modelo de URL no formato de dados_online.YAHOO_CHART_URL."""
+        return f"http://127.0.0.1:{self._servidor.server_address[1]}/v8/finance/chart/{{ticker}}"
+
+    def zerar_contadores(self):
+        with self._lock:
+            self.requisicoes = self.erros = self.nao_modificadas = self.bytes_enviados = 0
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.parar()
+        return False
+
+    def responder(self, ticker, consulta):
+        """Monta (status, corpo) da resposta do chart para o ticker e os parâmetros da consulta."""
+        with self._lock:
+            self.requisicoes += 1
+            falhar = self._aleatorio.random() < self.taxa_erro
+            status_erro = self._aleatorio.choice((429, 500))
+            if falhar:
+                self.erros += 1
+        if falhar:
+            return status_erro, b''
+
+        if ticker not in self.series:
+            corpo = {'chart': {'result': None, 'error': {'code': 'Not Found', 'description': 'No data found'}}}
+            return 404, json.dumps(corpo).encode('utf-8')
+
+        epochs, fechamentos, epochs_div, dividendos = self.series[ticker]
+        inicio = int(consulta.get('period1', ['0'])[0])
+        fim = int(consulta.get('period2', [str(int(time.time()))])[0])
+        intervalo = consulta.get('interval', ['1d'])[0]
+        if intervalo in SEGUNDOS_INTERVALO:
+            barras = self._barras_intradiarias(ticker, intervalo)
+            recorte = slice(*np.searchsorted(barras['tempo'], [inicio, fim], 'left'))
+            quote = {chave: barras[nome][recorte].round(2).tolist() for chave, nome in
+                     (('open', 'abertura'), ('high', 'maxima'), ('low', 'minima'), ('close', 'fechamento'))}
+            quote['volume'] = barras['volume'][recorte].astype('int64').tolist()
+            result = {
+                'meta': {'symbol': ticker, 'gmtoffset': GMTOFFSET_B3, 'currency': 'BRL'},
+                'timestamp': barras['tempo'][recorte].tolist(),
+                'indicators': {'quote': [quote]},
+            }
+            return 200, json.dumps({'chart': {'result': [result], 'error': None}}).encode('utf-8')
+
+        recorte = slice(*np.searchsorted(epochs, [inicio, fim], 'left'))
+        result = {
+            'meta': {'symbol': ticker, 'gmtoffset': GMTOFFSET_B3, 'currency': 'BRL'},
+            'timestamp': epochs[recorte].tolist(),
+            'indicators': {'quote': [{'close': fechamentos[recorte].tolist()}]},
+        }
+        if 'div' in consulta.get('events', [''])[0]:
+            recorte_div = slice(*np.searchsorted(epochs_div, [inicio, fim], 'left'))
+            result['events'] = {'dividends': {
+                str(data): {'amount': valor, 'date': data}
+                for data, valor in zip(epochs_div[recorte_div].tolist(), dividendos[recorte_div].tolist())
+            }}
+        return 200, json.dumps({'chart': {'result': [result], 'error': None}}).encode('utf-8')
+
+    def _barras_intradiarias(self, ticker, intervalo):
+        # Geradas uma vez por ticker e intervalo, com semente fixa por ticker
+        chave = (ticker, intervalo)
+        if chave not in self._barras:
+            epochs, fechamentos = self.series[ticker][:2]
+            self._barras[chave] = gerar_barras(epochs - epochs % 86400, fechamentos, SEGUNDOS_INTERVALO[intervalo],
+                                               semente=zlib.crc32(ticker.encode('utf-8')))
+        return self._barras[chave]
+
+    def _manipulador(self):
+        servidor = self
+
+        class Manipulador(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                endereco = urlparse(self.path)
+                if servidor.latencia_ms:
+                    time.sleep(servidor.latencia_ms / 1000)
+                status, corpo = servidor.responder(unquote(endereco.path.rsplit('/', 1)[-1]), parse_qs(endereco.query))
+                etag = f'"{zlib.crc32(corpo):08x}"'
+                if status == 200 and self.headers.get('If-None-Match') == etag:
+                    # Revalidação de uma resposta que o cliente já tem: sem corpo
+                    status, corpo = 304, b''
+                    with servidor._lock:
+                        servidor.nao_modificadas += 1
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(corpo)))
+                if status in (200, 304):
+                    self.send_header('ETag', etag)
+                    self.send_header('Last-Modified', servidor.ultima_modificacao)
+                self.end_headers()
+                self.wfile.write(corpo)
+                with servidor._lock:
+                    servidor.bytes_enviados += len(corpo)
+
+        return Manipulador
+
+
+def gravar_respostas(tickers, pasta, days_range=520, user_agent='Mozilla/5.0'):
+    """
+    Baixa do Yahoo (uma vez) as respostas reais do chart e grava um JSON por ticker em
+    'pasta', para o servidor repeti-las depois sem acessar a rede.
+    """
+    from src.dados_online import YAHOO_CHART_URL, TIMEOUT_SEGUNDOS, obter_sessao, _periodo
+
+    os.makedirs(pasta, exist_ok=True)
+    period1, period2 = _periodo(days_range)
+    sessao = obter_sessao(user_agent)
+    for ticker in tickers:
+        response = sessao.get(YAHOO_CHART_URL.format(ticker=ticker), timeout=TIMEOUT_SEGUNDOS,
+                              params={'period1': period1, 'period2': period2, 'interval': '1d', 'events': 'div|split'})
+        response.raise_for_status()
+        with open(os.path.join(pasta, f'{ticker}.json'), 'wb') as arquivo:
+            arquivo.write(response.content)
+        print(f" {ticker}: {len(response.content)} bytes gravados")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local que imita o endpoint chart do Yahoo.")
+    parser.add_argument('--tickers', type=int, default=100, help="Quantidade de tickers sintéticos.")
+    parser.add_argument('--anos', type=float, default=2, help="Anos de histórico sintético.")
+    parser.add_argument('--gravacoes', help="Pasta com respostas gravadas (substitui os dados sintéticos).")
+    parser.add_argument('--gravar', nargs='+', metavar='TICKER',
+                        help="Grava as respostas reais desses tickers na pasta de --gravacoes e sai.")
+    parser.add_argument('--latencia-ms', type=float, default=0)
+    parser.add_argument('--taxa-erro', type=float, default=0)
+    parser.add_argument('--porta', type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    if args.gravar:
+        gravar_respostas(args.gravar, args.gravacoes or os.path.join('data', 'gravacoes'))
+        return 0
+
+    opcoes = dict(latencia_ms=args.latencia_ms, taxa_erro=args.taxa_erro, porta=args.porta)
+    if args.gravacoes:
+        servidor = ServidorFalso.de_gravacoes(args.gravacoes, **opcoes)
+    else:
+        servidor = ServidorFalso.sintetico(args.tickers, args.anos, **opcoes)
+
+    with servidor:
+        print(f"{len(servidor.tickers)} tickers em {servidor.url} (Ctrl+C para encerrar)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print(f"{servidor.requisicoes} requisições, {servidor.erros} erros.")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
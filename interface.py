@@ -1,10 +1,11 @@
+import os
 import streamlit as st
+from datetime import date, timedelta
 
-# Carregar funções 
-from src.ativos_precos import ativos_config, precos_medios_config
-from src.grafico import gerar_grafico, gerar_grafico_dividendos
-from src.tabela import calcular_dividendos_yields
-from src.carrega_dados import carregar_dados
+# Carregar funções leves; pandas, plotly e requests só depois da prévia da primeira tela
+from src.carteiras import carregar_carteiras, uniao_tickers
+from src import metricas, primeira_tela
+from src.primeira_tela import DIAS_GRAFICO_PADRAO, MESES_GRAFICO_PADRAO, MAX_PONTOS_GRAFICO
 
 # Configurações de página do Streamlit (wide mode)
 st.set_page_config(
@@ -14,57 +15,315 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Lista de ativos e preços médios
-ativos = ativos_config
-precos_medios = precos_medios_config
+# Medições deste rerun (exibidas no painel "Performance" e gravadas no log JSON)
+coleta = metricas.iniciar_coleta('interface')
 
-# Carrega dados
-df_cotacoes, df_dividendos = carregar_dados(ativos_config)
+# Carteiras definidas na pasta carteiras/; os dados são carregados uma vez para a união
+# dos tickers e cada carteira exibe apenas os seus
+carteiras = carregar_carteiras()
+tickers_carteiras = uniao_tickers(carteiras.values())
 
 # Configurações da interface
 st.title("Análise de Ativos")
 st.sidebar.header("Seleção de Ativo")
 
+# Seleção da carteira (também pela URL, ex.: ?carteira=Principal)
+nomes_carteiras = list(carteiras)
+carteira_url = st.query_params.get('carteira')
+nome_carteira = st.sidebar.selectbox(
+    "Carteira", nomes_carteiras,
+    index=nomes_carteiras.index(carteira_url) if carteira_url in nomes_carteiras else 0)
+st.query_params['carteira'] = nome_carteira
+
+# Lista de ativos e preços médios da carteira selecionada
+ativos = carteiras[nome_carteira].ativos
+precos_medios = carteiras[nome_carteira].precos_medios
+
 # Seleção do ativo e período de dias
 ativo_selecionado = st.sidebar.selectbox("Escolha o ativo", ativos)
-num_dias = st.sidebar.slider("Número de dias para exibir no gráfico", 1, 520, 15)
+num_dias = st.sidebar.slider("Número de dias para exibir no gráfico", 1, 520, DIAS_GRAFICO_PADRAO)
+
+# Barras do gráfico de cotação: diárias (histórico carregado) ou intradiárias (OHLCV sob demanda)
+intervalo_grafico = st.sidebar.selectbox("Intervalo das cotações", ['1d', '60m', '15m', '5m'],
+                                         format_func=lambda intervalo: "Diário" if intervalo == '1d' else intervalo)
+modo_grafico = st.sidebar.radio("Tipo de gráfico", ['linha', 'candles'], horizontal=True,
+                                format_func=str.capitalize)
 
 st.sidebar.header("Meses para exibir no gráfico")
-meses = st.sidebar.slider("Dividendos dos últimos meses", 2, 12, 12)
+meses = st.sidebar.slider("Dividendos dos últimos meses", 2, 12, MESES_GRAFICO_PADRAO)
 
-# Entrada dos valores pelo usuário
-st.sidebar.header("Parâmetros de Cálculo de Variação")
-saldo_bruto = st.sidebar.number_input("Saldo Bruto", min_value=1.0, value=1.0, step=100.0,format="%.2f")
-valor_aplicado = st.sidebar.number_input("Valor Aplicado", min_value=1.0, value=1.0, step=100.0,format="%.2f")
-total_proventos = st.sidebar.number_input("Total de Proventos", min_value=1.0, value=1.0, step=10.0,format="%.2f")
+st.sidebar.header("Análise histórica")
+# Preenchido depois da carga: o limite do slider é o histórico carregado do ativo
+area_dias_analise = st.sidebar.container()
 
-# Cálculo da variação Real
-variacao = (saldo_bruto - (valor_aplicado - total_proventos)) / saldo_bruto * 100
+# Espaços reservados na ordem da página: preenchidos aos poucos na primeira carga
+area_avaliacao = st.empty()
 
-# Cálculo da variação de cotas
-variacao_cotas = ((saldo_bruto - valor_aplicado) / valor_aplicado) * 100
+# Carteira sem quantidades nem compras: a variação é calculada a partir dos valores informados
+if not carteiras[nome_carteira].quantidades:
+    st.sidebar.header("Parâmetros de Cálculo de Variação")
+    saldo_bruto = st.sidebar.number_input("Saldo Bruto", min_value=1.0, value=1.0, step=100.0,format="%.2f")
+    valor_aplicado = st.sidebar.number_input("Valor Aplicado", min_value=1.0, value=1.0, step=100.0,format="%.2f")
+    total_proventos = st.sidebar.number_input("Total de Proventos", min_value=1.0, value=1.0, step=10.0,format="%.2f")
 
-# Exibição dos cards lado a lado
-col1, col2 = st.columns(2)  # Criação de duas colunas
+    # Cálculo da variação Real
+    variacao = (saldo_bruto - (valor_aplicado - total_proventos)) / saldo_bruto * 100
 
-with col1:
-    st.metric(label="Variação (%)", value=f"{variacao:.2f}%")
+    # Cálculo da variação de cotas
+    variacao_cotas = ((saldo_bruto - valor_aplicado) / valor_aplicado) * 100
 
-with col2:
-    st.metric(label="Variação Cotas (%)", value=f"{variacao_cotas:.2f}%")
+    with area_avaliacao.container():
+        # Exibição dos cards lado a lado
+        col1, col2 = st.columns(2)
+        col1.metric(label="Variação (%)", value=f"{variacao:.2f}%")
+        col2.metric(label="Variação Cotas (%)", value=f"{variacao_cotas:.2f}%")
+        st.caption(f"Informe a \"quantidade\" ou as \"compras\" dos ativos da carteira {nome_carteira} "
+                   "(pasta carteiras/) para calcular o saldo, os proventos recebidos e as variações automaticamente.")
+area_previa = st.empty()
+area_grafico = st.empty()
+area_grafico_dividendos = st.empty()
+st.write("Tabela de Dados dos Ativos", unsafe_allow_html=True)
+area_tabela = st.empty()
 
-# Exibe o gráfico para o ativo selecionado
-grafico = gerar_grafico(ativo_selecionado, num_dias, precos_medios, df_cotacoes)
-if grafico:
-    st.plotly_chart(grafico, use_container_width=True)
+# Primeira exibição da sessão: mostra a prévia gravada pela atualização agendada
+# enquanto os módulos pesados e os dados ao vivo são carregados
+previa = None
+if not st.session_state.get('dados_ao_vivo'):
+    with metricas.cronometro('interface.primeira_tela'):
+        previa = primeira_tela.ler(ativos, precos_medios)
+        if previa is not None:
+            area_previa.caption(f"Prévia de {previa['gerado_em'].replace('T', ' ')}; carregando dados atualizados...")
+            figura, figura_dividendos = primeira_tela.figuras(previa, ativo_selecionado, num_dias, meses)
+            if figura and (intervalo_grafico, modo_grafico) == ('1d', 'linha'):
+                area_grafico.plotly_chart(figura, use_container_width=True, key='cotacao_previa')
+            if figura_dividendos:
+                area_grafico_dividendos.plotly_chart(figura_dividendos, use_container_width=True,
+                                                      key='dividendos_previa')
+            area_tabela.dataframe(primeira_tela.tabela(previa), use_container_width=True, height=458, hide_index=True)
+
+with metricas.cronometro('interface.importacoes'):
+    import pandas as pd
+    from src import cache_figuras
+    from src.tabela import calcular_dividendos_yields, formatar_tabela_dividendos
+    from src.carrega_dados import (dados_em_cache, carregar_dados_progressivo, combinar_carregados,
+                                   dividendos_para_avaliacao, dividendos_historicos)
+    from src.analise import calcular_analise
+    from src.avaliacao import calcular_avaliacao, compras_anteriores
+    from src import simulacao
+    from src.grafico import gerar_grafico_simulacao
+    from src.indice_series import indexar
+    from src.historico_local import LOCAL, INDISPONIVEL, DIAS_DIVIDENDOS
+    from src import intradiario
+
+# Barras OHLCV do ativo selecionado; candles diários são montados a partir das barras de 60m
+barras = None
+if intervalo_grafico != '1d' or modo_grafico == 'candles':
+    intervalo_fonte = '60m' if intervalo_grafico == '1d' else intervalo_grafico
+    with metricas.cronometro('interface.barras'):
+        barras = intradiario.carregar_barras(ativo_selecionado, intervalo_fonte, num_dias)
+    if barras is None:
+        st.sidebar.warning(f"Sem barras de {intervalo_fonte} para {ativo_selecionado}; exibindo a cotação diária.")
+    else:
+        if intervalo_grafico == '1d':
+            barras = barras.reamostrar(intradiario.BARRAS_EXIBICAO['1d'])
+        if num_dias > intradiario.pregoes_disponiveis(intervalo_fonte):
+            st.sidebar.caption(f"Barras de {intervalo_fonte} limitadas aos últimos "
+                               f"{intradiario.pregoes_disponiveis(intervalo_fonte)} pregões.")
+
+
+def exibir_graficos(indice_cotacoes, indice_dividendos, etapa):
+    # 'etapa' diferencia as chaves dos elementos quando a mesma figura é redesenhada na carga progressiva
+    grafico = cache_figuras.grafico_cotacao(ativo_selecionado, num_dias, precos_medios, indice_cotacoes,
+                                           max_pontos=MAX_PONTOS_GRAFICO, barras=barras, modo=modo_grafico)
+    if grafico:
+        area_grafico.plotly_chart(grafico, use_container_width=True, key=f'cotacao_{etapa}')
+
+    grafico_dividendos = cache_figuras.grafico_dividendos(ativo_selecionado, meses, indice_dividendos)
+    if grafico_dividendos:
+        area_grafico_dividendos.plotly_chart(grafico_dividendos, use_container_width=True,
+                                              key=f'dividendos_{etapa}')
+
+
+# Carrega dados de todas as carteiras: do cache quando houver; senão, ticker a ticker,
+# começando pelo selecionado
+dados = dados_em_cache(tickers_carteiras)
+if dados is None:
+    with metricas.cronometro('interface.carga_progressiva'):
+        barra = st.progress(0.0, text="Buscando dados online...")
+        linhas = []
+        itens = {}
+        for carregados, (ticker, cotacoes_ticker, dividendos_ticker, situacao_ticker) in enumerate(
+                carregar_dados_progressivo(tickers_carteiras, prioridade=ativo_selecionado), start=1):
+            itens[ticker] = (cotacoes_ticker, dividendos_ticker, situacao_ticker)
+            if ticker == ativo_selecionado:
+                exibir_graficos(cotacoes_ticker, dividendos_ticker, 'parcial')
+            if ticker in ativos:
+                linhas.append(calcular_dividendos_yields([ticker], precos_medios, dividendos_ticker, cotacoes_ticker,
+                                                         {ticker: situacao_ticker}))
+                area_tabela.dataframe(formatar_tabela_dividendos(pd.concat(linhas, ignore_index=True), avisos=False),
+                                      use_container_width=True, height=458, hide_index=True)
+            barra.progress(carregados / len(tickers_carteiras),
+                           text=f"{carregados}/{len(tickers_carteiras)} ativos carregados")
+        barra.empty()
+        # Monta os dados com o que chegou: tickers indisponíveis não derrubam os demais
+        dados = combinar_carregados(tickers_carteiras, itens)
+
+if dados is None or dados[0] is None or dados[0].empty:
+    if previa is not None:
+        area_previa.caption(f"Prévia de {previa['gerado_em'].replace('T', ' ')}; dados atualizados indisponíveis.")
+    st.error("Não foi possível carregar os dados online nem os dados locais.")
+    # st.stop() interrompe o script: as medições deste rerun são encerradas antes
+    metricas.encerrar_coleta(coleta)
+    st.stop()
+df_cotacoes, df_dividendos, situacao = dados
 
-grafico_dividendos = gerar_grafico_dividendos(ativo_selecionado, meses, df_dividendos)
-if grafico_dividendos:
-    st.plotly_chart(grafico_dividendos, use_container_width=True)
+# Índices por ticker (construídos uma vez por carga); os sliders só recortam as séries
+indice_cotacoes = indexar(df_cotacoes, 'valor_cotação')
+indice_dividendos = indexar(df_dividendos, 'dividendo')
+
+# Avaliação da carteira a partir das posições (quantidades e compras em carteiras/),
+# recalculada apenas quando as posições ou os dados mudam. Ativos com compras anteriores
+# aos dividendos carregados usam o histórico de dividendos desde a primeira compra
+carteira = carteiras[nome_carteira]
+inicio_dividendos = date.today() - timedelta(days=DIAS_DIVIDENDOS)
+dividendos_avaliacao, proventos_completos = (
+    dividendos_para_avaliacao(df_dividendos, compras_anteriores(carteira, inicio_dividendos))
+    if carteira.quantidades else (df_dividendos, True))
+avaliacao = calcular_avaliacao(carteira, indice_cotacoes, dividendos_avaliacao)
+if not avaliacao.vazia:
+    total = avaliacao.total
+    with area_avaliacao.container():
+        # Exibição dos cards lado a lado
+        col1, col2, col3, col4, col5 = st.columns(5)
+        col1.metric(label="Variação (%)", value=f"{total['Variação (%)']:.2f}%")
+        col2.metric(label="Variação Cotas (%)", value=f"{total['Variação Cotas (%)']:.2f}%")
+        col3.metric(label="Saldo Bruto", value=f"R$ {total['Saldo Bruto']:.2f}")
+        col4.metric(label="Valor Aplicado", value=f"R$ {total['Valor Aplicado']:.2f}")
+        col5.metric(label="Total de Proventos", value=f"R$ {total['Proventos Recebidos']:.2f}")
+        avisos = []
+        if not proventos_completos:
+            avisos.append("Não foi possível obter os dividendos anteriores aos últimos 12 meses: "
+                          "os proventos das compras mais antigas estão subestimados.")
+        if set(carteira.quantidades) - set(carteira.compras):
+            avisos.append("Posições sem data de compra contam os proventos dos últimos 12 meses.")
+        if avisos:
+            st.caption(" ".join(avisos))
+        with st.expander("Avaliação por ativo"):
+            st.dataframe(avaliacao.por_ativo.round(2), use_container_width=True)
+
+# Exibe o gráfico para o ativo selecionado
+exibir_graficos(indice_cotacoes, indice_dividendos, 'final')
 
 # Calcula e exibe a tabela de dados dos ativos
-st.write("Tabela de Dados dos Ativos", unsafe_allow_html=True)
-df_ativos = calcular_dividendos_yields(ativos, precos_medios, df_dividendos, df_cotacoes)
+df_indicadores = calcular_dividendos_yields(ativos, precos_medios, indice_dividendos, indice_cotacoes, situacao)
+df_ativos = formatar_tabela_dividendos(df_indicadores)
+
+# Avisa quando parte dos ativos não pôde ser atualizada agora
+desatualizados = [ticker for ticker in ativos if situacao.get(ticker) == LOCAL]
+if desatualizados:
+    st.warning(f"Não foi possível atualizar agora: {', '.join(desatualizados)}. "
+               "Exibindo o último histórico salvo (coluna \"Dados\").")
+indisponiveis = [ticker for ticker in ativos if situacao.get(ticker, INDISPONIVEL) == INDISPONIVEL]
+if indisponiveis:
+    st.warning(f"Sem dados online nem locais para: {', '.join(indisponiveis)}.")
 
 # Exibe a tabela com o ajuste de largura e altura do container
-st.dataframe(df_ativos, use_container_width=True, height=458, hide_index=True)
\ No newline at end of file
+area_tabela.dataframe(df_ativos, use_container_width=True, height=458, hide_index=True)
+
+# Análise histórica: DY/YOC de 12 meses, médias móveis, volatilidade e drawdown de todos
+# os ativos, calculados uma vez por versão dos dados
+st.subheader("Análise histórica")
+# Dividendos desde 12 meses antes da primeira cotação, para a janela de 12 meses valer desde
+# o primeiro pregão; se a busca falhar, os pregões com a janela incompleta ficam sem DY/YOC
+dividendos_analise, inicio_dividendos_analise = dividendos_historicos(indice_cotacoes, df_dividendos,
+                                                                      indice_cotacoes.tickers)
+analise = calcular_analise(indice_cotacoes, dividendos_analise, precos_medios,
+                           inicio_dividendos=inicio_dividendos_analise)
+pregoes_carregados = len(indice_cotacoes.serie(ativo_selecionado)[0])
+dias_analise = (area_dias_analise.slider("Pregões exibidos na análise", 21, pregoes_carregados,
+                                         min(252, pregoes_carregados))
+                if pregoes_carregados > 21 else pregoes_carregados)
+aba_medias, aba_yields, aba_risco, aba_resumo = st.tabs(["Médias móveis", "Yield 12m", "Risco", "Todos os ativos"])
+for aba, tipo in ((aba_medias, 'medias_moveis'), (aba_yields, 'yields'), (aba_risco, 'risco')):
+    with aba:
+        grafico_analise = cache_figuras.grafico_analise(tipo, ativo_selecionado, dias_analise, analise,
+                                                        max_pontos=MAX_PONTOS_GRAFICO)
+        if grafico_analise:
+            st.plotly_chart(grafico_analise, use_container_width=True, key=f'analise_{tipo}')
+        else:
+            st.info(f"Sem dados suficientes de {ativo_selecionado} para este gráfico.")
+with aba_resumo:
+    st.dataframe(analise.ultimos().reindex(ativos).round(2), use_container_width=True)
+
+# Simulação de reinvestimento dos dividendos e aportes mensais na carteira toda: os
+# cenários (com e sem reinvestimento, com e sem aporte) são calculados juntos
+st.subheader("Simulação: reinvestimento e aportes")
+col_modo, col_inicial, col_aporte, col_anos = st.columns(4)
+modo_simulacao = col_modo.radio("Base", ["Histórico", "Projeção"], horizontal=True)
+valor_inicial = col_inicial.number_input("Valor inicial por ativo (R$)", min_value=0.0,
+                                         value=simulacao.VALOR_INICIAL_POR_ATIVO, step=100.0)
+aporte_mensal = col_aporte.number_input("Aporte mensal (R$)", min_value=0.0, value=500.0, step=100.0)
+if modo_simulacao == "Histórico":
+    # O período fica limitado às cotações e aos dividendos carregados (ver dividendos_historicos)
+    meses_disponiveis = max(1, simulacao.meses_de_historico(indice_cotacoes, ativos, inicio_dividendos_analise))
+    meses_simulacao = (col_anos.slider("Meses de histórico", 1, meses_disponiveis, meses_disponiveis)
+                       if meses_disponiveis > 1 else meses_disponiveis)
+    anos_simulacao = meses_simulacao / 12
+    crescimento_precos = crescimento_dividendos = 0.0
+else:
+    anos_simulacao = col_anos.slider("Anos de projeção", 1, 30, 10)
+    col_precos, col_dividendos = st.columns(2)
+    crescimento_precos = col_precos.number_input("Valorização das cotas (% a.a.)", value=0.0, step=0.5)
+    crescimento_dividendos = col_dividendos.number_input("Crescimento dos dividendos (% a.a.)", value=0.0, step=0.5)
+
+# Em cache pela versão dos dados e pelos parâmetros: reruns sem mudança não recalculam.
+# O pool de processos só é usado quando a grade passa de CELULAS_POR_LOTE
+simulacao_carteira = simulacao.simular_carteira(
+    indice_cotacoes, dividendos_analise, ativos, anos_simulacao, valor_inicial,
+    aportes_mensais=sorted({0.0, aporte_mensal}), projetar=modo_simulacao == "Projeção",
+    crescimento_precos=crescimento_precos / 100, crescimento_dividendos=crescimento_dividendos / 100,
+    processos=os.cpu_count() or 1)
+curvas_simulacao = simulacao_carteira.curvas
+
+periodo_simulacao = f"{meses_simulacao} meses" if modo_simulacao == "Histórico" else f"{anos_simulacao} anos"
+grafico_patrimonio = gerar_grafico_simulacao(
+    curvas_simulacao['patrimonio'], f"Patrimônio projetado ({modo_simulacao.lower()}, {periodo_simulacao})",
+    "Patrimônio (R$)", referencia=curvas_simulacao['investido'].iloc[:, -1], nome_referencia="Total investido")
+grafico_renda = gerar_grafico_simulacao(curvas_simulacao['renda'], "Renda mensal de dividendos", "Renda (R$)",
+                                        barras=True)
+if grafico_patrimonio is None:
+    st.info("Sem dados suficientes para a simulação.")
+else:
+    st.plotly_chart(grafico_patrimonio, use_container_width=True, key='simulacao_patrimonio')
+    st.plotly_chart(grafico_renda, use_container_width=True, key='simulacao_renda')
+    if modo_simulacao == "Histórico":
+        st.caption(f"Simulação a partir de {pd.Timestamp(simulacao_carteira.mercado.datas[0]):%d/%m/%Y} "
+                   f"({meses_disponiveis} meses de histórico carregados).")
+    st.dataframe(simulacao_carteira.resumo().round(2), use_container_width=True)
+
+# Dados ao vivo no lugar da prévia; os próximos reruns da sessão não a exibem mais
+area_previa.empty()
+st.session_state['dados_ao_vivo'] = True
+
+# Efeito do cache de gráficos (acumulado no processo)
+cache_graficos = cache_figuras.estatisticas()
+st.sidebar.caption(f"Cache de gráficos: {cache_graficos['acertos']} acertos, "
+                   f"{cache_graficos['faltas']} faltas, {cache_graficos['itens']} itens")
+
+# Encerra as medições deste rerun e, se pedido, mostra onde o tempo foi gasto
+resumo = metricas.encerrar_coleta(coleta)
+if st.sidebar.checkbox("Mostrar desempenho", value=False):
+    with st.expander("Performance", expanded=True):
+        st.caption(f"Rerun em {resumo['duracao_ms']:.0f} ms; "
+                   f"{resumo['bytes_baixados'] / 1024:.1f} KB baixados do Yahoo.")
+        etapas = pd.DataFrame.from_dict(resumo['etapas'], orient='index').rename_axis('Etapa')
+        if not etapas.empty:
+            st.dataframe(etapas.sort_values('total_ms', ascending=False), use_container_width=True)
+        if resumo['contadores']:
+            st.dataframe(pd.Series(resumo['contadores'], name='Quantidade').rename_axis('Contador'),
+                         use_container_width=True)
+        latencias = resumo['latencia_http']
+        if latencias['por_ticker']:
+            st.bar_chart(pd.Series(latencias['histograma'], name='Requisições'))
+            st.dataframe(pd.DataFrame.from_dict(latencias['por_ticker'], orient='index')
+                         .drop(columns='histograma').rename_axis('Ticker'), use_container_width=True)
@@ -0,0 +1,49 @@
+import numpy as np
+
+
+def lttb(x, y, limite):
+    """
+    Largest-Triangle-Three-Buckets: escolhe 'limite' pontos de uma série preservando
+    a forma visual (picos e vales). O primeiro e o último ponto são sempre mantidos.
+
+    Args:
+        x (array): Eixo x crescente (números ou datetime64).
+        y (array): Valores da série, sem NaN.
+        limite (int): Quantidade de pontos desejada.
+
+    Returns:
+        np.ndarray: Índices (crescentes) dos pontos escolhidos.
+    """
+    n = len(y)
+    if limite is None or limite >= n or limite < 3:
+        return np.arange(n)
+
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.view('int64')
+    x = x.astype('float64')
+    y = np.asarray(y, dtype='float64')
+
+    # limite - 2 baldes entre o primeiro e o último ponto
+    bordas = np.linspace(1, n - 1, limite - 1).astype('int64')
+    indices = np.empty(limite, dtype='int64')
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    anterior = 0
+    for i in range(limite - 2):
+        inicio, fim = bordas[i], max(bordas[i + 1], bordas[i] + 1)
+        # Média do próximo balde (ou o último ponto, no último balde)
+        prox_inicio, prox_fim = fim, (bordas[i + 2] if i + 2 < len(bordas) else n)
+        if prox_inicio >= prox_fim:
+            prox_inicio, prox_fim = n - 1, n
+        media_x = x[prox_inicio:prox_fim].mean()
+        media_y = y[prox_inicio:prox_fim].mean()
+
+        # Área do triângulo (ponto anterior, candidato, média do próximo balde)
+        area = np.abs((x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+                      - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior]))
+        anterior = inicio + int(np.argmax(area))
+        indices[i + 1] = anterior
+
+    return indices
@@ -0,0 +1,184 @@
+"""
+Métricas móveis de todos os ativos ao longo do tempo: dividendos e yields (DY e YOC) dos
+últimos 12 meses, médias móveis, volatilidade e drawdown.
+
+As cotações e os dividendos são convertidos uma única vez em matrizes largas
+data × ticker (SeriesPorTicker.larga) e todas as métricas saem de operações vetorizadas
+de janela sobre essas matrizes. O resultado fica em cache pela versão dos dados
+(SeriesPorTicker.versao), pelos preços médios e pelos parâmetros das janelas.
+"""
+import hashlib
+import numpy as np
+import pandas as pd
+from src.indice_series import indexar
+from src.cache_lru import CacheLRU
+from src import metricas
+
+# Janela dos dividendos acumulados (DY e YOC), em dias corridos
+JANELA_DIVIDENDOS_DIAS = 365
+
+# Médias móveis da cotação, em pregões
+JANELAS_MEDIAS_MOVEIS = (21, 50, 200)
+
+# Janela da volatilidade (desvio padrão dos retornos diários), em pregões
+JANELA_VOLATILIDADE = 21
+
+# Pregões por ano, para anualizar a volatilidade
+PREGOES_POR_ANO = 252
+
+# Análises mantidas em memória (uma por versão dos dados e conjunto de parâmetros)
+TAMANHO_CACHE = 4
+
+
+class AnaliseMovel:
+    """
+    Matrizes data × ticker (DataFrames com índice 'date' e uma coluna por ticker), todas
+    alinhadas aos pregões das cotações:
+
+    - cotacoes: fechamento do dia (NaN quando o ativo não teve cotação)
+    - precos: fechamento com o último valor conhecido repetido nos dias sem cotação
+    - dividendos_12m: soma dos dividendos com data na janela (dia - 365 dias, dia]; NaN
+      quando a janela começa antes do início dos dividendos carregados
+    - dy_12m / yoc_12m: dividendos_12m sobre o preço do dia / o preço médio, em %
+    - medias_moveis: {janela: média móvel simples do preço}
+    - volatilidade: desvio padrão anualizado dos retornos logarítmicos diários, em %
+    - drawdown: queda do preço em relação ao maior preço anterior, em % (0 no topo)
+
+    'versao' identifica os dados e os parâmetros usados no cálculo.
+    """
+
+    def __init__(self, cotacoes, precos, dividendos_12m, dy_12m, yoc_12m, medias_moveis,
+                 volatilidade, drawdown, versao):
+        self.cotacoes = cotacoes
+        self.precos = precos
+        self.dividendos_12m = dividendos_12m
+        self.dy_12m = dy_12m
+        self.yoc_12m = yoc_12m
+        self.medias_moveis = medias_moveis
+        self.volatilidade = volatilidade
+        self.drawdown = drawdown
+        self.versao = versao
+
+    @property
+    def tickers(self):
+        return list(self.precos.columns)
+
+    def serie(self, ticker, num_dias=None):
+        """
+        Todas as métricas de um ticker como DataFrame (uma coluna por métrica), a partir
+        do primeiro pregão com cotação; 'num_dias' limita aos últimos pregões.
+        """
+        if ticker not in self.precos:
+            return pd.DataFrame()
+        colunas = {
+            'cotacao': self.cotacoes[ticker],
+            'dividendos_12m': self.dividendos_12m[ticker],
+            'dy_12m': self.dy_12m[ticker],
+            'yoc_12m': self.yoc_12m[ticker],
+            **{f'mm_{janela}': media[ticker] for janela, media in self.medias_moveis.items()},
+            'volatilidade': self.volatilidade[ticker],
+            'drawdown': self.drawdown[ticker],
+        }
+        df = pd.DataFrame(colunas).loc[self.precos[ticker].first_valid_index():]
+        return df if num_dias is None else df.tail(int(num_dias))
+
+    def ultimos(self):
+        """Último valor de cada métrica por ticker (uma linha por ticker)."""
+        return pd.DataFrame({
+            'DY 12m (%)': self.dy_12m.iloc[-1],
+            'YOC 12m (%)': self.yoc_12m.iloc[-1],
+            'Volatilidade (%)': self.volatilidade.iloc[-1],
+            'Drawdown (%)': self.drawdown.iloc[-1],
+            'Drawdown máximo (%)': self.drawdown.min(),
+        }).rename_axis('Ativo') if len(self.precos) else pd.DataFrame()
+
+
+def _somas_moveis(datas_eventos, matriz_eventos, datas, janela):
+    """
+    Soma, para cada data de 'datas', dos eventos com data em (data - janela, data], por
+    coluna: diferença de duas linhas da soma acumulada localizadas por busca binária.
+    """
+    acumulada = np.vstack([np.zeros((1, matriz_eventos.shape[1])), np.nancumsum(matriz_eventos, axis=0)])
+    ate = np.searchsorted(datas_eventos, datas, 'right')
+    antes = np.searchsorted(datas_eventos, datas - janela, 'right')
+    return acumulada[ate] - acumulada[antes]
+
+
+@metricas.cronometrado('analise.calcular')
+def _calcular(indice_cotacoes, indice_dividendos, precos_medios, janelas_medias, janela_volatilidade,
+              inicio_dividendos, versao):
+    tickers = indice_cotacoes.tickers
+    datas, matriz_cotacoes = indice_cotacoes.larga(tickers)
+    datas_div, matriz_dividendos = indice_dividendos.larga(tickers, somar=True)
+    indice = pd.DatetimeIndex(datas, name='date')
+
+    def larga(matriz):
+        return pd.DataFrame(matriz, index=indice, columns=pd.Index(tickers, name='ticker'))
+
+    cotacoes = larga(matriz_cotacoes)
+    precos = cotacoes.ffill()
+
+    # Dividendos dos últimos 12 meses em cada pregão e os yields correspondentes
+    janela = np.timedelta64(JANELA_DIVIDENDOS_DIAS, 'D')
+    dividendos_12m = _somas_moveis(datas_div, matriz_dividendos, datas, janela)
+    dividendos_12m[np.isnan(precos.to_numpy())] = np.nan
+    if inicio_dividendos is not None:
+        # Janela que começa antes dos dividendos carregados somaria só parte dos 12 meses
+        dividendos_12m[datas - janela < np.datetime64(pd.Timestamp(inicio_dividendos), 'ns')] = np.nan
+    preco_medio = np.array([precos_medios.get(ticker, np.nan) for ticker in tickers], dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dy_12m = dividendos_12m / np.where(precos.to_numpy() > 0, precos.to_numpy(), np.nan) * 100
+        yoc_12m = dividendos_12m / np.where(preco_medio > 0, preco_medio, np.nan) * 100
+
+    # Janelas sobre todas as colunas de uma vez (pandas rolling por bloco)
+    medias_moveis = {janela: precos.rolling(janela, min_periods=janela).mean() for janela in janelas_medias}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        retornos = np.log(precos).diff()
+    volatilidade = retornos.rolling(janela_volatilidade, min_periods=janela_volatilidade).std() \
+        * np.sqrt(PREGOES_POR_ANO) * 100
+    drawdown = (precos / precos.cummax() - 1) * 100
+
+    return AnaliseMovel(
+        cotacoes=cotacoes,
+        precos=precos,
+        dividendos_12m=larga(dividendos_12m),
+        dy_12m=larga(dy_12m),
+        yoc_12m=larga(yoc_12m),
+        medias_moveis=medias_moveis,
+        volatilidade=volatilidade,
+        drawdown=drawdown,
+        versao=versao,
+    )
+
+
+_cache = CacheLRU(TAMANHO_CACHE, nome='analise')
+
+
+def calcular_analise(df_cotacoes, df_dividendos, precos_medios,
+                     janelas_medias=JANELAS_MEDIAS_MOVEIS, janela_volatilidade=JANELA_VOLATILIDADE,
+                     inicio_dividendos=None) -> AnaliseMovel:
+    """
+    Calcula (ou devolve do cache) as métricas móveis de todos os ativos.
+
+    Args:
+        df_cotacoes (pd.DataFrame | SeriesPorTicker): Cotações no esquema canônico, ou o índice já construído.
+        df_dividendos (pd.DataFrame | SeriesPorTicker): Dividendos no esquema canônico, ou o índice já construído.
+        precos_medios (dict): Preço médio por ticker, base do YOC.
+        janelas_medias (tuple): Janelas das médias móveis, em pregões.
+        janela_volatilidade (int): Janela da volatilidade, em pregões.
+        inicio_dividendos (datetime.date, optional): Data desde a qual 'df_dividendos' está
+            completo (ver carrega_dados.dividendos_historicos). Os pregões cuja janela de 12
+            meses começa antes dela ficam com NaN nos dividendos e yields.
+
+    Returns:
+        AnaliseMovel: Matrizes data × ticker de cada métrica.
+    """
+    indice_cotacoes = indexar(df_cotacoes, 'valor_cotação')
+    indice_dividendos = indexar(df_dividendos, 'dividendo')
+    janelas_medias = tuple(janelas_medias)
+    chave = (indice_cotacoes.versao, indice_dividendos.versao, tuple(sorted(precos_medios.items())),
+             janelas_medias, janela_volatilidade, inicio_dividendos)
+    # A versão identifica dados e parâmetros; os gráficos derivados a usam como chave
+    versao = hashlib.sha1(repr(chave).encode('utf-8')).hexdigest()[:16]
+    return _cache.obter(chave, lambda: _calcular(indice_cotacoes, indice_dividendos, precos_medios,
+                                                 janelas_medias, janela_volatilidade, inicio_dividendos, versao))
@@ -0,0 +1,154 @@
+import os
+import tempfile
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from src import metricas
+from src.esquema import normalizar
+
+# Snapshots locais em Feather (Arrow IPC) sem compressão, lidos via memory-map
+CAMINHO_COTACOES = os.path.join('data', 'cotacoes.feather')
+CAMINHO_DIVIDENDOS = os.path.join('data', 'dividendos.feather')
+
+# Planilhas antigas, usadas apenas na migração e na exportação opcional
+CAMINHO_COTACOES_XLSX = os.path.join('data', 'dados_organizados.xlsx')
+CAMINHO_DIVIDENDOS_XLSX = os.path.join('data', 'historico_dividendos.xlsx')
+
+ESQUEMAS = {
+    'cotacoes': pa.schema([
+        ('date', pa.date32()),
+        ('ticker', pa.dictionary(pa.int32(), pa.string())),
+        ('valor_cotação', pa.float32()),
+    ]),
+    'dividendos': pa.schema([
+        ('date', pa.date32()),
+        ('ticker', pa.dictionary(pa.int32(), pa.string())),
+        ('dividendo', pa.float32()),
+    ]),
+}
+
+
+def _para_tabela(df, tipo):
+    """Converte o DataFrame (em qualquer formato aceito por esquema.normalizar) para uma tabela Arrow tipada."""
+    df = normalizar(df, tipo)
+    esquema = ESQUEMAS[tipo]
+    coluna_valor = esquema.field(2).name
+    return pa.table({
+        'date': pa.array(df['date'].to_numpy(dtype='datetime64[D]'), type=pa.date32()),
+        'ticker': pa.array(df['ticker'].astype(str), type=pa.string()).dictionary_encode(),
+        coluna_valor: pa.array(df[coluna_valor].to_numpy(), type=pa.float32()),
+    }, schema=esquema)
+
+
+def salvar_snapshot(df, caminho, tipo):
+    """
+    Grava o DataFrame como Feather de forma atômica: escreve em um arquivo temporário
+    na mesma pasta e o renomeia sobre o destino, de modo que leitores nunca vejam um
+    arquivo pela metade.
+
+    Args:
+        df (pd.DataFrame): Dados no formato date | ticker | valor.
+        caminho (str): Arquivo de destino.
+        tipo (str): 'cotacoes' ou 'dividendos'.
+    """
+    tabela = _para_tabela(df, tipo)
+    pasta = os.path.dirname(caminho) or '.'
+    os.makedirs(pasta, exist_ok=True)
+
+    descritor, temporario = tempfile.mkstemp(dir=pasta, suffix='.tmp')
+    os.close(descritor)
+    try:
+        # Sem compressão para permitir leitura por memory-map
+        feather.write_feather(tabela, temporario, compression='uncompressed')
+        os.chmod(temporario, 0o644)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+@metricas.cronometrado('armazenamento.ler_snapshot')
+def ler_snapshot(caminho, tipo) -> pd.DataFrame:
+    """
+    Lê um snapshot Feather via memory-map.
+
+    Retorna DataFrame no esquema canônico (src.esquema): date | ticker | valor
+    """
+    tabela = feather.read_table(caminho, memory_map=True)
+    if not tabela.schema.equals(ESQUEMAS[tipo]):
+        tabela = tabela.cast(ESQUEMAS[tipo])
+
+    # date32 -> datetime64 e dictionary -> category já na conversão do Arrow
+    df = tabela.to_pandas(date_as_object=False)
+    return normalizar(df, tipo)
+
+
+def exportar_excel(df_cotacoes, df_dividendos,
+                   caminho_cotacoes=CAMINHO_COTACOES_XLSX,
+                   caminho_dividendos=CAMINHO_DIVIDENDOS_XLSX):
+    """Exporta os dados também em Excel (saída opcional, não usada pelo aplicativo)."""
+    df_cotacoes.to_excel(caminho_cotacoes, index=False)
+    df_dividendos.to_excel(caminho_dividendos, index=False)
+
+
+@metricas.cronometrado('armazenamento.salvar_snapshots')
+def salvar_snapshots(df_cotacoes, df_dividendos, exportar_xlsx=False):
+    """Grava os snapshots de cotações e dividendos e, opcionalmente, as planilhas Excel."""
+    salvar_snapshot(df_cotacoes, CAMINHO_COTACOES, 'cotacoes')
+    salvar_snapshot(df_dividendos, CAMINHO_DIVIDENDOS, 'dividendos')
+    if exportar_xlsx:
+        exportar_excel(df_cotacoes, df_dividendos)
+
+
+def migrar_excel(sobrescrever=False):
+    """
+    Migração única das planilhas Excel antigas para os snapshots Feather.
+    Só converte os arquivos que ainda não existem, a menos que sobrescrever=True.
+
+    Returns:
+        list: Caminhos dos snapshots criados.
+    """
+    criados = []
+    pares = [
+        (CAMINHO_COTACOES_XLSX, CAMINHO_COTACOES, 'cotacoes'),
+        (CAMINHO_DIVIDENDOS_XLSX, CAMINHO_DIVIDENDOS, 'dividendos'),
+    ]
+    for origem, destino, tipo in pares:
+        if os.path.exists(destino) and not sobrescrever:
+            continue
+        if not os.path.exists(origem):
+            continue
+        print(f"Migrando {origem} -> {destino}")
+        salvar_snapshot(pd.read_excel(origem), destino, tipo)
+        criados.append(destino)
+    return criados
+
+
+def idade_snapshots():
+    """Idade, em segundos, do snapshot mais antigo (None se algum ainda não existir)."""
+    try:
+        gravado_em = min(os.stat(CAMINHO_COTACOES).st_mtime, os.stat(CAMINHO_DIVIDENDOS).st_mtime)
+    except FileNotFoundError:
+        return None
+    return time.time() - gravado_em
+
+
+def carregar_snapshots() -> tuple:
+    """
+    Carrega os snapshots locais de cotações e dividendos, migrando as planilhas
+    Excel na primeira execução.
+
+    Returns:
+        tuple: (df_cotacoes, df_dividendos)
+    """
+    migrar_excel()
+    return (ler_snapshot(CAMINHO_COTACOES, 'cotacoes'),
+            ler_snapshot(CAMINHO_DIVIDENDOS, 'dividendos'))
+
+
+if __name__ == '__main__':
+    # python -m src.armazenamento  -> executa a migração das planilhas
+    criados = migrar_excel()
+    print(f"{len(criados)} snapshot(s) criado(s).")
@@ -0,0 +1,157 @@
+"""
+Atualização das cotações e dividendos pela linha de comando (substitui o notebook Salva_Cotacao).
+
+Uso, a partir da raiz do projeto:
+    python -m src.atualiza_cotacoes                 # uma execução
+    python -m src.atualiza_cotacoes --intervalo 30  # repete a cada 30 minutos
+    python -m src.atualiza_cotacoes --excel --json  # exporta também as planilhas e imprime o resumo em JSON
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from contextlib import contextmanager
+from datetime import datetime
+from src.carteiras import carregar_carteiras, uniao_tickers
+from src.dados_online import REQUISICOES_POR_SEGUNDO, MAX_SIMULTANEAS
+from src.historico_local import atualizar_historico, ler_armazenados, INDISPONIVEL
+from src.armazenamento import salvar_snapshots
+from src import metricas, primeira_tela
+
+CAMINHO_TRAVA = os.path.join('data', 'atualizacao.lock')
+
+# Uma trava mais antiga que isso é considerada abandonada (execução interrompida)
+TRAVA_EXPIRADA_SEGUNDOS = 60 * 60
+
+
+class AtualizacaoEmAndamento(RuntimeError):
+    """Outra execução da atualização já está em andamento."""
+
+
+@contextmanager
+def trava_execucao(caminho=CAMINHO_TRAVA):
+    """
+    Impede execuções sobrepostas criando o arquivo de trava de forma exclusiva.
+    Funciona em Windows e Linux; travas abandonadas expiram após TRAVA_EXPIRADA_SEGUNDOS.
+    """
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    try:
+        if time.time() - os.stat(caminho).st_mtime > TRAVA_EXPIRADA_SEGUNDOS:
+            os.remove(caminho)
+    except FileNotFoundError:
+        pass
+
+    try:
+        descritor = os.open(caminho, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        raise AtualizacaoEmAndamento(f"Trava {caminho} já existe: outra atualização está em andamento.")
+
+    with os.fdopen(descritor, 'w') as arquivo:
+        arquivo.write(f"{os.getpid()} {datetime.now().isoformat()}\n")
+    try:
+        yield
+    finally:
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+
+
+def executar_atualizacao(tickers=None,
+                         requisicoes_por_segundo=REQUISICOES_POR_SEGUNDO,
+                         max_simultaneas=MAX_SIMULTANEAS,
+                         exportar_xlsx=False) -> dict:
+    """
+    Atualiza o histórico local dos tickers (padrão: todos os tickers das carteiras) e
+    regrava os snapshots (escrita atômica) com todo o histórico local, de modo que
+    atualizar só alguns tickers não apague os demais do fallback offline. Quando a
+    primeira carteira, a que a interface abre, está entre os tickers, regrava também a
+    prévia da primeira tela (src.primeira_tela).
+
+    Returns:
+        dict: Resumo da execução (duração, linhas gravadas, falhas por ticker e tickers
+              sem nenhum dado, nem no histórico local).
+    """
+    carteiras = list(carregar_carteiras().values())
+    tickers = list(tickers or uniao_tickers(carteiras))
+    iniciado_em = datetime.now().isoformat(timespec='seconds')
+    inicio = time.perf_counter()
+    relatorio = []
+    coleta = metricas.iniciar_coleta('atualiza_cotacoes')
+
+    try:
+        with trava_execucao():
+            df_cotacoes, df_dividendos, situacao = atualizar_historico(
+                tickers,
+                requisicoes_por_segundo=requisicoes_por_segundo,
+                max_simultaneas=max_simultaneas,
+                relatorio=relatorio
+            )
+            salvar_snapshots(*ler_armazenados(), exportar_xlsx=exportar_xlsx)
+            carteira = carteiras[0]
+            if set(carteira.ativos) <= set(tickers):
+                with metricas.cronometro('primeira_tela.gravar'):
+                    primeira_tela.gravar(df_cotacoes, df_dividendos, situacao, carteira.ativos,
+                                         carteira.precos_medios)
+    finally:
+        # Tempos por etapa, latências e bytes vão para o log JSON (metricas.CAMINHO_LOG),
+        # também quando a execução é interrompida (ex.: AtualizacaoEmAndamento)
+        metricas.encerrar_coleta(coleta)
+
+    falhas = {r['ticker']: r['erro'] for r in relatorio if r['status'] != 'ok'}
+    return {
+        'inicio': iniciado_em,
+        'duracao_s': round(time.perf_counter() - inicio, 3),
+        'tickers': len(tickers),
+        'linhas_cotacoes': int(len(df_cotacoes)),
+        'linhas_dividendos': int(len(df_dividendos)),
+        'falhas': falhas,
+        'sem_dados': [ticker for ticker, estado in situacao.items() if estado == INDISPONIVEL],
+    }
+
+
+def _imprimir_resumo(resumo, como_json):
+    if como_json:
+        print(json.dumps(resumo, ensure_ascii=False))
+        return
+    print(f"Atualização concluída em {resumo['duracao_s']:.1f}s: "
+          f"{resumo['linhas_cotacoes']} cotações, {resumo['linhas_dividendos']} dividendos, "
+          f"{len(resumo['falhas'])}/{resumo['tickers']} tickers com falha.")
+    for ticker, erro in resumo['falhas'].items():
+        origem = "sem histórico local" if ticker in resumo['sem_dados'] else "mantido o histórico local"
+        print(f" - {ticker}: {erro} ({origem})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Atualiza cotações e dividendos e regrava os snapshots locais.")
+    parser.add_argument('--tickers', nargs='+', help="Tickers a atualizar (padrão: todas as carteiras).")
+    parser.add_argument('--requisicoes-por-segundo', type=float, default=REQUISICOES_POR_SEGUNDO)
+    parser.add_argument('--max-simultaneas', type=int, default=MAX_SIMULTANEAS)
+    parser.add_argument('--excel', action='store_true', help="Exporta também as planilhas Excel.")
+    parser.add_argument('--json', action='store_true', help="Imprime o resumo em JSON.")
+    parser.add_argument('--intervalo', type=float, default=0,
+                        help="Minutos entre execuções; 0 executa uma única vez.")
+    args = parser.parse_args(argv)
+
+    codigo = 0
+    while True:
+        try:
+            resumo = executar_atualizacao(args.tickers, args.requisicoes_por_segundo,
+                                          args.max_simultaneas, args.excel)
+            _imprimir_resumo(resumo, args.json)
+            codigo = 1 if resumo['falhas'] else 0
+        except AtualizacaoEmAndamento as e:
+            print(e, file=sys.stderr)
+            codigo = 2
+        except Exception as e:
+            print(f"Erro na atualização: {e}", file=sys.stderr)
+            codigo = 1
+
+        if args.intervalo <= 0:
+            return codigo
+        time.sleep(args.intervalo * 60)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Avaliação da carteira a partir das posições (src.carteiras) e dos dados carregados:
+saldo bruto, valor aplicado, proventos recebidos e as duas variações, por ativo e para
+a carteira toda.
+
+As posições viram um livro de lançamentos (um por compra; a posição sem data vira um
+lançamento anterior a todo o histórico de dividendos usado) e todos os ativos são avaliados de uma vez: os
+proventos de cada lançamento saem da soma acumulada da matriz larga de dividendos
+(data × ativo), na linha da data da compra, e os totais por ativo de np.bincount. O
+resultado fica em cache pela versão das posições e dos dados.
+"""
+import hashlib
+import numpy as np
+import pandas as pd
+from src.indice_series import indexar
+from src.cache_lru import CacheLRU
+from src import metricas
+
+# Avaliações mantidas em memória (uma por carteira e versão dos dados)
+TAMANHO_CACHE = 8
+
+COLUNAS_AVALIACAO = ["Quantidade", "Preço Médio", "Cotação Atual", "Valor Aplicado", "Saldo Bruto",
+                     "Proventos Recebidos", "Variação (%)", "Variação Cotas (%)"]
+
+
+class Lancamentos:
+    """
+    Livro de posições em arrays, com um lançamento por compra.
+
+    Args:
+        tickers (list): Ativos com posição, na ordem da carteira.
+        colunas (np.ndarray): Índice do ativo (em 'tickers') de cada lançamento.
+        datas (np.ndarray): Data de cada compra (datetime64[D]; NaT na posição sem data).
+        quantidades (np.ndarray): Cotas de cada lançamento.
+        precos (np.ndarray): Preço pago por cota em cada lançamento.
+    """
+
+    def __init__(self, tickers, colunas, datas, quantidades, precos):
+        self.tickers = list(tickers)
+        self.colunas = np.asarray(colunas, dtype='int64')
+        self.datas = np.asarray(datas, dtype='datetime64[D]')
+        self.quantidades = np.asarray(quantidades, dtype='float64')
+        self.precos = np.asarray(precos, dtype='float64')
+
+        resumo = hashlib.sha1(repr(self.tickers).encode('utf-8'))
+        for array in (self.colunas, self.datas.view('int64'), self.quantidades, self.precos):
+            resumo.update(array.tobytes())
+        self.versao = resumo.hexdigest()[:16]
+
+    def __len__(self):
+        return len(self.colunas)
+
+
+def compras_anteriores(carteira, inicio) -> dict:
+    """
+    Ativos com compras datadas antes de 'inicio' (datetime.date), com a data da primeira
+    compra: os dividendos carregados não cobrem todo o período dessas posições.
+    """
+    primeiras = {ticker: min(data for data, _, _ in compras) for ticker, compras in carteira.compras.items() if compras}
+    return {ticker: data for ticker, data in primeiras.items() if data < inicio}
+
+
+def lancamentos(carteira) -> Lancamentos:
+    """
+    Monta o livro de lançamentos de uma carteira: as compras datadas de cada ativo ou,
+    sem elas, a quantidade informada ao preço médio, sem data. Ativos sem quantidade
+    ficam de fora.
+    """
+    tickers, colunas, datas, quantidades, precos = [], [], [], [], []
+    for ticker in carteira.ativos:
+        if ticker in carteira.compras:
+            compras = carteira.compras[ticker]
+        elif ticker in carteira.quantidades:
+            compras = [(None, carteira.quantidades[ticker], carteira.precos_medios.get(ticker, np.nan))]
+        else:
+            continue
+        for data, quantidade, preco in compras:
+            colunas.append(len(tickers))
+            datas.append(np.datetime64('NaT') if data is None else np.datetime64(data, 'D'))
+            quantidades.append(quantidade)
+            precos.append(preco)
+        tickers.append(ticker)
+    return Lancamentos(tickers, colunas, datas, quantidades, precos)
+
+
+class Avaliacao:
+    """
+    - por_ativo: DataFrame com uma linha por ativo com posição (colunas COLUNAS_AVALIACAO)
+    - total: Series com Valor Aplicado, Saldo Bruto, Proventos Recebidos e as duas variações
+             da carteira, somando apenas os ativos com cotação
+    - versao: identifica as posições e os dados usados no cálculo
+    """
+
+    def __init__(self, por_ativo, total, versao):
+        self.por_ativo = por_ativo
+        self.total = total
+        self.versao = versao
+
+    @property
+    def vazia(self):
+        return self.por_ativo.empty
+
+
+def _variacoes(saldo, aplicado, proventos):
+    # Variação com proventos (sobre o saldo) e variação das cotas (sobre o valor aplicado), em %
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variacao = (saldo - (aplicado - proventos)) / np.where(saldo != 0, saldo, np.nan) * 100
+        variacao_cotas = (saldo - aplicado) / np.where(aplicado != 0, aplicado, np.nan) * 100
+    return variacao, variacao_cotas
+
+
+@metricas.cronometrado('avaliacao.calcular')
+def _calcular(livro, indice_cotacoes, indice_dividendos, versao):
+    tickers = livro.tickers
+    n = len(tickers)
+    colunas = livro.colunas
+    quantidade = np.bincount(colunas, livro.quantidades, minlength=n)
+    aplicado = np.bincount(colunas, livro.quantidades * livro.precos, minlength=n)
+
+    # Proventos por cota de cada lançamento: os dividendos com data (ex) posterior à compra,
+    # ou todos os do histórico na posição sem data
+    datas_div, matriz = indice_dividendos.larga(tickers, somar=True)
+    acumulada = np.vstack([np.zeros((1, n)), np.nancumsum(matriz, axis=0)])
+    sem_data = np.isnat(livro.datas)
+    linhas = np.searchsorted(datas_div, np.where(sem_data, np.datetime64(0, 'D'), livro.datas)
+                             .astype('datetime64[ns]'), 'right')
+    linhas[sem_data] = 0
+    por_cota = acumulada[-1, colunas] - acumulada[linhas, colunas]
+    proventos = np.bincount(colunas, livro.quantidades * por_cota, minlength=n)
+
+    cotacao = indice_cotacoes.ultimos_valores(tickers).astype('float64')
+    saldo = quantidade * cotacao
+    variacao, variacao_cotas = _variacoes(saldo, aplicado, proventos)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        preco_medio = aplicado / np.where(quantidade != 0, quantidade, np.nan)
+
+    por_ativo = pd.DataFrame({
+        "Quantidade": quantidade,
+        "Preço Médio": preco_medio,
+        "Cotação Atual": cotacao,
+        "Valor Aplicado": aplicado,
+        "Saldo Bruto": saldo,
+        "Proventos Recebidos": proventos,
+        "Variação (%)": variacao,
+        "Variação Cotas (%)": variacao_cotas,
+    }, index=pd.Index(tickers, name="Ativo"))[COLUNAS_AVALIACAO]
+
+    # Totais só com os ativos cotados, para não comparar saldo parcial com aplicado total
+    cotados = ~np.isnan(cotacao)
+    totais = [saldo[cotados].sum(), aplicado[cotados].sum(), proventos[cotados].sum()]
+    variacao_total, variacao_cotas_total = _variacoes(*(np.array(valor) for valor in totais))
+    total = pd.Series({
+        "Valor Aplicado": totais[1],
+        "Saldo Bruto": totais[0],
+        "Proventos Recebidos": totais[2],
+        "Variação (%)": float(variacao_total),
+        "Variação Cotas (%)": float(variacao_cotas_total),
+    })
+    return Avaliacao(por_ativo, total, versao)
+
+
+_cache = CacheLRU(TAMANHO_CACHE, nome='avaliacao')
+
+
+def calcular_avaliacao(carteira, df_cotacoes, df_dividendos) -> Avaliacao:
+    """
+    Calcula (ou devolve do cache) a avaliação da carteira.
+
+    Args:
+        carteira (Carteira | Lancamentos): Carteira (src.carteiras) ou o livro já montado.
+        df_cotacoes (pd.DataFrame | SeriesPorTicker): Cotações no esquema canônico, ou o índice já construído.
+        df_dividendos (pd.DataFrame | SeriesPorTicker): Dividendos no esquema canônico, ou o índice já construído.
+
+    Returns:
+        Avaliacao: Valores por ativo e totais da carteira. Os proventos consideram apenas os
+                   dividendos de 'df_dividendos': para compras anteriores a eles, complete-os
+                   antes (ver compras_anteriores e carrega_dados.dividendos_para_avaliacao).
+    """
+    livro = carteira if isinstance(carteira, Lancamentos) else lancamentos(carteira)
+    indice_cotacoes = indexar(df_cotacoes, 'valor_cotação')
+    indice_dividendos = indexar(df_dividendos, 'dividendo')
+    chave = (livro.versao, indice_cotacoes.versao, indice_dividendos.versao)
+    versao = hashlib.sha1(repr(chave).encode('utf-8')).hexdigest()[:16]
+    return _cache.obter(chave, lambda: _calcular(livro, indice_cotacoes, indice_dividendos, versao))
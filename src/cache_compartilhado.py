@@ -0,0 +1,314 @@
+import os
+import time
+import pickle
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# Cache em disco compartilhado entre sessões e processos do aplicativo
+PASTA_CACHE = os.path.join('data', 'cache')
+
+# Tamanho máximo ocupado pelo cache em disco; as entradas menos usadas saem primeiro
+TAMANHO_MAXIMO_BYTES = 200 * 1024 * 1024
+
+# O espaço ocupado é somado em memória a cada gravação; a pasta é relida só ao passar do
+# limite ou a cada tantas gravações (para contar também as de outros processos)
+GRAVACOES_POR_RECONTAGEM = 256
+
+# Entradas vencidas há mais tempo que isso não são mais servidas enquanto atualizam
+IDADE_MAXIMA_OBSOLETA_SEGUNDOS = 24 * 60 * 60
+
+# Uma trava mais antiga que isso é considerada abandonada (processo interrompido)
+TRAVA_EXPIRADA_SEGUNDOS = 10 * 60
+
+_memoria = {}
+_em_atualizacao = set()
+_lock = threading.Lock()
+
+# Caminho absoluto da pasta -> [bytes ocupados, gravações desde a última recontagem]
+_ocupado = {}
+
+
+def chave_cache(tickers) -> str:
+    """Hash estável do conjunto de tickers (independe da ordem e de repetições)."""
+    texto = '\n'.join(sorted(set(tickers)))
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()[:32]
+
+
+def _caminho(chave, pasta):
+    return os.path.join(pasta, f'{chave}.pkl')
+
+
+def ler(chave, ttl_segundos, pasta=PASTA_CACHE):
+    """
+    Lê uma entrada do cache.
+
+    Returns:
+        tuple: (dados, estado), onde estado é 'fresco', 'obsoleto' ou None (sem entrada utilizável).
+    """
+    caminho = _caminho(chave, pasta)
+    try:
+        info = os.stat(caminho)
+    except FileNotFoundError:
+        # Removida por outro processo: a cópia em memória também não vale mais
+        with _lock:
+            _memoria.pop(chave, None)
+        return None, None
+
+    # A data de modificação do arquivo é a data de criação da entrada
+    idade = time.time() - info.st_mtime
+    if idade > ttl_segundos + IDADE_MAXIMA_OBSOLETA_SEGUNDOS:
+        with _lock:
+            _memoria.pop(chave, None)
+        return None, None
+
+    with _lock:
+        em_memoria = _memoria.get(chave)
+    if em_memoria is not None and em_memoria[0] == info.st_mtime:
+        dados = em_memoria[1]
+    else:
+        try:
+            with open(caminho, 'rb') as arquivo:
+                dados = pickle.load(arquivo)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None, None
+        with _lock:
+            _memoria[chave] = (info.st_mtime, dados)
+
+    # Registra o acesso (atime) para a remoção das entradas menos usadas
+    try:
+        os.utime(caminho, (time.time(), info.st_mtime))
+    except OSError:
+        pass
+
+    return dados, ('fresco' if idade <= ttl_segundos else 'obsoleto')
+
+
+def gravar(chave, dados, pasta=PASTA_CACHE, tamanho_maximo=TAMANHO_MAXIMO_BYTES):
+    """Grava a entrada de forma atômica (arquivo temporário + rename) e aplica o limite de tamanho."""
+    os.makedirs(pasta, exist_ok=True)
+    caminho = _caminho(chave, pasta)
+    descritor, temporario = tempfile.mkstemp(dir=pasta, suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'wb') as arquivo:
+            pickle.dump(dados, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            anterior = os.stat(caminho).st_size
+        except FileNotFoundError:
+            anterior = 0
+        tamanho = os.stat(temporario).st_size
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+    with _lock:
+        _memoria[chave] = (os.stat(caminho).st_mtime, dados)
+        ocupado = _ocupado.get(os.path.abspath(pasta))
+        if ocupado is not None:
+            ocupado[0] += tamanho - anterior
+            ocupado[1] += 1
+    remover_excedentes(pasta, tamanho_maximo)
+
+
+def _recontar(pasta):
+    # Lê a pasta: (atime, tamanho, nome) de cada entrada e o total ocupado
+    entradas = []
+    with os.scandir(pasta) as itens:
+        for item in itens:
+            if not item.name.endswith('.pkl'):
+                continue
+            try:
+                info = item.stat()
+            except FileNotFoundError:
+                continue
+            entradas.append((info.st_atime, info.st_size, item.name))
+    return entradas, sum(tamanho for _, tamanho, _ in entradas)
+
+
+def remover_excedentes(pasta=PASTA_CACHE, tamanho_maximo=TAMANHO_MAXIMO_BYTES):
+    """
+    Remove as entradas acessadas há mais tempo até o cache caber em 'tamanho_maximo',
+    junto com as cópias delas em memória. Usa o total mantido em memória e só lê a pasta
+    quando ele passa do limite (ou a cada GRAVACOES_POR_RECONTAGEM gravações), então pode
+    ser chamada a cada gravação.
+    """
+    pasta_absoluta = os.path.abspath(pasta)
+    with _lock:
+        ocupado = _ocupado.get(pasta_absoluta)
+        if ocupado is not None and ocupado[0] <= tamanho_maximo and ocupado[1] < GRAVACOES_POR_RECONTAGEM:
+            return
+        try:
+            entradas, total = _recontar(pasta)
+        except FileNotFoundError:
+            _ocupado.pop(pasta_absoluta, None)
+            return
+        if total > tamanho_maximo:
+            for _, tamanho, nome in sorted(entradas):
+                if total <= tamanho_maximo:
+                    break
+                try:
+                    os.remove(os.path.join(pasta, nome))
+                    total -= tamanho
+                except FileNotFoundError:
+                    continue
+                _memoria.pop(nome[:-len('.pkl')], None)
+        _ocupado[pasta_absoluta] = [total, 0]
+
+
+def _reservar(chave, pasta):
+    """
+    Reserva a atualização da chave nesta thread: marca a chave no processo e cria
+    uma trava em disco (criação exclusiva de arquivo) para os demais processos.
+    Retorna False se outra atualização já estiver em andamento.
+    """
+    with _lock:
+        if chave in _em_atualizacao:
+            return False
+        _em_atualizacao.add(chave)
+
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f'{chave}.lock')
+    try:
+        if time.time() - os.stat(caminho).st_mtime > TRAVA_EXPIRADA_SEGUNDOS:
+            os.remove(caminho)
+    except FileNotFoundError:
+        pass
+    try:
+        os.close(os.open(caminho, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        with _lock:
+            _em_atualizacao.discard(chave)
+        return False
+
+
+def _liberar(chave, pasta):
+    try:
+        os.remove(os.path.join(pasta, f'{chave}.lock'))
+    except FileNotFoundError:
+        pass
+    with _lock:
+        _em_atualizacao.discard(chave)
+
+
+@contextmanager
+def reserva(chave, pasta=PASTA_CACHE):
+    """
+    Context manager com a mesma coordenação de atualizar(), para quem grava a entrada
+    por conta própria (ex.: a carga progressiva). Entrega True se a atualização da
+    chave ficou reservada para o bloco, ou False se outra já estiver em andamento.
+    """
+    reservada = _reservar(chave, pasta)
+    try:
+        yield reservada
+    finally:
+        if reservada:
+            _liberar(chave, pasta)
+
+
+def atualizar(chave, carregar, ttl_segundos, pasta=PASTA_CACHE, espera_maxima=120):
+    """
+    Executa 'carregar()' e grava o resultado, garantindo uma única atualização por chave.
+    Se outra thread ou processo já estiver atualizando a mesma chave, aguarda o resultado
+    dela em vez de repetir o download.
+
+    Returns:
+        Os dados carregados (ou os gravados pela atualização concorrente).
+    """
+    limite = time.time() + espera_maxima
+    while not _reservar(chave, pasta):
+        # Outra atualização em andamento: espera ela gravar uma entrada fresca
+        dados, estado = ler(chave, ttl_segundos, pasta)
+        if estado == 'fresco':
+            return dados
+        if time.time() > limite:
+            # Tempo de espera esgotado: carrega sem coordenação
+            dados = carregar()
+            gravar(chave, dados, pasta)
+            return dados
+        time.sleep(0.2)
+
+    try:
+        # A reserva pode ter sido obtida logo depois de outra atualização gravar a entrada
+        dados, estado = ler(chave, ttl_segundos, pasta)
+        if estado == 'fresco':
+            return dados
+        dados = carregar()
+        gravar(chave, dados, pasta)
+        return dados
+    finally:
+        _liberar(chave, pasta)
+
+
+def reservar(chaves, pasta=PASTA_CACHE) -> list:
+    """
+    Reserva, com a mesma coordenação de reserva(), cada chave que não estiver em
+    atualização e devolve as reservadas; libere-as depois com liberar(). Serve para
+    buscar juntos vários itens gravados em chaves próprias (ex.: um por ticker) sem
+    repetir os que outra thread ou processo já está buscando.
+    """
+    reservadas = []
+    for chave in chaves:
+        if _reservar(chave, pasta):
+            reservadas.append(chave)
+    return reservadas
+
+
+def liberar(chaves, pasta=PASTA_CACHE):
+    for chave in chaves:
+        _liberar(chave, pasta)
+
+
+@contextmanager
+def reservas(chaves, pasta=PASTA_CACHE):
+    """Context manager de reservar()/liberar(): entrega a lista das chaves reservadas."""
+    reservadas = reservar(chaves, pasta)
+    try:
+        yield reservadas
+    finally:
+        liberar(reservadas, pasta)
+
+
+def atualizar_em_segundo_plano(chave, carregar, pasta=PASTA_CACHE, salvar=None):
+    """
+    Dispara a atualização da chave em uma thread separada (stale-while-revalidate).
+    Atualizações repetidas da mesma chave, neste ou em outro processo, são ignoradas
+    enquanto uma estiver em andamento. 'salvar(dados)' substitui a gravação padrão na
+    própria chave.
+
+    Returns:
+        bool: True se uma nova atualização foi iniciada.
+    """
+    def salvar_na_chave(dados):
+        gravar(chave, dados, pasta)
+
+    return bool(atualizar_varias_em_segundo_plano([chave], lambda reservadas: carregar(),
+                                                  salvar or salvar_na_chave, pasta))
+
+
+def atualizar_varias_em_segundo_plano(chaves, carregar, salvar, pasta=PASTA_CACHE) -> list:
+    """
+    Como atualizar_em_segundo_plano, para várias chaves carregadas juntas (ex.: uma por
+    ticker): reserva as que não estão em atualização e, em uma thread separada, executa
+    salvar(carregar(reservadas)). As demais ficam com quem já as está atualizando.
+
+    Returns:
+        list: As chaves reservadas para esta atualização (vazia se nenhuma foi iniciada).
+    """
+    reservadas = reservar(chaves, pasta)
+    if not reservadas:
+        return reservadas
+
+    def tarefa():
+        try:
+            salvar(carregar(reservadas))
+        except Exception as e:
+            print(f"Erro ao atualizar o cache em segundo plano: {e}")
+        finally:
+            liberar(reservadas, pasta)
+
+    threading.Thread(target=tarefa, name=f'atualiza-cache-{reservadas[0][:8]}', daemon=True).start()
+    return reservadas
@@ -0,0 +1,54 @@
+import pandas as pd
+from src.grafico import (gerar_grafico, gerar_grafico_dividendos, gerar_grafico_medias_moveis,
+                         gerar_grafico_yields, gerar_grafico_risco)
+from src.indice_series import indexar
+from src.cache_lru import CacheLRU
+
+# Quantidade máxima de figuras mantidas em memória (todas as sessões do processo)
+TAMANHO_MAXIMO = 64
+
+
+_cache = CacheLRU(TAMANHO_MAXIMO, nome='cache_figuras')
+
+
+def grafico_cotacao(ticker, num_dias, precos_medios, df_cotacoes, max_pontos=None, barras=None, modo='linha'):
+    """
+    Versão memoizada de gerar_grafico. A chave inclui a versão dos dados carregados
+    (e das barras OHLCV, quando informadas), então uma nova carga nunca reaproveita
+    figuras antigas.
+    """
+    indice = indexar(df_cotacoes, 'valor_cotação')
+    chave = ('cotacao', ticker, num_dias, precos_medios.get(ticker), max_pontos, indice.versao,
+             None if barras is None else barras.versao, modo)
+    return _cache.obter(chave, lambda: gerar_grafico(ticker, num_dias, precos_medios, indice, max_pontos,
+                                                     barras=barras, modo=modo))
+
+
+def grafico_dividendos(ticker, meses, df_dividendos):
+    """
+    Versão memoizada de gerar_grafico_dividendos. Como a janela de meses é relativa
+    a hoje, a data atual também faz parte da chave.
+    """
+    indice = indexar(df_dividendos, 'dividendo')
+    chave = ('dividendos', ticker, meses, pd.Timestamp.now().date(), indice.versao)
+    return _cache.obter(chave, lambda: gerar_grafico_dividendos(ticker, meses, indice))
+
+
+def grafico_analise(tipo, ticker, num_dias, analise, max_pontos=None):
+    """
+    Versão memoizada dos gráficos de análise móvel: 'medias_moveis', 'yields' ou 'risco'.
+    A chave inclui a versão da análise (dados, preços médios e janelas).
+    """
+    chave = ('analise', tipo, ticker, num_dias, max_pontos, analise.versao)
+    if tipo == 'medias_moveis':
+        return _cache.obter(chave, lambda: gerar_grafico_medias_moveis(ticker, num_dias, analise, max_pontos))
+    if tipo == 'yields':
+        return _cache.obter(chave, lambda: gerar_grafico_yields(ticker, num_dias, analise))
+    if tipo == 'risco':
+        return _cache.obter(chave, lambda: gerar_grafico_risco(ticker, num_dias, analise))
+    raise ValueError(f"Tipo de gráfico de análise desconhecido: {tipo}")
+
+
+def estatisticas():
+    """Contadores de acertos, faltas e itens do cache de figuras."""
+    return _cache.estatisticas()
@@ -0,0 +1,49 @@
+import threading
+from collections import OrderedDict
+from src import metricas
+
+
+class CacheLRU:
+    """
+    Cache em memória com remoção da entrada usada há mais tempo (LRU) e
+    contadores de acertos/faltas. Seguro para uso entre as threads das sessões.
+
+    Args:
+        tamanho_maximo (int): Entradas mantidas.
+        nome (str): Prefixo dos contadores em src.metricas.
+    """
+
+    def __init__(self, tamanho_maximo, nome='cache'):
+        self.tamanho_maximo = tamanho_maximo
+        self.nome = nome
+        self.acertos = 0
+        self.faltas = 0
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave, criar):
+        """Retorna o valor da chave, chamando criar() apenas quando ela não está no cache."""
+        with self._lock:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                metricas.contar(f'{self.nome}.acertos')
+                return self._itens[chave]
+            self.faltas += 1
+        metricas.contar(f'{self.nome}.faltas')
+
+        valor = criar()
+        with self._lock:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            return {'acertos': self.acertos, 'faltas': self.faltas, 'itens': len(self._itens)}
@@ -0,0 +1,218 @@
+import os
+import time
+import zlib
+import pickle
+import hashlib
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone, time as horario
+
+# Respostas brutas do endpoint chart, uma por arquivo (abaixo do cache compartilhado)
+PASTA_CACHE = os.path.join('data', 'cache', 'http')
+
+# Limite de espaço em disco; ao passar dele, saem as respostas acessadas há mais tempo
+TAMANHO_MAXIMO_BYTES = 50 * 1024 * 1024
+
+# O espaço ocupado é somado em memória a cada gravação; a pasta é relida só ao passar do
+# limite ou a cada tantas gravações (para contar também as de outros processos)
+GRAVACOES_POR_RECONTAGEM = 256
+
+# Pregão da B3 (horário de Brasília), de segunda a sexta
+FUSO_B3 = timezone(timedelta(hours=-3))
+ABERTURA_PREGAO = horario(10, 0)
+FECHAMENTO_PREGAO = horario(18, 30)
+
+# Validade de uma resposta com o pregão aberto; fechado, ela vale até a próxima abertura
+TTL_PREGAO_ABERTO_SEGUNDOS = 5 * 60
+
+_EXTENSAO = '.resp'
+_lock = threading.Lock()
+
+# Caminho absoluto da pasta -> [bytes ocupados, gravações desde a última recontagem]
+_ocupado = {}
+
+
+def chave(ticker, params) -> str:
+    """
+    Chave da resposta: (ticker, período, intervalo, eventos). O período é arredondado
+    para dias, pois period2 ("agora") muda a cada chamada.
+    """
+    partes = (
+        ticker,
+        int(params.get('period1', 0)) // 86400,
+        int(params.get('period2', 0)) // 86400,
+        params.get('interval', ''),
+        params.get('events', ''),
+    )
+    return hashlib.sha256(repr(partes).encode('utf-8')).hexdigest()[:32]
+
+
+def pregao_aberto(agora=None) -> bool:
+    """Indica se o pregão da B3 está aberto em 'agora' (datetime com fuso; padrão: agora)."""
+    agora = (agora or datetime.now(timezone.utc)).astimezone(FUSO_B3)
+    return agora.weekday() < 5 and ABERTURA_PREGAO <= agora.time() < FECHAMENTO_PREGAO
+
+
+def ttl_segundos(agora=None) -> float:
+    """
+    Validade de uma resposta obtida em 'agora': curta com o pregão aberto; com ele
+    fechado, os preços não mudam até a próxima abertura (feriados não são considerados).
+    """
+    agora = (agora or datetime.now(timezone.utc)).astimezone(FUSO_B3)
+    if pregao_aberto(agora):
+        return TTL_PREGAO_ABERTO_SEGUNDOS
+
+    abertura = datetime.combine(agora.date(), ABERTURA_PREGAO, tzinfo=FUSO_B3)
+    if agora >= abertura:
+        abertura += timedelta(days=1)
+    while abertura.weekday() >= 5:
+        abertura += timedelta(days=1)
+    return max(TTL_PREGAO_ABERTO_SEGUNDOS, (abertura - agora).total_seconds())
+
+
+def _caminho(chave_resposta, pasta):
+    return os.path.join(pasta, chave_resposta + _EXTENSAO)
+
+
+def ler(chave_resposta, pasta=PASTA_CACHE):
+    """
+    Lê a entrada da resposta, mesmo vencida (ela ainda serve para revalidação).
+
+    Returns:
+        dict | None: {'corpo' (zlib), 'expira' (epoch), 'etag', 'ultima_modificacao'}.
+    """
+    caminho = _caminho(chave_resposta, pasta)
+    try:
+        with open(caminho, 'rb') as arquivo:
+            entrada = pickle.load(arquivo)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+    # Registra o acesso (atime) para a remoção das entradas menos usadas
+    try:
+        os.utime(caminho, (time.time(), os.stat(caminho).st_mtime))
+    except OSError:
+        pass
+    return entrada
+
+
+def valida(entrada) -> bool:
+    """Indica se a entrada ainda está dentro da validade."""
+    return entrada is not None and time.time() < entrada['expira']
+
+
+def conteudo(entrada) -> bytes:
+    """Corpo original (descomprimido) da resposta."""
+    return zlib.decompress(entrada['corpo'])
+
+
+def cabecalhos_condicionais(entrada) -> dict:
+    """Cabeçalhos If-None-Match / If-Modified-Since para revalidar uma entrada vencida."""
+    cabecalhos = {}
+    if entrada is not None:
+        if entrada.get('etag'):
+            cabecalhos['If-None-Match'] = entrada['etag']
+        if entrada.get('ultima_modificacao'):
+            cabecalhos['If-Modified-Since'] = entrada['ultima_modificacao']
+    return cabecalhos
+
+
+def gravar(chave_resposta, corpo, etag=None, ultima_modificacao=None,
+           pasta=PASTA_CACHE, tamanho_maximo=TAMANHO_MAXIMO_BYTES):
+    """Grava a resposta comprimida de forma atômica e aplica o limite de tamanho."""
+    entrada = {
+        'corpo': zlib.compress(corpo, 6),
+        'expira': time.time() + ttl_segundos(),
+        'etag': etag,
+        'ultima_modificacao': ultima_modificacao,
+    }
+    _salvar(chave_resposta, entrada, pasta)
+    remover_excedentes(pasta, tamanho_maximo)
+    return entrada
+
+
+def renovar(chave_resposta, entrada, pasta=PASTA_CACHE):
+    """Estende a validade de uma entrada confirmada pelo servidor (HTTP 304)."""
+    entrada = {**entrada, 'expira': time.time() + ttl_segundos()}
+    _salvar(chave_resposta, entrada, pasta)
+    return entrada
+
+
+def expirar(pasta=PASTA_CACHE):
+    """Marca todas as respostas como vencidas: a próxima leitura de cada uma é revalidada."""
+    try:
+        nomes = [nome for nome in os.listdir(pasta) if nome.endswith(_EXTENSAO)]
+    except FileNotFoundError:
+        return
+    for nome in nomes:
+        entrada = ler(nome[:-len(_EXTENSAO)], pasta)
+        if entrada is not None:
+            _salvar(nome[:-len(_EXTENSAO)], {**entrada, 'expira': 0}, pasta)
+
+
+def _salvar(chave_resposta, entrada, pasta):
+    os.makedirs(pasta, exist_ok=True)
+    caminho = _caminho(chave_resposta, pasta)
+    descritor, temporario = tempfile.mkstemp(dir=pasta, suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'wb') as arquivo:
+            pickle.dump(entrada, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            anterior = os.stat(caminho).st_size
+        except FileNotFoundError:
+            anterior = 0
+        tamanho = os.stat(temporario).st_size
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+    with _lock:
+        ocupado = _ocupado.get(os.path.abspath(pasta))
+        if ocupado is not None:
+            ocupado[0] += tamanho - anterior
+            ocupado[1] += 1
+
+
+def _recontar(pasta):
+    # Lê a pasta: (atime, tamanho, caminho) de cada resposta e o total ocupado
+    entradas = []
+    with os.scandir(pasta) as itens:
+        for item in itens:
+            if not item.name.endswith(_EXTENSAO):
+                continue
+            try:
+                info = item.stat()
+            except FileNotFoundError:
+                continue
+            entradas.append((info.st_atime, info.st_size, item.path))
+    return entradas, sum(tamanho for _, tamanho, _ in entradas)
+
+
+def remover_excedentes(pasta=PASTA_CACHE, tamanho_maximo=TAMANHO_MAXIMO_BYTES):
+    """
+    Remove as respostas acessadas há mais tempo até o cache caber em 'tamanho_maximo'.
+    Usa o total mantido em memória e só lê a pasta quando ele passa do limite (ou a cada
+    GRAVACOES_POR_RECONTAGEM gravações), então pode ser chamada a cada gravação.
+    """
+    pasta_absoluta = os.path.abspath(pasta)
+    with _lock:
+        ocupado = _ocupado.get(pasta_absoluta)
+        if ocupado is not None and ocupado[0] <= tamanho_maximo and ocupado[1] < GRAVACOES_POR_RECONTAGEM:
+            return
+        try:
+            entradas, total = _recontar(pasta)
+        except FileNotFoundError:
+            _ocupado.pop(pasta_absoluta, None)
+            return
+        if total > tamanho_maximo:
+            for _, tamanho, caminho in sorted(entradas):
+                if total <= tamanho_maximo:
+                    break
+                try:
+                    os.remove(caminho)
+                    total -= tamanho
+                except FileNotFoundError:
+                    continue
+        _ocupado[pasta_absoluta] = [total, 0]
@@ -1,65 +1,493 @@
+import time
+from datetime import date, timedelta
 import pandas as pd
 import streamlit as st
-from src.dados_online import buscar_dados_cotacoes_yahoo,buscar_dividendos_yahoo
-from datetime import datetime, timedelta
+from src.historico_local import atualizar_historico, iterar_historico, ATUALIZADO, LOCAL, INDISPONIVEL, DIAS_DIVIDENDOS
+from src.dados_online import buscar_dividendos_yahoo
+from src.armazenamento import carregar_snapshots, idade_snapshots
+from src.esquema import normalizar, validar, vazio
+from src.indice_series import indexar
+from src.analise import JANELA_DIVIDENDOS_DIAS
+from src.cache_lru import CacheLRU
+from src import cache_compartilhado, metricas
 
 CACHE_EXPIRATION_MINUTES = 30
 
-def carregar_dados(ativos_config, use_cache=True):
+# Dados incompletos (algum ticker veio do histórico local ou faltou) expiram antes
+CACHE_INCOMPLETO_MINUTES = 5
+
+# Espera máxima pelos tickers que outra sessão ou processo já está buscando
+ESPERA_MAXIMA_SEGUNDOS = 120
+
+# Conjuntos de tickers combinados mantidos em memória (ex.: uma carteira por sessão)
+TAMANHO_CACHE_COMBINADOS = 8
+
+# Validade dos dividendos anteriores ao histórico carregado (compras antigas na avaliação)
+CACHE_PROVENTOS_HORAS = 12
+
+
+def _situacao(df_cotacoes, tickers, estado):
+    # Tickers com cotações recebem 'estado'; os demais ficam indisponíveis
+    presentes = set(df_cotacoes['ticker'].unique())
+    return {ticker: estado if ticker in presentes else INDISPONIVEL for ticker in tickers}
+
+
+def _snapshot_recente(ativos_config):
     """
-    Carrega os dados de cotações e dividendos, com opção de usar ou não o cache do Streamlit.
-    O cache expira após um período definido.  Adiciona tela de loading.
+    Retorna os snapshots gravados pela atualização agendada (src.atualiza_cotacoes) se
+    forem mais novos que CACHE_EXPIRATION_MINUTES e cobrirem todos os tickers; senão None.
+    """
+    idade = idade_snapshots()
+    if idade is None or idade > CACHE_EXPIRATION_MINUTES * 60:
+        return None
 
-    Args:
-        ativos_config (dict): Configurações para buscar os ativos online.
-        use_cache (bool, optional): Indica se deve usar o cache do Streamlit. Padrão é True.
+    df_cotacoes, df_dividendos = carregar_snapshots()
+    if not set(ativos_config) <= set(df_cotacoes['ticker'].cat.categories):
+        return None
+    df_cotacoes = normalizar(df_cotacoes[df_cotacoes['ticker'].isin(ativos_config)], 'cotacoes')
+    df_dividendos = normalizar(df_dividendos[df_dividendos['ticker'].isin(ativos_config)], 'dividendos')
+    return df_cotacoes, df_dividendos, _situacao(df_cotacoes, ativos_config, ATUALIZADO)
+
+
+def _buscar_dados_online(ativos_config):
+    """
+    Busca os dados online (histórico incremental); tickers que falharem ficam com o
+    histórico local. Se a busca inteira falhar, usa os snapshots locais.
+    """
+    try:
+        print("Tentando carregar dados online...")
+        # Carrega os dados online, baixando apenas o trecho que falta no histórico local
+        dados = atualizar_historico(ativos_config)
+        print("Dados online carregados com sucesso!")
+        return dados
+    except Exception as e:
+        print(f"Erro ao carregar dados online: {e}")
+        print("Tentando carregar dados locais...")
+        # Carrega os snapshots locais (Feather, lidos via memory-map)
+        try:
+            df_cotacoes, df_dividendos = carregar_snapshots()
+        except Exception as e_local:
+            print(f"Erro ao carregar dados locais: {e_local}")
+            print("Falha ao carregar os dados online e locais.")
+            raise
+        print("Dados locais carregados com sucesso!")
+        return df_cotacoes, df_dividendos, _situacao(df_cotacoes, ativos_config, LOCAL)
+
+
+@metricas.cronometrado('carrega_dados.buscar')
+def _buscar_dados(ativos_config):
+    """
+    Usa o snapshot pré-gerado pela atualização agendada quando ele está recente; caso
+    contrário busca os dados online, com os snapshots locais como reserva.
+    Não usa nenhuma chamada do Streamlit, pois também roda na atualização em segundo plano.
+    Os DataFrames são validados aqui, uma única vez, contra o esquema canônico (src.esquema),
+    e os índices por ticker (src.indice_series) já ficam prontos.
+
+    Returns:
+        tuple: (df_cotacoes, df_dividendos, situacao), com situacao = {ticker: ATUALIZADO |
+               LOCAL | INDISPONIVEL} (src.historico_local).
+    """
+    dados = _snapshot_recente(ativos_config)
+    if dados is not None:
+        print("Usando o snapshot gerado pela atualização agendada.")
+    else:
+        dados = _buscar_dados_online(ativos_config)
+
+    df_cotacoes, df_dividendos = validar(dados[0], 'cotacoes'), validar(dados[1], 'dividendos')
+
+    # Constrói os índices por ticker junto com a carga, para os gráficos e a tabela
+    indexar(df_cotacoes, 'valor_cotação')
+    indexar(df_dividendos, 'dividendo')
+    return df_cotacoes, df_dividendos, dados[2]
+
+
+def incompleto(dados):
+    """Indica se algum ticker dos dados carregados não foi atualizado agora."""
+    return any(estado != ATUALIZADO for estado in dados[2].values())
+
+
+def _chave_ticker(ticker):
+    # Uma entrada do cache por ticker: incluir um ativo em uma carteira não invalida as demais
+    return cache_compartilhado.chave_cache([ticker])
+
+
+def _ler_entradas(tickers):
+    """
+    Lê a entrada de cada ticker no cache compartilhado. Tickers que não foram atualizados
+    agora (histórico local ou indisponíveis) ficam obsoletos após CACHE_INCOMPLETO_MINUTES,
+    para serem tentados de novo logo.
 
     Returns:
-        tuple: Um tuple contendo os DataFrames de cotações e dividendos.
-                Retorna (None, None) em caso de falha total.
+        tuple: (entradas {ticker: (df_cotacoes, df_dividendos, situacao)}, obsoletos, faltantes)
+    """
+    entradas, obsoletos, faltantes = {}, [], []
+    for ticker in tickers:
+        chave = _chave_ticker(ticker)
+        entrada, estado = cache_compartilhado.ler(chave, CACHE_EXPIRATION_MINUTES * 60)
+        if entrada is not None and (len(entrada) != 3 or not isinstance(entrada[2], str)):
+            # Entrada de uma carteira inteira, gravada antes das chaves por ticker
+            entrada, estado = None, None
+        if estado == 'fresco' and entrada[2] != ATUALIZADO:
+            _, estado = cache_compartilhado.ler(chave, CACHE_INCOMPLETO_MINUTES * 60)
+        metricas.contar(f"cache_compartilhado.{estado or 'falta'}")
+        if estado is None:
+            faltantes.append(ticker)
+            continue
+        entradas[ticker] = entrada
+        if estado == 'obsoleto':
+            obsoletos.append(ticker)
+    return entradas, obsoletos, faltantes
+
+
+def _gravar_entrada(ticker, df_cotacoes, df_dividendos, situacao):
+    cache_compartilhado.gravar(_chave_ticker(ticker), (df_cotacoes, df_dividendos, situacao))
+
+
+def _gravar_entradas(dados, tickers):
+    # Fatia a carga de vários tickers e grava uma entrada para cada um
+    for item in _por_ticker(dados, tickers):
+        _gravar_entrada(*item)
+
+
+def _buscar_e_gravar(tickers, coordenar=True):
+    """
+    Busca os tickers (ver _buscar_dados) e grava uma entrada para cada um. Com
+    coordenar=True, cada ticker é reservado separadamente: os que outra sessão ou
+    processo já estiver buscando não são baixados de novo, e as entradas deles são
+    aguardadas.
+    """
+    pendentes = list(tickers)
+    limite = time.time() + ESPERA_MAXIMA_SEGUNDOS
+    while coordenar:
+        chaves = {_chave_ticker(ticker): ticker for ticker in pendentes}
+        with cache_compartilhado.reservas(list(chaves)) as reservadas:
+            # Confere de novo: quem tinha a reserva pode ter gravado o ticker há pouco
+            reservados = _ler_entradas([chaves[chave] for chave in reservadas])[2]
+            if reservados:
+                _gravar_entradas(_buscar_dados(reservados), reservados)
+        pendentes = _ler_entradas(pendentes)[2]
+        if not pendentes:
+            return
+        if time.time() > limite:
+            # Tempo de espera esgotado: busca sem coordenação
+            break
+        time.sleep(0.2)
+    _gravar_entradas(_buscar_dados(pendentes), pendentes)
+
+
+def _atualizar_em_segundo_plano(tickers):
+    # Só os tickers que ninguém está atualizando são buscados; cada um tem a sua reserva
+    chaves = {_chave_ticker(ticker): ticker for ticker in tickers}
+
+    def buscar(reservadas):
+        reservados = [chaves[chave] for chave in reservadas]
+        return reservados, _buscar_dados(reservados)
+
+    def salvar(resultado):
+        reservados, dados = resultado
+        _gravar_entradas(dados, reservados)
+
+    if cache_compartilhado.atualizar_varias_em_segundo_plano(list(chaves), buscar, salvar):
+        print("Cache expirado, exibindo dados anteriores e atualizando em segundo plano...")
+
+
+# Conjuntos já combinados, para que reruns sem mudança recebam os mesmos DataFrames
+_combinados = CacheLRU(TAMANHO_CACHE_COMBINADOS, nome='carrega_dados.combinados')
+
+
+def _combinar(tickers, entradas):
+    """
+    Junta as entradas por ticker em (df_cotacoes, df_dividendos, situacao). O resultado é
+    memoizado pela identidade das entradas (guardadas junto, para que os ids não sejam
+    reaproveitados): enquanto nenhuma mudar, a interface recebe os mesmos DataFrames e
+    reaproveita os índices por ticker e as figuras em cache.
+    """
+    partes = tuple(entradas[ticker] for ticker in tickers)
+
+    def combinar():
+        # Partes vazias (tickers indisponíveis) ficam de fora da concatenação
+        cotacoes = [parte[0] for parte in partes if not parte[0].empty] or [vazio('cotacoes')]
+        dividendos = [parte[1] for parte in partes if not parte[1].empty] or [vazio('dividendos')]
+        df_cotacoes = normalizar(pd.concat(cotacoes, ignore_index=True), 'cotacoes')
+        df_dividendos = normalizar(pd.concat(dividendos, ignore_index=True), 'dividendos')
+        indexar(df_cotacoes, 'valor_cotação')
+        indexar(df_dividendos, 'dividendo')
+        situacao = {ticker: parte[2] for ticker, parte in zip(tickers, partes)}
+        return partes, (df_cotacoes, df_dividendos, situacao)
+
+    return _combinados.obter(tuple(map(id, partes)), combinar)[1]
+
+
+@metricas.cronometrado('carrega_dados.dados_em_cache')
+def dados_em_cache(ativos_config):
+    """
+    Retorna os dados do cache compartilhado sem bloquear, montados a partir das entradas
+    de cada ticker: entradas frescas são usadas direto; obsoletas também, disparando uma
+    atualização em segundo plano apenas dos tickers obsoletos.
+
+    Returns:
+        tuple | None: (df_cotacoes, df_dividendos, situacao), ou None se algum ticker não
+                      estiver em cache.
+    """
+    entradas, obsoletos, faltantes = _ler_entradas(ativos_config)
+    if faltantes:
+        return None
+    if obsoletos:
+        _atualizar_em_segundo_plano(obsoletos)
+    else:
+        print("Carregando dados do cache...")
+    return _combinar(list(ativos_config), entradas)
+
+
+@metricas.cronometrado('carrega_dados.carregar_dados')
+def carregar_dados(ativos_config, use_cache=True):
     """
-    cache_key = f"dados_ativos_{ativos_config}"
+    Carrega os dados de cotações e dividendos, com opção de usar ou não o cache compartilhado.
+    O cache fica em disco, com uma entrada por ticker, e é compartilhado entre todas as
+    sessões e processos: só os tickers sem entrada são buscados, e carteiras diferentes
+    reaproveitam os tickers em comum. Ao expirar, os dados anteriores continuam sendo
+    exibidos enquanto uma única atualização roda em segundo plano. Adiciona tela de
+    loading apenas quando não há dados para exibir.
 
-    if use_cache and cache_key in st.session_state and 'data' in st.session_state[cache_key]:
-        cached_data = st.session_state[cache_key]
-        if datetime.now() < cached_data['expiry_time']:
-            print("Carregando dados do cache...")
-            return cached_data['data']
-        else:
-            print("Cache expirado, recarregando dados...")
-            del st.session_state[cache_key]
+    Args:
+        ativos_config (list): Lista de tickers a buscar.
+        use_cache (bool, optional): Indica se deve usar o cache compartilhado. Padrão é True.
 
-    df_cotacoes_online = None
-    df_dividendos_online = None
+    Returns:
+        tuple: (df_cotacoes, df_dividendos, situacao), com a situação de cada ticker.
+                Retorna (None, None, None) em caso de falha total.
+    """
+    if use_cache:
+        dados = dados_em_cache(ativos_config)
+        if dados is not None:
+            return dados
+        faltantes = _ler_entradas(ativos_config)[2]
+    else:
+        faltantes = list(ativos_config)
 
     # Adiciona o spinner para indicar o carregamento
     with st.spinner("Buscando dados online..."):
+        # Cada etapa informa a própria falha: busca (online ou local) e validação do esquema,
+        # leitura das entradas do cache compartilhado e junção dos tickers
         try:
-            print("Tentando carregar dados online...")
-            # Carrega os dados online
-            df_cotacoes_online = buscar_dados_cotacoes_yahoo(ativos_config)
-            df_dividendos_online = buscar_dividendos_yahoo(ativos_config)
-            print("Dados online carregados com sucesso!")
-            dados = (df_cotacoes_online, df_dividendos_online)
-
-            # Salva no cache
-            expiry_time = datetime.now() + timedelta(minutes=CACHE_EXPIRATION_MINUTES)
-            st.session_state[cache_key] = {'data': dados, 'expiry_time': expiry_time}
-            return dados
-
+            _buscar_e_gravar(faltantes, coordenar=use_cache)
+        except Exception as e:
+            print(f"Erro ao buscar os dados: {e}")
+            return None, None, None
+        try:
+            entradas, _, faltantes = _ler_entradas(ativos_config)
         except Exception as e:
-            print(f"Erro ao carregar dados online: {e}")
-            print("Tentando carregar dados locais...")
-            try:
-                # Carrega os dados local
-                df_cotacoes_local = pd.read_excel('data\dados_organizados.xlsx')
-                df_dividendos_local = pd.read_excel('data\historico_dividendos.xlsx')
-                print("Dados locais carregados com sucesso!")
-                dados = (df_cotacoes_local, df_dividendos_local)
-                expiry_time = datetime.now() + timedelta(minutes=CACHE_EXPIRATION_MINUTES)
-                st.session_state[cache_key] = {'data': dados, 'expiry_time': expiry_time}
-                return dados
-            except Exception as e_local:
-                print(f"Erro ao carregar dados locais: {e_local}")
-                print("Falha ao carregar os dados online e locais.")
-                return None, None
\ No newline at end of file
+            print(f"Erro ao ler o cache compartilhado: {e}")
+            return None, None, None
+        if faltantes:
+            print(f"Sem dados em cache para {', '.join(faltantes)}")
+            return None, None, None
+        try:
+            return _combinar(list(ativos_config), entradas)
+        except Exception as e:
+            print(f"Erro ao juntar os dados dos tickers: {e}")
+            return None, None, None
+
+
+def _por_ticker(dados, tickers):
+    # Fatia os dados já carregados (df_cotacoes, df_dividendos, situacao) em um item por ticker
+    df_cotacoes, df_dividendos, situacao = dados
+    cotacoes = dict(tuple(df_cotacoes.groupby('ticker', observed=True)))
+    dividendos = dict(tuple(df_dividendos.groupby('ticker', observed=True)))
+    for ticker in tickers:
+        yield (ticker,
+               normalizar(cotacoes.get(ticker, df_cotacoes.iloc[:0]), 'cotacoes'),
+               normalizar(dividendos.get(ticker, df_dividendos.iloc[:0]), 'dividendos'),
+               situacao.get(ticker, INDISPONIVEL))
+
+
+def carregar_dados_progressivo(ativos_config, prioridade=None):
+    """
+    Gerador para a carga sem cache: entrega primeiro os tickers que já estão no cache
+    compartilhado e depois os demais, cada um assim que chega, para a interface desenhar
+    o gráfico e as linhas da tabela progressivamente. Cada ticker buscado é gravado no
+    cache (uma entrada por ticker) assim que chega.
+
+    Os tickers que outra sessão já estiver buscando não são baixados de novo: depois dos
+    demais, aguarda o resultado dela e os entrega de uma vez. Se a busca online e os
+    snapshots locais falharem, os tickers restantes são entregues vazios, como INDISPONIVEL.
+
+    Args:
+        ativos_config (list): Lista de tickers a buscar.
+        prioridade (str, optional): Ticker buscado primeiro (ex.: o selecionado na interface).
+
+    Yields:
+        tuple: (ticker, df_cotacoes, df_dividendos, situacao), com os DataFrames no
+               esquema canônico e a situação do ticker (ATUALIZADO, LOCAL ou INDISPONIVEL).
+    """
+    ordem = list(ativos_config)
+    if prioridade in ordem:
+        ordem.remove(prioridade)
+        ordem.insert(0, prioridade)
+
+    entradas, obsoletos, faltantes = _ler_entradas(ordem)
+    if obsoletos:
+        _atualizar_em_segundo_plano(obsoletos)
+    for ticker in ordem:
+        if ticker in entradas:
+            yield (ticker, *entradas[ticker])
+    if not faltantes:
+        return
+
+    # Cada ticker tem a sua reserva: os que outra sessão já está buscando são aguardados
+    # (carregar_dados) depois que os reservados aqui forem entregues
+    chaves = {_chave_ticker(ticker): ticker for ticker in faltantes}
+    with cache_compartilhado.reservas(list(chaves)) as reservadas:
+        reservados = [chaves[chave] for chave in reservadas]
+        # Confere de novo: quem tinha a reserva pode ter gravado o ticker há pouco
+        gravados, _, buscar = _ler_entradas(reservados)
+        for ticker in reservados:
+            if ticker in gravados:
+                yield (ticker, *gravados[ticker])
+        if buscar:
+            yield from _iterar_buscados(buscar)
+    aguardados = [ticker for ticker in faltantes if ticker not in reservados]
+    if aguardados:
+        dados = carregar_dados(aguardados)
+        if dados[0] is not None:
+            yield from _por_ticker(dados, aguardados)
+
+
+def _iterar_buscados(faltantes):
+    """Busca os tickers reservados pela carga progressiva e grava cada um assim que chega."""
+    def gravado(item):
+        ticker, df_cotacoes, df_dividendos, situacao = item
+        item = (ticker, validar(df_cotacoes, 'cotacoes'), validar(df_dividendos, 'dividendos'), situacao)
+        _gravar_entrada(*item)
+        return item
+
+    dados = _snapshot_recente(faltantes)
+    if dados is not None:
+        print("Usando o snapshot gerado pela atualização agendada.")
+        for item in _por_ticker(dados, faltantes):
+            yield gravado(item)
+        return
+
+    recebidos = set()
+    try:
+        print("Tentando carregar dados online...")
+        for item in iterar_historico(faltantes):
+            recebidos.add(item[0])
+            yield gravado(item)
+        print("Dados online carregados com sucesso!")
+    except Exception as e:
+        print(f"Erro ao carregar dados online: {e}")
+        print("Usando os dados locais para os tickers restantes...")
+        restantes = [t for t in faltantes if t not in recebidos]
+        try:
+            df_cotacoes, df_dividendos = carregar_snapshots()
+        except Exception as e_local:
+            # Sem dados online nem locais: os restantes saem vazios e não vão para o cache,
+            # para serem buscados de novo no próximo rerun
+            print(f"Erro ao carregar dados locais: {e_local}")
+            for ticker in restantes:
+                yield ticker, vazio('cotacoes'), vazio('dividendos'), INDISPONIVEL
+            return
+        locais = (df_cotacoes, df_dividendos, _situacao(df_cotacoes, restantes, LOCAL))
+        for item in _por_ticker(locais, restantes):
+            yield gravado(item)
+
+
+def combinar_carregados(ativos_config, itens):
+    """
+    Junta os itens entregues por carregar_dados_progressivo ({ticker: (df_cotacoes,
+    df_dividendos, situacao)}) em (df_cotacoes, df_dividendos, situacao), sem depender
+    de todos terem ido para o cache. Tickers sem item ficam vazios, como INDISPONIVEL.
+    """
+    entradas = {ticker: itens.get(ticker, (vazio('cotacoes'), vazio('dividendos'), INDISPONIVEL))
+                for ticker in ativos_config}
+    return _combinar(list(ativos_config), entradas)
+
+
+def _buscar_proventos(tickers, desde):
+    relatorio = []
+    df_dividendos = buscar_dividendos_yahoo(tickers, days_range=(date.today() - desde).days + 1, relatorio=relatorio)
+    falhas = [registro['ticker'] for registro in relatorio if registro['status'] != 'ok']
+    if falhas:
+        # Um ticker sem os dividendos antigos subestimaria os proventos recebidos
+        raise RuntimeError(f"Falha ao buscar os dividendos de {', '.join(falhas)}")
+    return validar(df_dividendos, 'dividendos')
+
+
+def carregar_proventos(inicios):
+    """
+    Dividendos dos tickers de 'inicios' ({ticker: datetime.date}) desde a compra mais
+    antiga, para avaliar posições anteriores ao histórico carregado. Ficam no cache
+    compartilhado por CACHE_PROVENTOS_HORAS; vencidos, continuam em uso enquanto uma
+    atualização roda em segundo plano.
+
+    Returns:
+        pd.DataFrame | None: Dividendos no esquema canônico, ou None se não houver cache
+                             e a busca falhar.
+    """
+    tickers, desde = sorted(inicios), min(inicios.values())
+    chave = cache_compartilhado.chave_cache(['proventos', desde.isoformat(), *tickers])
+    ttl_segundos = CACHE_PROVENTOS_HORAS * 60 * 60
+    dados, estado = cache_compartilhado.ler(chave, ttl_segundos)
+    if estado == 'obsoleto':
+        cache_compartilhado.atualizar_em_segundo_plano(chave, lambda: _buscar_proventos(tickers, desde))
+    if estado is not None:
+        return dados
+    try:
+        return cache_compartilhado.atualizar(chave, lambda: _buscar_proventos(tickers, desde), ttl_segundos)
+    except Exception as e:
+        print(f"Erro ao buscar os dividendos desde {desde}: {e}")
+        return None
+
+
+_com_proventos = CacheLRU(TAMANHO_CACHE_COMBINADOS, nome='carrega_dados.proventos')
+
+
+def dividendos_para_avaliacao(df_dividendos, inicios):
+    """
+    Dividendos carregados com os tickers de 'inicios' (ver avaliacao.compras_anteriores)
+    trocados pelo histórico desde a primeira compra (carregar_proventos). O resultado é
+    memoizado pela identidade das entradas, como em _combinar.
+
+    Returns:
+        tuple: (df_dividendos, completo), com completo=False quando o histórico mais longo
+               não pôde ser obtido e os dados carregados são devolvidos como estão.
+    """
+    if not inicios:
+        return df_dividendos, True
+    proventos = carregar_proventos(inicios)
+    if proventos is None:
+        return df_dividendos, False
+
+    def combinar():
+        carregados = df_dividendos[~df_dividendos['ticker'].isin(list(inicios))]
+        combinado = normalizar(pd.concat([carregados, proventos[proventos['ticker'].isin(list(inicios))]],
+                                         ignore_index=True), 'dividendos')
+        indexar(combinado, 'dividendo')
+        return df_dividendos, proventos, combinado
+
+    return _com_proventos.obter((id(df_dividendos), id(proventos)), combinar)[2], True
+
+
+def dividendos_historicos(df_cotacoes, df_dividendos, tickers):
+    """
+    Dividendos dos tickers desde 12 meses antes da primeira cotação carregada (no início
+    do mês, para a entrada de carregar_proventos mudar só uma vez por mês): a janela
+    móvel de 12 meses da análise e a simulação histórica ficam completas desde o primeiro
+    pregão. Os dividendos carregados por carregar_dados cobrem só DIAS_DIVIDENDOS.
+
+    Returns:
+        tuple: (df_dividendos, inicio), com inicio (datetime.date) a data desde a qual os
+               dividendos devolvidos estão completos. Se a busca falhar, devolve os
+               dividendos carregados, completos desde DIAS_DIVIDENDOS atrás.
+    """
+    carregados_desde = date.today() - timedelta(days=DIAS_DIVIDENDOS)
+    indice = indexar(df_cotacoes, 'valor_cotação')
+    primeiras = [datas[0] for datas, _ in map(indice.serie, tickers) if len(datas)]
+    if not primeiras:
+        return df_dividendos, carregados_desde
+    desde = (pd.Timestamp(min(primeiras)) - pd.Timedelta(days=JANELA_DIVIDENDOS_DIAS)).date().replace(day=1)
+    if desde >= carregados_desde:
+        return df_dividendos, carregados_desde
+    combinado, completo = dividendos_para_avaliacao(df_dividendos, {ticker: desde for ticker in tickers})
+    return (combinado, desde) if completo else (df_dividendos, carregados_desde)
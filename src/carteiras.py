@@ -0,0 +1,127 @@
+"""
+Carteiras carregadas de arquivos: um JSON por carteira na pasta PASTA_CARTEIRAS.
+
+Formato (quantidade e compras são opcionais):
+    {
+        "nome": "Mesa FII",
+        "ativos": [
+            {"ticker": "HGRU11.SA", "quantidade": 100, "preco_medio": 113.68},
+            {"ticker": "MXRF11.SA", "preco_medio": 9.84},
+            {"ticker": "XPML11.SA", "compras": [
+                {"data": "2024-03-15", "quantidade": 10, "preco": 101.5},
+                {"data": "2025-01-10", "quantidade": 5, "preco": 98.2}
+            ]}
+        ]
+    }
+
+Com "compras", a posição é a soma das compras e o preço médio, se omitido, é a média
+ponderada delas. "quantidade" sem compras é uma posição sem data, tratada como mantida
+desde o início do histórico carregado (src.avaliacao).
+
+Sem arquivos na pasta, vale a carteira única de src.ativos_precos.
+"""
+import os
+import json
+from datetime import date
+from src.ativos_precos import ativos_config, precos_medios_config
+
+PASTA_CARTEIRAS = 'carteiras'
+
+# Nome da carteira montada a partir de src.ativos_precos
+NOME_CARTEIRA_PADRAO = 'Principal'
+
+
+class Carteira:
+    """
+    Ativos de uma carteira, na ordem do arquivo.
+
+    Args:
+        nome (str): Nome exibido na interface.
+        ativos (list): Tickers.
+        precos_medios (dict): Preço médio por ticker.
+        quantidades (dict): Cotas por ticker (apenas dos ativos que as informam).
+        compras (dict): Compras datadas por ticker: lista de (data, quantidade, preço),
+                        com a data como datetime.date.
+    """
+
+    def __init__(self, nome, ativos, precos_medios, quantidades=None, compras=None):
+        self.nome = nome
+        self.ativos = list(ativos)
+        self.precos_medios = dict(precos_medios)
+        self.quantidades = dict(quantidades or {})
+        self.compras = {ticker: list(lista) for ticker, lista in (compras or {}).items()}
+
+
+def ler_carteira(caminho) -> Carteira:
+    """
+    Lê um arquivo de carteira. Tickers repetidos ficam com a última linha.
+
+    Raises:
+        ValueError: Arquivo sem a lista "ativos", ativo sem "ticker", sem "preco_medio" nem
+                    "compras", ou compra sem "data", "quantidade" e "preco" válidos.
+    """
+    with open(caminho, encoding='utf-8') as arquivo:
+        definicao = json.load(arquivo)
+
+    nome = definicao.get('nome') or os.path.splitext(os.path.basename(caminho))[0]
+    if not isinstance(definicao.get('ativos'), list):
+        raise ValueError(f"{caminho}: a carteira precisa de uma lista \"ativos\".")
+
+    ativos, precos_medios, quantidades, compras = [], {}, {}, {}
+    for posicao in definicao['ativos']:
+        if 'ticker' not in posicao or ('preco_medio' not in posicao and not posicao.get('compras')):
+            raise ValueError(f"{caminho}: cada ativo precisa de \"ticker\" e \"preco_medio\" ou \"compras\" "
+                             f"({posicao}).")
+        ticker = str(posicao['ticker']).strip().upper()
+        if ticker not in precos_medios:
+            ativos.append(ticker)
+        quantidades.pop(ticker, None)
+        compras.pop(ticker, None)
+
+        if posicao.get('compras'):
+            try:
+                compras[ticker] = [(date.fromisoformat(str(compra['data'])), float(compra['quantidade']),
+                                    float(compra['preco'])) for compra in posicao['compras']]
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"{caminho}: compra inválida em {ticker} ({e}); use \"data\" (AAAA-MM-DD), "
+                                 f"\"quantidade\" e \"preco\".") from e
+            quantidades[ticker] = sum(quantidade for _, quantidade, _ in compras[ticker])
+            investido = sum(quantidade * preco for _, quantidade, preco in compras[ticker])
+            media = round(investido / quantidades[ticker], 2) if quantidades[ticker] else 0.0
+            precos_medios[ticker] = float(posicao.get('preco_medio', media))
+        else:
+            precos_medios[ticker] = float(posicao['preco_medio'])
+            if posicao.get('quantidade') is not None:
+                quantidades[ticker] = float(posicao['quantidade'])
+    return Carteira(nome, ativos, precos_medios, quantidades, compras)
+
+
+def carregar_carteiras(pasta=PASTA_CARTEIRAS) -> dict:
+    """
+    Carrega todas as carteiras da pasta (em ordem alfabética de arquivo). Arquivos
+    inválidos são ignorados com um aviso no log.
+
+    Returns:
+        dict: nome -> Carteira. Sem arquivos válidos, apenas a carteira de src.ativos_precos.
+    """
+    carteiras = {}
+    try:
+        nomes = sorted(nome for nome in os.listdir(pasta) if nome.endswith('.json'))
+    except FileNotFoundError:
+        nomes = []
+    for nome in nomes:
+        try:
+            carteira = ler_carteira(os.path.join(pasta, nome))
+        except (OSError, ValueError) as e:
+            print(f"Carteira ignorada: {e}")
+            continue
+        carteiras[carteira.nome] = carteira
+
+    if not carteiras:
+        carteiras[NOME_CARTEIRA_PADRAO] = Carteira(NOME_CARTEIRA_PADRAO, ativos_config, precos_medios_config)
+    return carteiras
+
+
+def uniao_tickers(carteiras) -> list:
+    """Tickers de todas as carteiras, sem repetição, na ordem em que aparecem."""
+    return list(dict.fromkeys(ticker for carteira in carteiras for ticker in carteira.ativos))
@@ -1,135 +1,746 @@
-import requests
+import os
+import json
+import numpy as np
 import pandas as pd
 import time
+import random
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from urllib.parse import urlparse
+from src.esquema import datas_de_epoch, de_arrays, normalizar, vazio
+from src import cache_respostas, metricas
 
-def buscar_dados_cotacoes_yahoo(tickers: list,
-                                 days_range=520,
-                                 interval: str = '1d',
-                                 sleep_seconds: float = 1.5,
-                                 user_agent: str = 'Mozilla/5.0') -> pd.DataFrame:
+# Pode ser trocado pela variável de ambiente de mesmo nome (ex.: benchmarks.servidor_falso)
+YAHOO_CHART_URL = os.environ.get('YAHOO_CHART_URL', "https://query2.finance.yahoo.com/v8/finance/chart/{ticker}")
+
+# Limites padrão do motor de busca concorrente
+REQUISICOES_POR_SEGUNDO = 4.0
+MAX_SIMULTANEAS = 4
+TIMEOUT_SEGUNDOS = 15
+
+# Cache em disco das respostas brutas (src.cache_respostas); False sempre baixa de novo
+USAR_CACHE_RESPOSTAS = True
+
+# Retentativas com espera exponencial e jitter (espera = aleatório entre 0 e base * 2^tentativa)
+TENTATIVAS = 3
+ESPERA_BASE_SEGUNDOS = 0.5
+ESPERA_MAXIMA_SEGUNDOS = 8.0
+
+# Respostas que indicam limitação de taxa ou falha temporária do servidor
+STATUS_TEMPORARIOS = {429, 500, 502, 503, 504}
+
+# Disjuntor por host: abre após N falhas temporárias seguidas e fica aberto por alguns segundos
+FALHAS_PARA_ABRIR = 5
+DISJUNTOR_ABERTO_SEGUNDOS = 30.0
+
+
+class ErroHTTP(RuntimeError):
+    """Resposta HTTP diferente de 200. 'espera' traz o Retry-After (segundos), se enviado."""
+
+    def __init__(self, status, espera=None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.espera = espera
+
+
+class CircuitoAberto(RuntimeError):
+    """O disjuntor do host está aberto: a requisição nem é feita."""
+
+
+class LimitadorTaxa:
     """
-    Busca preços de fechamento (close) de múltiplos ativos no Yahoo Finance,
-    dos últimos 520 dias até hoje.
+    Token bucket que limita a taxa de requisições por segundo e, via semáforo,
+    o número de requisições em andamento ao mesmo tempo.
 
-    Retorna DataFrame com colunas: date | ticker | valor_cotação
+    Uso:
+        with limitador:
+            sessao.get(...)
     """
-    all_data = []
 
+    def __init__(self, requisicoes_por_segundo=REQUISICOES_POR_SEGUNDO,
+                 max_simultaneas=MAX_SIMULTANEAS, rajada=1):
+        self.taxa = float(requisicoes_por_segundo)
+        self.capacidade = float(max(1, rajada))
+        self._tokens = self.capacidade
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+        self._semaforo = threading.BoundedSemaphore(max(1, int(max_simultaneas)))
+
+    def _consumir_token(self):
+        # Sem limite de taxa configurado: apenas o semáforo controla o fluxo.
+        if self.taxa <= 0:
+            return
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa)
+                self._ultimo = agora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.taxa
+            time.sleep(espera)
+
+    def __enter__(self):
+        with metricas.cronometro('dados_online.espera_limitador'):
+            self._semaforo.acquire()
+            try:
+                self._consumir_token()
+            except BaseException:
+                self._semaforo.release()
+                raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._semaforo.release()
+        return False
+
+
+class Disjuntor:
+    """
+    Disjuntor (circuit breaker) de um host. Após 'falhas_para_abrir' falhas temporárias
+    seguidas (429, 5xx, erro de conexão) ele abre e recusa novas requisições por
+    'aberto_segundos'; depois disso deixa passar uma única sondagem (meio-aberto), que
+    fecha o disjuntor se der certo ou o reabre se falhar. Uma sondagem que termina em erro
+    definitivo devolve a vez com liberar_sondagem, para a próxima requisição sondar de novo.
+    """
+
+    def __init__(self, falhas_para_abrir=FALHAS_PARA_ABRIR, aberto_segundos=DISJUNTOR_ABERTO_SEGUNDOS):
+        self.falhas_para_abrir = falhas_para_abrir
+        self.aberto_segundos = aberto_segundos
+        self._falhas = 0
+        self._aberto_ate = None
+        self._sondando = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self):
+        with self._lock:
+            if self._aberto_ate is None:
+                return 'fechado'
+            return 'aberto' if time.monotonic() < self._aberto_ate or self._sondando else 'meio-aberto'
+
+    def permitir(self):
+        """Indica se uma requisição pode ser feita agora."""
+        with self._lock:
+            if self._aberto_ate is None:
+                return True
+            if time.monotonic() < self._aberto_ate or self._sondando:
+                return False
+            self._sondando = True
+            return True
+
+    def segundos_para_sondar(self):
+        """Segundos até o disjuntor aberto deixar passar a próxima sondagem (0 se já deixa)."""
+        with self._lock:
+            if self._aberto_ate is None:
+                return 0.0
+            return max(0.0, self._aberto_ate - time.monotonic())
+
+    def registrar_sucesso(self):
+        with self._lock:
+            self._falhas = 0
+            self._aberto_ate = None
+            self._sondando = False
+
+    def registrar_falha(self):
+        with self._lock:
+            self._falhas += 1
+            if self._sondando or self._falhas >= self.falhas_para_abrir:
+                self._aberto_ate = time.monotonic() + self.aberto_segundos
+                self._sondando = False
+
+    def liberar_sondagem(self):
+        """Encerra a sondagem em andamento sem mudar o estado (aberto ou meio-aberto)."""
+        with self._lock:
+            self._sondando = False
+
+
+_disjuntores = {}
+_lock_disjuntores = threading.Lock()
+
+
+def obter_disjuntor(url: str) -> Disjuntor:
+    """Retorna o disjuntor compartilhado do host da URL."""
+    host = urlparse(url).netloc
+    with _lock_disjuntores:
+        if host not in _disjuntores:
+            _disjuntores[host] = Disjuntor()
+        return _disjuntores[host]
+
+
+_limitadores = {}
+_lock_limitadores = threading.Lock()
+
+
+def obter_limitador(url: str, requisicoes_por_segundo=REQUISICOES_POR_SEGUNDO,
+                    max_simultaneas=MAX_SIMULTANEAS) -> LimitadorTaxa:
+    """
+    Retorna o limitador compartilhado do host da URL para os limites dados: chamadas
+    simultâneas (sessões da interface, atualização em segundo plano) dividem a mesma
+    cota de requisições em vez de cada uma ter a sua.
+    """
+    chave = (urlparse(url).netloc, float(requisicoes_por_segundo), max(1, int(max_simultaneas)))
+    with _lock_limitadores:
+        if chave not in _limitadores:
+            _limitadores[chave] = LimitadorTaxa(requisicoes_por_segundo, max_simultaneas)
+        return _limitadores[chave]
+
+
+_sessoes = {}
+_lock_sessoes = threading.Lock()
+
+
+def obter_sessao(user_agent: str = 'Mozilla/5.0', tamanho_pool: int = MAX_SIMULTANEAS) -> 'requests.Session':
+    """
+    Retorna uma sessão HTTP compartilhada (keep-alive) com pool de conexões,
+    reutilizada entre chamadas para evitar um novo handshake TLS por ticker.
+    """
+    # requests só é importado quando há busca online (a interface com cache não precisa dele)
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    with _lock_sessoes:
+        sessao = _sessoes.get(user_agent)
+        if sessao is None:
+            sessao = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, tamanho_pool))
+            sessao.mount('https://', adaptador)
+            sessao.mount('http://', adaptador)
+            sessao.headers.update({'User-Agent': user_agent})
+            _sessoes[user_agent] = sessao
+        return sessao
+
+
+def _baixar_chart(sessao, ticker, params, limitador):
+    """
+    Faz uma requisição ao endpoint chart do Yahoo e devolve (result, latência em segundos).
+    Respostas ainda válidas no cache em disco são usadas sem requisição (latência 0);
+    as vencidas são revalidadas com ETag/Last-Modified quando o servidor os fornece.
+    Lança exceção em caso de falha HTTP ou resposta sem dados.
+    """
+    url = YAHOO_CHART_URL.format(ticker=ticker)
+    chave = cache_respostas.chave(ticker, params) if USAR_CACHE_RESPOSTAS else None
+    entrada = cache_respostas.ler(chave) if chave else None
+    if cache_respostas.valida(entrada):
+        metricas.contar('cache_respostas.acertos')
+        return _resultado(cache_respostas.conteudo(entrada)), 0.0
+    if chave:
+        metricas.contar('cache_respostas.faltas')
+
+    with limitador:
+        inicio = time.perf_counter()
+        response = sessao.get(url, params=params, headers=cache_respostas.cabecalhos_condicionais(entrada),
+                              timeout=TIMEOUT_SEGUNDOS)
+        latencia = time.perf_counter() - inicio
+    metricas.registrar_latencia(ticker, latencia)
+    metricas.somar_bytes(len(response.content))
+
+    if response.status_code == 304 and entrada is not None:
+        # Conteúdo não mudou: estende a validade da resposta guardada
+        metricas.contar('cache_respostas.revalidadas')
+        cache_respostas.renovar(chave, entrada)
+        return _resultado(cache_respostas.conteudo(entrada)), latencia
+
+    if response.status_code != 200:
+        raise ErroHTTP(response.status_code, _retry_after(response))
+
+    result = _resultado(response.content)
+    if chave:
+        cache_respostas.gravar(chave, response.content,
+                               response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    return result, latencia
+
+
+def _resultado(corpo):
+    with metricas.cronometro('dados_online.json'):
+        return json.loads(corpo)['chart']['result'][0]
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _temporario(erro):
+    if isinstance(erro, ErroHTTP):
+        return erro.status in STATUS_TEMPORARIOS
+    import requests
+    return isinstance(erro, (requests.ConnectionError, requests.Timeout))
+
+
+def _baixar_com_retentativas(sessao, ticker, params, limitador, tentativas=TENTATIVAS):
+    """
+    _baixar_chart com até 'tentativas' tentativas para falhas temporárias, espera
+    exponencial com jitter entre elas (ou o Retry-After do servidor) e o disjuntor do host.
+
+    Returns:
+        tuple: (result, latência da tentativa bem-sucedida, tentativas usadas).
+    """
+    disjuntor = obter_disjuntor(YAHOO_CHART_URL)
+    for tentativa in range(1, tentativas + 1):
+        if not disjuntor.permitir():
+            metricas.contar('dados_online.recusadas_pelo_disjuntor')
+            raise CircuitoAberto(f"Disjuntor aberto para {urlparse(YAHOO_CHART_URL).netloc}")
+        try:
+            result, latencia = _baixar_chart(sessao, ticker, params, limitador)
+        except Exception as e:
+            if not _temporario(e):
+                # Erro definitivo (ex.: 404, ticker sem dados): não adianta repetir. Uma resposta
+                # HTTP mostra que o host está no ar; nos demais casos só devolve a sondagem
+                if isinstance(e, ErroHTTP):
+                    disjuntor.registrar_sucesso()
+                else:
+                    disjuntor.liberar_sondagem()
+                raise
+            disjuntor.registrar_falha()
+            if tentativa == tentativas:
+                raise
+            espera = random.uniform(0, min(ESPERA_MAXIMA_SEGUNDOS, ESPERA_BASE_SEGUNDOS * 2 ** (tentativa - 1)))
+            if isinstance(e, ErroHTTP) and e.espera is not None:
+                espera = min(e.espera, ESPERA_MAXIMA_SEGUNDOS)
+            metricas.contar('dados_online.retentativas')
+            with metricas.cronometro('dados_online.espera_retentativa'):
+                time.sleep(espera)
+            continue
+        disjuntor.registrar_sucesso()
+        return result, latencia, tentativa
+
+
+def iterar_charts(tickers: list,
+                  params: dict,
+                  user_agent: str = 'Mozilla/5.0',
+                  requisicoes_por_segundo: float = REQUISICOES_POR_SEGUNDO,
+                  max_simultaneas: int = MAX_SIMULTANEAS,
+                  params_por_ticker: dict = None,
+                  limitador: LimitadorTaxa = None):
+    """
+    Gerador: baixa o JSON do endpoint chart para vários tickers em paralelo e entrega
+    cada resposta assim que ela chega, sem esperar pelas demais.
+
+    As requisições são disparadas na ordem de 'tickers'; coloque primeiro o ticker
+    que deve aparecer antes (ex.: o selecionado na interface).
+
+    Args:
+        tickers (list): Lista de tickers a buscar.
+        params (dict): Parâmetros de consulta (period1, period2, interval, events).
+        user_agent (str): User-Agent enviado ao Yahoo.
+        requisicoes_por_segundo (float): Taxa máxima do token bucket (0 desativa o limite).
+        max_simultaneas (int): Máximo de requisições em andamento ao mesmo tempo.
+        params_por_ticker (dict, optional): Parâmetros que substituem os de 'params'
+                                            para tickers específicos (ex.: period1).
+        limitador (LimitadorTaxa, optional): Limitador a usar; por padrão, o compartilhado
+                                             do host para estes limites (obter_limitador).
+
+    Yields:
+        tuple: (ticker, result, registro), com result None em caso de falha e registro
+               no formato {'ticker', 'status', 'latencia_s', 'tentativas', 'erro'}. O status
+               é 'ok', 'falha' ou 'recusada' (disjuntor aberto: vale tentar de novo depois).
+    """
+    sessao = obter_sessao(user_agent, max_simultaneas)
+    if limitador is None:
+        limitador = obter_limitador(YAHOO_CHART_URL, requisicoes_por_segundo, max_simultaneas)
+    params_por_ticker = params_por_ticker or {}
+
+    def tarefa(ticker):
+        try:
+            params_ticker = {**params, **params_por_ticker.get(ticker, {})}
+            result, latencia, tentativas = _baixar_com_retentativas(sessao, ticker, params_ticker, limitador)
+            return ticker, result, {'ticker': ticker, 'status': 'ok', 'latencia_s': round(latencia, 3),
+                                    'tentativas': tentativas, 'erro': None}
+        except Exception as e:
+            status = 'recusada' if isinstance(e, CircuitoAberto) else 'falha'
+            return ticker, None, {'ticker': ticker, 'status': status, 'latencia_s': None,
+                                  'tentativas': None, 'erro': str(e)}
+
+    executor = ThreadPoolExecutor(max_workers=max(1, int(max_simultaneas)))
+    try:
+        # Cada tarefa roda numa cópia do contexto, para registrar na coleta de métricas de quem chamou
+        futuros = [executor.submit(contextvars.copy_context().run, tarefa, ticker) for ticker in tickers]
+        for futuro in as_completed(futuros):
+            ticker, result, registro = futuro.result()
+            if result is not None:
+                print(f" {ticker}: {registro['latencia_s']:.2f}s")
+            else:
+                print(f" Falha ao buscar {ticker}: {registro['erro']}")
+            yield ticker, result, registro
+    finally:
+        # Se o consumidor parar no meio, as requisições ainda não iniciadas são canceladas
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def baixar_charts_em_paralelo(tickers: list,
+                              params: dict,
+                              user_agent: str = 'Mozilla/5.0',
+                              requisicoes_por_segundo: float = REQUISICOES_POR_SEGUNDO,
+                              max_simultaneas: int = MAX_SIMULTANEAS,
+                              relatorio: list = None,
+                              params_por_ticker: dict = None) -> dict:
+    """
+    Baixa o JSON do endpoint chart para vários tickers em paralelo, respeitando
+    o limite de requisições por segundo e de requisições simultâneas.
+
+    Args:
+        tickers (list): Lista de tickers a buscar.
+        params (dict): Parâmetros de consulta (period1, period2, interval, events).
+        user_agent (str): User-Agent enviado ao Yahoo.
+        requisicoes_por_segundo (float): Taxa máxima do token bucket (0 desativa o limite).
+        max_simultaneas (int): Máximo de requisições em andamento ao mesmo tempo.
+        relatorio (list, optional): Se informado, recebe um dict por ticker com
+                                    'ticker', 'status', 'latencia_s', 'tentativas' e 'erro'.
+        params_por_ticker (dict, optional): Parâmetros que substituem os de 'params'
+                                            para tickers específicos (ex.: period1).
+
+    Returns:
+        dict: Mapeamento ticker -> result do chart, apenas para os tickers com sucesso.
+    """
+    resultados = {}
+    registros = []
+
+    for ticker, result, registro in iterar_charts(tickers, params, user_agent, requisicoes_por_segundo,
+                                                  max_simultaneas, params_por_ticker):
+        if result is not None:
+            resultados[ticker] = result
+        registros.append(registro)
+
+    _resumir(registros)
+    if relatorio is not None:
+        relatorio.extend(registros)
+    return resultados
+
+
+def _resumir(registros):
+    falhas = sum(1 for r in registros if r['status'] != 'ok')
+    print(f"{len(registros) - falhas}/{len(registros)} tickers baixados, {falhas} falha(s).")
+
+
+def _periodo(days_range):
     # Define intervalo de datas
     end_date = datetime.today()
     start_date = end_date - timedelta(days=days_range)
+    return int(start_date.timestamp()), int(end_date.timestamp())
 
-    period1 = int(start_date.timestamp())
-    period2 = int(end_date.timestamp())
 
-    for ticker in tickers:
-        print(f" Baixando dados de: {ticker}")
-
-        url = f"https://query2.finance.yahoo.com/v8/finance/chart/{ticker}"
-        params = {
-            'period1': period1,
-            'period2': period2,
-            'interval': interval,
-            'events': 'history'
-        }
-        headers = {
-            'User-Agent': user_agent
-        }
+def _extrair_cotacoes(result, ticker):
+    """Extrai os fechamentos de um result do chart: date | valor_cotação | ticker."""
+    timestamps = result['timestamp']
+    closes = result['indicators']['quote'][0]['close']
 
-        try:
-            time.sleep(sleep_seconds)
-            response = requests.get(url, params=params, headers=headers)
+    df = pd.DataFrame({
+        'date': datas_de_epoch(timestamps, result.get('meta', {}).get('gmtoffset', 0)),
+        'valor_cotação': np.asarray(closes, dtype='float64')
+    })
+    df['ticker'] = ticker
+    return df
 
-            if response.status_code != 200:
-                print(f" Falha ao buscar {ticker}: HTTP {response.status_code}")
-                continue
 
-            data = response.json()
-            result = data['chart']['result'][0]
-            timestamps = result['timestamp']
-            closes = result['indicators']['quote'][0]['close']
+def _extrair_dividendos(result, ticker):
+    """
+    Extrai os eventos de dividendo de um result do chart: date | ticker | dividendo.
+    Retorna None sem dividendos.
+    """
+    if 'events' not in result or 'dividends' not in result['events']:
+        return None
 
-            df = pd.DataFrame({
-                'date': [datetime.fromtimestamp(ts).strftime('%d/%m/%Y')for ts in timestamps],
-                'valor_cotação': closes
-            })
-            df['ticker'] = ticker
-            all_data.append(df)
+    dividends = result['events']['dividends']
+    if not dividends:
+        return None
 
-        except Exception as e:
-            print(f" Erro ao processar {ticker}: {e}")
-            continue
+    timestamps = np.fromiter((evento['date'] for evento in dividends.values()), dtype='int64', count=len(dividends))
+    valores = np.fromiter((evento['amount'] for evento in dividends.values()), dtype='float64', count=len(dividends))
+
+    return pd.DataFrame({
+        'date': datas_de_epoch(timestamps, result.get('meta', {}).get('gmtoffset', 0)),
+        'ticker': ticker,
+        'dividendo': valores,
+    })
+
+
+def _extrair_barras(result):
+    """
+    Extrai as barras OHLCV de um result do chart como arrays: tempo (epoch em segundos,
+    int64), abertura, maxima, minima, fechamento e volume (float32) e o gmtoffset da bolsa.
+    Barras sem fechamento (null no Yahoo, comuns no intradiário) são descartadas.
+    """
+    quote = result['indicators']['quote'][0]
+    tempo = np.asarray(result.get('timestamp') or [], dtype='int64')
+    fechamento = np.asarray(quote['close'], dtype='float64')
 
+    def coluna(nome, padrao):
+        valores = quote.get(nome)
+        return padrao if valores is None else np.asarray(valores, dtype='float64')
+
+    manter = ~np.isnan(fechamento)
+    barras = {
+        'tempo': tempo[manter],
+        'abertura': coluna('open', fechamento)[manter],
+        'maxima': coluna('high', fechamento)[manter],
+        'minima': coluna('low', fechamento)[manter],
+        'fechamento': fechamento[manter],
+        'volume': np.nan_to_num(coluna('volume', np.zeros(len(tempo)))[manter]),
+    }
+    barras = {nome: valores if nome == 'tempo' else valores.astype('float32') for nome, valores in barras.items()}
+    barras['gmtoffset'] = int(result.get('meta', {}).get('gmtoffset') or 0)
+    return barras
+
+
+def _consolidar_cotacoes(all_data):
     if all_data:
         df_final = pd.concat(all_data, ignore_index=True)
         df_final['valor_cotação'] = df_final['valor_cotação'].round(2)
-        return df_final[['date', 'ticker', 'valor_cotação']].dropna()
+        return normalizar(df_final[['date', 'ticker', 'valor_cotação']], 'cotacoes')
     else:
         print("Nenhum dado válido retornado.")
-        return pd.DataFrame(columns=['date', 'ticker', 'valor_cotação'])
+        return vazio('cotacoes')
 
 
-def buscar_dividendos_yahoo(tickers: list,
-                              days_range=365,
-                              sleep_seconds: float = 1.5,
-                              user_agent: str = 'Mozilla/5.0') -> pd.DataFrame:
+def _consolidar_dividendos(all_data):
+    if all_data:
+        return normalizar(pd.concat(all_data, ignore_index=True), 'dividendos')
+    else:
+        print("Nenhum dividendo válido retornado.")
+        return vazio('dividendos')
+
+
+@metricas.cronometrado('dados_online.buscar_dados_cotacoes_yahoo')
+def buscar_dados_cotacoes_yahoo(tickers: list,
+                                 days_range=520,
+                                 interval: str = '1d',
+                                 requisicoes_por_segundo: float = REQUISICOES_POR_SEGUNDO,
+                                 max_simultaneas: int = MAX_SIMULTANEAS,
+                                 user_agent: str = 'Mozilla/5.0',
+                                 relatorio: list = None) -> pd.DataFrame:
     """
-    Busca os dividendos pagos nos últimos 12 meses para múltiplos ativos via Yahoo Finance.
-    
-    Retorna DataFrame com colunas: date | ticker | valor_dividendo
+    Busca preços de fechamento (close) de múltiplos ativos no Yahoo Finance,
+    dos últimos 520 dias até hoje. Os tickers são baixados em paralelo.
+
+    Retorna DataFrame no esquema canônico (src.esquema): date | ticker | valor_cotação
     """
     all_data = []
 
-    end_date = datetime.today()
-    start_date = end_date - timedelta(days=days_range)
+    period1, period2 = _periodo(days_range)
+    params = {
+        'period1': period1,
+        'period2': period2,
+        'interval': interval,
+        'events': 'history'
+    }
 
-    period1 = int(start_date.timestamp())
-    period2 = int(end_date.timestamp())
+    print(f" Baixando cotações de {len(tickers)} ativos...")
+    resultados = baixar_charts_em_paralelo(tickers, params, user_agent,
+                                           requisicoes_por_segundo, max_simultaneas, relatorio)
 
     for ticker in tickers:
-        print(f"Buscando dividendos: {ticker}")
-
-        url = f"https://query2.finance.yahoo.com/v8/finance/chart/{ticker}"
-        params = {
-            'period1': period1,
-            'period2': period2,
-            'interval': '1d',
-            'events': 'div'  # <-- Importante: pega eventos de dividendos
-        }
-        headers = {
-            'User-Agent': user_agent
-        }
+        if ticker not in resultados:
+            continue
+        try:
+            all_data.append(_extrair_cotacoes(resultados[ticker], ticker))
+        except Exception as e:
+            print(f" Erro ao processar {ticker}: {e}")
+            continue
+
+    return _consolidar_cotacoes(all_data)
+
+
+@metricas.cronometrado('dados_online.buscar_barras_yahoo')
+def buscar_barras_yahoo(tickers: list,
+                        days_range=60,
+                        interval: str = '5m',
+                        requisicoes_por_segundo: float = REQUISICOES_POR_SEGUNDO,
+                        max_simultaneas: int = MAX_SIMULTANEAS,
+                        user_agent: str = 'Mozilla/5.0',
+                        relatorio: list = None) -> dict:
+    """
+    Busca barras OHLCV completas (ex.: intradiárias de 5m, 15m ou 60m) de múltiplos
+    ativos no Yahoo Finance, dos últimos 'days_range' dias. Os tickers são baixados em
+    paralelo. O Yahoo limita o histórico intradiário (60 dias para 5m/15m, 730 para 60m).
 
+    Returns:
+        dict: ticker -> arrays das barras (ver _extrair_barras); tickers com falha ficam de fora.
+    """
+    period1, period2 = _periodo(days_range)
+    params = {
+        'period1': period1,
+        'period2': period2,
+        'interval': interval,
+        'events': 'history'
+    }
+
+    print(f" Baixando barras de {interval} de {len(tickers)} ativos...")
+    resultados = baixar_charts_em_paralelo(tickers, params, user_agent,
+                                           requisicoes_por_segundo, max_simultaneas, relatorio)
+
+    barras = {}
+    for ticker in tickers:
+        if ticker not in resultados:
+            continue
         try:
-            time.sleep(sleep_seconds)
-            response = requests.get(url, params=params, headers=headers)
+            barras[ticker] = _extrair_barras(resultados[ticker])
+        except Exception as e:
+            print(f" Erro ao processar {ticker}: {e}")
+    return barras
 
-            if response.status_code != 200:
-                print(f"Falha ao buscar dividendos de {ticker}: HTTP {response.status_code}")
-                continue
 
-            data = response.json()
-            result = data['chart']['result'][0]
+@metricas.cronometrado('dados_online.buscar_dividendos_yahoo')
+def buscar_dividendos_yahoo(tickers: list,
+                              days_range=365,
+                              requisicoes_por_segundo: float = REQUISICOES_POR_SEGUNDO,
+                              max_simultaneas: int = MAX_SIMULTANEAS,
+                              user_agent: str = 'Mozilla/5.0',
+                              relatorio: list = None) -> pd.DataFrame:
+    """
+    Busca os dividendos pagos nos últimos 12 meses para múltiplos ativos via Yahoo Finance.
+    Os tickers são baixados em paralelo.
 
-            if 'events' not in result or 'dividends' not in result['events']:
-                print(f"Nenhum dividendo encontrado para {ticker}")
-                continue
+    Retorna DataFrame no esquema canônico (src.esquema): date | ticker | dividendo
+    """
+    all_data = []
 
-            dividends = result['events']['dividends']
-            df = pd.DataFrame.from_dict(dividends, orient='index')
+    period1, period2 = _periodo(days_range)
+    params = {
+        'period1': period1,
+        'period2': period2,
+        'interval': '1d',
+        'events': 'div'  # <-- Importante: pega eventos de dividendos
+    }
 
-            df['date'] = pd.to_datetime(df['date'], unit='s').dt.strftime('%d/%m/%Y')
-            df['ticker'] = ticker
-            df.rename(columns={'amount': 'dividendo'}, inplace=True)
-            all_data.append(df[['date', 'ticker', 'dividendo']])
+    print(f"Buscando dividendos de {len(tickers)} ativos...")
+    resultados = baixar_charts_em_paralelo(tickers, params, user_agent,
+                                           requisicoes_por_segundo, max_simultaneas, relatorio)
 
+    for ticker in tickers:
+        if ticker not in resultados:
+            continue
+        try:
+            df = _extrair_dividendos(resultados[ticker], ticker)
+            if df is None:
+                print(f"Nenhum dividendo encontrado para {ticker}")
+                continue
+            all_data.append(df)
         except Exception as e:
             print(f" Erro ao processar {ticker}: {e}")
             continue
 
-    if all_data:
-        return pd.concat(all_data, ignore_index=True)
-    else:
-        print("Nenhum dividendo válido retornado.")
-        return pd.DataFrame(columns=['date', 'ticker', 'dividendo'])
+    return _consolidar_dividendos(all_data)
+
+
+def iterar_cotacoes_e_dividendos_yahoo(tickers: list,
+                                       days_range=520,
+                                       dividendos_days_range=365,
+                                       interval: str = '1d',
+                                       requisicoes_por_segundo: float = REQUISICOES_POR_SEGUNDO,
+                                       max_simultaneas: int = MAX_SIMULTANEAS,
+                                       user_agent: str = 'Mozilla/5.0',
+                                       relatorio: list = None,
+                                       period1_por_ticker: dict = None):
+    """
+    Gerador: versão progressiva de buscar_cotacoes_e_dividendos_yahoo. Entrega as
+    cotações e os dividendos de cada ticker assim que a resposta dele é processada,
+    na ordem de chegada (as requisições são disparadas na ordem de 'tickers').
+
+    Args:
+        Os mesmos de buscar_cotacoes_e_dividendos_yahoo.
+
+    Yields:
+        tuple: (ticker, df_cotacoes, df_dividendos, registro), com os DataFrames no esquema
+               canônico (src.esquema) e o registro do download (ver iterar_charts).
+               Tickers com falha também são entregues, com DataFrames vazios.
+    """
+    period1, period2 = _periodo(max(days_range, dividendos_days_range))
+    period1_cotacoes, _ = _periodo(days_range)
+    period1_dividendos, _ = _periodo(dividendos_days_range)
+    params = {
+        'period1': period1,
+        'period2': period2,
+        'interval': interval,
+        'events': 'div|split'
+    }
+
+    params_por_ticker = {ticker: {'period1': max(int(inicio), period1)}
+                         for ticker, inicio in (period1_por_ticker or {}).items()}
+
+    print(f" Baixando cotações e dividendos de {len(tickers)} ativos...")
+    registros = []
+    try:
+        for ticker, result, registro in iterar_charts(tickers, params, user_agent, requisicoes_por_segundo,
+                                                      max_simultaneas, params_por_ticker):
+            registros.append(registro)
+            df_cot, df_div = vazio('cotacoes'), vazio('dividendos')
+            if result is not None:
+                try:
+                    df_cot, df_div = _processar_chart(result, ticker, period1_cotacoes, period1_dividendos)
+                except Exception as e:
+                    print(f" Erro ao processar {ticker}: {e}")
+                    registro.update(status='falha', erro=f"Erro ao processar: {e}")
+            yield ticker, df_cot, df_div, registro
+    finally:
+        _resumir(registros)
+        if relatorio is not None:
+            relatorio.extend(registros)
+
+
+@metricas.cronometrado('dados_online.processar')
+def _processar_chart(result, ticker, period1_cotacoes, period1_dividendos):
+    # Extrai do mesmo JSON os fechamentos (janela de cotações) e os dividendos (janela de dividendos),
+    # montando os DataFrames canônicos direto dos arrays (roda uma vez por ticker, na thread consumidora)
+    gmtoffset = result.get('meta', {}).get('gmtoffset', 0)
+    timestamps = np.asarray(result.get('timestamp', []), dtype='int64')
+    closes = np.asarray(result['indicators']['quote'][0]['close'], dtype='float64')
+    manter = timestamps >= period1_cotacoes
+    df_cot = de_arrays(datas_de_epoch(timestamps[manter], gmtoffset), ticker, closes[manter].round(2), 'cotacoes')
+
+    dividends = result.get('events', {}).get('dividends') or {}
+    datas_div = np.fromiter((evento['date'] for evento in dividends.values()), dtype='int64', count=len(dividends))
+    valores_div = np.fromiter((evento['amount'] for evento in dividends.values()), dtype='float64', count=len(dividends))
+    manter = datas_div >= period1_dividendos
+    if not manter.any():
+        print(f"Nenhum dividendo encontrado para {ticker}")
+        return df_cot, vazio('dividendos')
+    ordem = np.argsort(datas_div[manter], kind='stable')
+    return df_cot, de_arrays(datas_de_epoch(datas_div[manter][ordem], gmtoffset), ticker,
+                             valores_div[manter][ordem], 'dividendos')
+
+
+@metricas.cronometrado('dados_online.buscar_cotacoes_e_dividendos_yahoo')
+def buscar_cotacoes_e_dividendos_yahoo(tickers: list,
+                                       days_range=520,
+                                       dividendos_days_range=365,
+                                       interval: str = '1d',
+                                       requisicoes_por_segundo: float = REQUISICOES_POR_SEGUNDO,
+                                       max_simultaneas: int = MAX_SIMULTANEAS,
+                                       user_agent: str = 'Mozilla/5.0',
+                                       relatorio: list = None,
+                                       period1_por_ticker: dict = None) -> tuple:
+    """
+    Busca cotações e dividendos com uma única requisição por ticker. Pede ao Yahoo
+    o maior intervalo necessário com todos os eventos e extrai os fechamentos e os
+    dividendos do mesmo JSON.
+
+    Args:
+        tickers (list): Lista de tickers a buscar.
+        days_range (int): Dias de histórico de cotações.
+        dividendos_days_range (int): Dias de histórico de dividendos.
+        interval (str): Intervalo das barras de cotação.
+        period1_por_ticker (dict, optional): Início (epoch) da busca por ticker. Usado
+                                             para baixar apenas o trecho ainda não armazenado.
+
+    Returns:
+        tuple: (df_cotacoes, df_dividendos) nos mesmos formatos de
+               buscar_dados_cotacoes_yahoo e buscar_dividendos_yahoo.
+    """
+    cotacoes = []
+    dividendos = []
+
+    for _, df_cot, df_div, _ in iterar_cotacoes_e_dividendos_yahoo(
+            tickers, days_range, dividendos_days_range, interval, requisicoes_por_segundo,
+            max_simultaneas, user_agent, relatorio, period1_por_ticker):
+        if not df_cot.empty:
+            cotacoes.append(df_cot)
+        if not df_div.empty:
+            dividendos.append(df_div)
+
+    return _consolidar_cotacoes(cotacoes), _consolidar_dividendos(dividendos)
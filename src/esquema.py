@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+# Esquema canônico em memória de cotações e dividendos:
+#   date   -> datetime64[ns] (meia-noite do dia do pregão, sem fuso)
+#   ticker -> category
+#   valor  -> float32
+COLUNAS = {
+    'cotacoes': ['date', 'ticker', 'valor_cotação'],
+    'dividendos': ['date', 'ticker', 'dividendo'],
+}
+
+TIPOS = {
+    'date': np.dtype('datetime64[ns]'),
+    'ticker': 'category',
+    'valor_cotação': np.dtype('float32'),
+    'dividendo': np.dtype('float32'),
+}
+
+
+def datas_de_epoch(timestamps, gmtoffset=0):
+    """
+    Converte um array de timestamps Unix (segundos) em datas datetime64[ns], de forma vetorizada.
+    'gmtoffset' é o deslocamento da bolsa em segundos (meta.gmtoffset do Yahoo), usado
+    para que o dia seja o do pregão e não o de UTC.
+    """
+    segundos = np.asarray(timestamps, dtype='int64') + int(gmtoffset or 0)
+    # Trunca para a meia-noite do dia com aritmética inteira (equivale a .normalize(), sem o custo do pandas)
+    return (segundos - segundos % 86400).astype('datetime64[s]').astype('datetime64[ns]')
+
+
+_vazios = {}
+
+
+def vazio(tipo) -> pd.DataFrame:
+    """DataFrame vazio já no esquema canônico (cópia de um modelo construído uma vez)."""
+    if tipo not in _vazios:
+        _vazios[tipo] = normalizar(pd.DataFrame(columns=COLUNAS[tipo]), tipo)
+    return _vazios[tipo].copy()
+
+
+def de_arrays(datas, ticker, valores, tipo) -> pd.DataFrame:
+    """
+    Monta o DataFrame canônico de um único ticker a partir de arrays de datas e valores,
+    sem o custo de normalizar() quando as datas já vêm em ordem estritamente crescente
+    (o caso comum nas respostas do Yahoo). Caso contrário, recorre a normalizar().
+    """
+    datas = np.asarray(datas, dtype='datetime64[ns]')
+    valores = np.asarray(valores, dtype='float32')
+    validos = ~np.isnan(valores)
+    datas, valores = datas[validos], valores[validos]
+    if len(datas) > 1 and not np.all(datas[1:] > datas[:-1]):
+        return normalizar(pd.DataFrame({'date': datas, 'ticker': ticker, COLUNAS[tipo][2]: valores}), tipo)
+
+    return validar(pd.DataFrame({
+        'date': datas,
+        'ticker': pd.Categorical.from_codes(np.zeros(len(datas), dtype='int8'), categories=[str(ticker)]),
+        COLUNAS[tipo][2]: valores,
+    }), tipo)
+
+
+def normalizar(df, tipo) -> pd.DataFrame:
+    """
+    Converte um DataFrame de cotações ou dividendos para o esquema canônico.
+    Aceita datas em texto '%d/%m/%Y' (planilhas antigas), date ou datetime.
+    Remove linhas sem valor, ordena por (ticker, date) e descarta duplicatas.
+
+    Args:
+        df (pd.DataFrame): Dados com as colunas date | ticker | valor.
+        tipo (str): 'cotacoes' ou 'dividendos'.
+
+    Returns:
+        pd.DataFrame: Novo DataFrame no esquema canônico.
+    """
+    colunas = COLUNAS[tipo]
+    coluna_valor = colunas[2]
+
+    datas = df['date']
+    if not pd.api.types.is_datetime64_any_dtype(datas):
+        if pd.api.types.is_object_dtype(datas) and len(datas) and isinstance(datas.iloc[0], str):
+            datas = pd.to_datetime(datas, format='%d/%m/%Y')
+        else:
+            datas = pd.to_datetime(datas)
+    if getattr(datas.dt, 'tz', None) is not None:
+        datas = datas.dt.tz_localize(None)
+
+    resultado = pd.DataFrame({
+        'date': datas.astype('datetime64[ns]').to_numpy(),
+        'ticker': df['ticker'].astype(str).to_numpy(),
+        coluna_valor: pd.to_numeric(df[coluna_valor]).to_numpy(dtype='float32'),
+    })
+    resultado = resultado.dropna(subset=[coluna_valor])
+    resultado = resultado.drop_duplicates(subset=['ticker', 'date'], keep='last')
+    resultado = resultado.sort_values(['ticker', 'date'], kind='stable', ignore_index=True)
+    resultado['ticker'] = resultado['ticker'].astype('category')
+    return validar(resultado, tipo)
+
+
+def validar(df, tipo) -> pd.DataFrame:
+    """
+    Confere se o DataFrame está no esquema canônico (colunas, tipos e datas estritamente
+    crescentes dentro de cada ticker). Lança ValueError caso contrário.
+
+    Returns:
+        pd.DataFrame: O próprio DataFrame, para encadeamento.
+    """
+    colunas = COLUNAS[tipo]
+    if list(df.columns) != colunas:
+        raise ValueError(f"Colunas inválidas para {tipo}: {list(df.columns)} (esperado {colunas})")
+
+    for coluna in colunas:
+        esperado = TIPOS[coluna]
+        if esperado == 'category':
+            valido = isinstance(df[coluna].dtype, pd.CategoricalDtype)
+        else:
+            valido = df[coluna].dtype == esperado
+        if not valido:
+            raise ValueError(f"Coluna '{coluna}' de {tipo} com tipo {df[coluna].dtype} (esperado {esperado})")
+
+    # Linhas seguidas do mesmo ticker precisam ter datas crescentes e sem repetição
+    codigos = df['ticker'].cat.codes.to_numpy()
+    datas = df['date'].to_numpy()
+    fora_de_ordem = (codigos[1:] == codigos[:-1]) & (datas[1:] <= datas[:-1])
+    if fora_de_ordem.any():
+        linha = int(np.argmax(fora_de_ordem)) + 1
+        raise ValueError(f"Datas de {tipo} fora de ordem ou repetidas para {df['ticker'].iloc[linha]} "
+                         f"em {df['date'].iloc[linha]:%Y-%m-%d}")
+    return df
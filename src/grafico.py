@@ -1,37 +1,84 @@
 import pandas as pd
-import plotly.graph_objects as go
+from src.indice_series import indexar
+from src.amostragem import lttb
+from src import metricas
 
-def gerar_grafico(ticker, num_dias, precos_medios, df_cotacoes):
+# Séries com mais pontos que isso (antes da redução por LTTB) são desenhadas com WebGL
+# (Scattergl) em vez de SVG; fica abaixo do orçamento de pontos da interface
+# (primeira_tela.MAX_PONTOS_GRAFICO) para valer também nas séries já reduzidas
+LIMIAR_WEBGL = 250
+
+
+def _adicionar_preco_medio(fig, ticker, precos_medios, x_inicio, x_fim, cotacao_atual):
+    # Linha do preço médio com anotação do valor e da diferença para a cotação atual
+    import plotly.graph_objects as go
+    preco_medio = precos_medios.get(ticker, None)
+    if preco_medio is not None:
+        # Linha horizontal: dois pontos (primeiro e último dia) bastam e mantêm o valor exato.
+        fig.add_trace(go.Scatter(
+            x=[x_inicio, x_fim], y=[preco_medio, preco_medio], mode='lines',
+            name="Preço Médio", line=dict(color='orange', dash='solid')
+        ))
+
+        # Adicionar uma anotação indicando o valor do preço médio.
+        fig.add_annotation(
+            x=x_fim, y=preco_medio,
+            text=f"Preço Médio: R$ {preco_medio:.2f}".replace('.', ','),
+            showarrow=True, arrowhead=2, ax=0, ay=-40,
+            bgcolor="orange", font=dict(color="white", size=13)
+        )
+
+        # Calcular e adicionar anotação da diferença percentual entre a cotação atual e o preço médio.
+        diferenca_percentual = ((cotacao_atual - preco_medio) / preco_medio) * 100
+        fig.add_annotation(
+            xref="paper", yref="paper", x=0.98,
+            text=f"Cotação atual vs. preço médio: {diferenca_percentual:.2f}%".replace('.', ','),
+            showarrow=False, font=dict(size=13, color="white"),
+            bgcolor="gray"
+        )
+
+
+@metricas.cronometrado('grafico.gerar_grafico')
+def gerar_grafico(ticker, num_dias, precos_medios, df_cotacoes, max_pontos=None, limiar_webgl=LIMIAR_WEBGL,
+                  barras=None, modo='linha', max_candles=None):
     """
     Gera um gráfico de cotação para um determinado ticker, utilizando dados de um DataFrame
-    carregado de um arquivo Excel.
+    no esquema canônico (src.esquema) ou, quando informadas, barras OHLCV (src.intradiario).
 
     Args:
         ticker (str): O ticker do ativo para o qual gerar o gráfico.
         num_dias (int): O número de dias recentes a serem exibidos no gráfico.
         precos_medios (dict): Um dicionário contendo os preços médios dos ativos.
                               As chaves são os tickers e os valores são os preços médios.
-        df_cotacoes (pd.DataFrame): DataFrame contendo as colunas 'date', 'ticker' e 'valor_cotação'.
+        df_cotacoes (pd.DataFrame | SeriesPorTicker): DataFrame contendo as colunas 'date', 'ticker' e
+                                                      'valor_cotação', ou o índice já construído por indexar().
+        max_pontos (int, optional): Orçamento de pontos da linha de cotação. Séries maiores são
+                                    reduzidas com LTTB, preservando picos e vales. None desativa.
+        limiar_webgl (int): Quantidade de pontos do período (antes da redução) a partir da qual
+                            a linha usa Scattergl.
+        barras (BarrasOHLCV, optional): Barras OHLCV do ticker (ex.: intradiárias); quando
+                                        informadas, o gráfico é feito a partir delas.
+        modo (str): 'linha' ou 'candles' (este último exige 'barras').
+        max_candles (int, optional): Orçamento de barras exibidas; as barras são reamostradas
+                                     para o menor tamanho que caiba nele (padrão: intradiario.MAX_CANDLES).
 
     Returns:
         plotly.graph_objects.Figure: Um objeto Figure do Plotly contendo o gráfico de cotação,
                                       ou None se não houver dados suficientes para o ticker.
     """
-    # Criamos um novo DataFrame contendo apenas as linhas correspondentes ao ticker desejado.
-    df_ticker = df_cotacoes[df_cotacoes['ticker'] == ticker].copy()
+    if barras is not None:
+        return _grafico_barras(ticker, num_dias, precos_medios, barras, modo, max_candles, limiar_webgl)
 
-    # Verifica se há dados para o ticker especificado após a filtragem.
-    if df_ticker.empty:
-        return None
-
-    # Garante que as datas sejam tratadas corretamente para ordenação e filtragem.
-    df_ticker['date'] = pd.to_datetime(df_ticker['date'], format='%d/%m/%Y')
+    # Recorte dos últimos 'num_dias' registros por busca no índice por ticker (sem varrer a tabela).
+    # Adicionamos 1 para calcular a variação.
+    datas, valores = indexar(df_cotacoes, 'valor_cotação').ultimos(ticker, num_dias + 1)
 
-    # Garante que os dados estejam na ordem cronológica correta para selecionar os últimos dias.
-    df_ticker = df_ticker.sort_values(by='date')
+    # Verifica se há dados para o ticker especificado.
+    if len(datas) == 0:
+        return None
 
-    # Pegamos os últimos 'num_dias' registros para exibir no gráfico. Adicionamos 1 para calcular a variação.
-    data = df_ticker.tail(num_dias + 1).set_index('date')
+    # Os valores ficam em float32 no esquema canônico; voltam a float64 com 2 casas para exibição.
+    data = pd.DataFrame({'valor_cotação': valores.astype('float64').round(2)}, index=pd.DatetimeIndex(datas, name='date'))
 
     # Adiciona uma coluna com a variação da cotação em relação ao dia anterior.
     data['Variação %'] = data['valor_cotação'].pct_change() * 100
@@ -46,13 +93,21 @@ def gerar_grafico(ticker, num_dias, precos_medios, df_cotacoes):
     # Obtém o valor da cotação do último dia para exibir na anotação.
     current_day_data = data['valor_cotação'].iloc[-1]
 
-    # Cria a figura do gráfico utilizando a biblioteca Plotly.
+    # Cria a figura do gráfico utilizando a biblioteca Plotly (importada só quando há gráfico a gerar).
+    import plotly.graph_objects as go
     fig = go.Figure()
 
     # Se o número de dias for maior ou igual a 16, exibe apenas linha e marcadores para evitar poluição visual.
     if num_dias >= 16:
-        fig.add_trace(go.Scatter(
-            x=data.index, y=data['valor_cotação'], mode='lines+markers',
+        # Em séries longas, envia ao navegador apenas os pontos que preservam a forma da curva.
+        serie = data['valor_cotação']
+        if max_pontos is not None and len(serie) > max_pontos:
+            serie = serie.iloc[lttb(serie.index.to_numpy(), serie.to_numpy(), max_pontos)]
+
+        # Séries longas são desenhadas com WebGL para aliviar a renderização no navegador.
+        tipo_linha = go.Scattergl if len(data) > limiar_webgl else go.Scatter
+        fig.add_trace(tipo_linha(
+            x=serie.index, y=serie, mode='lines+markers',
             name='Cotação', line=dict(color='blue')
         ))
     # Se o número de dias for menor que 16, exibe o valor e a variação em cada ponto.
@@ -69,29 +124,7 @@ def gerar_grafico(ticker, num_dias, precos_medios, df_cotacoes):
         ))
 
     # Adicionar a linha do preço médio ao gráfico, se disponível.
-    preco_medio = precos_medios.get(ticker, None)
-    if preco_medio is not None:
-        fig.add_trace(go.Scatter(
-            x=data.index, y=[preco_medio] * len(data), mode='lines',
-            name="Preço Médio", line=dict(color='orange', dash='solid')
-        ))
-
-        # Adicionar uma anotação indicando o valor do preço médio.
-        fig.add_annotation(
-            x=data.index[-1], y=preco_medio,
-            text=f"Preço Médio: R$ {preco_medio:.2f}".replace('.', ','),
-            showarrow=True, arrowhead=2, ax=0, ay=-40,
-            bgcolor="orange", font=dict(color="white", size=13)
-        )
-
-        # Calcular e adicionar anotação da diferença percentual entre a cotação atual e o preço médio.
-        diferenca_percentual = ((current_day_data - preco_medio) / preco_medio) * 100
-        fig.add_annotation(
-            xref="paper", yref="paper", x=0.98,
-            text=f"Cotação atual vs. preço médio: {diferenca_percentual:.2f}%".replace('.', ','),
-            showarrow=False, font=dict(size=13, color="white"),
-            bgcolor="gray"
-        )
+    _adicionar_preco_medio(fig, ticker, precos_medios, data.index[0], data.index[-1], current_day_data)
 
     # Ajusta o espaçamento dos ticks no eixo x com base no número de dias para melhor visualização.
     if num_dias > 30:
@@ -120,6 +153,45 @@ def gerar_grafico(ticker, num_dias, precos_medios, df_cotacoes):
 
     return fig
 
+def _grafico_barras(ticker, num_dias, precos_medios, barras, modo, max_candles, limiar_webgl):
+    # Gráfico de cotação a partir de barras OHLCV: candles (ou linha do fechamento) e volume
+    barras = barras.ultimos_dias(num_dias)
+    if not len(barras):
+        return None
+    exibidas, rotulo = barras.para_exibicao(max_candles)
+
+    # Eixo x por categoria: sem os vazios das noites e fins de semana entre os pregões
+    diario = rotulo in ('1d', '1sem')
+    x = pd.DatetimeIndex(exibidas.datas).strftime('%d/%m/%Y' if diario else '%d/%m %H:%M')
+    fechamento = exibidas.fechamento.astype('float64').round(2)
+
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    if modo == 'candles':
+        fig.add_trace(go.Candlestick(
+            x=x, open=exibidas.abertura.astype('float64').round(2), high=exibidas.maxima.astype('float64').round(2),
+            low=exibidas.minima.astype('float64').round(2), close=fechamento, name='Cotação',
+            increasing_line_color='#26a69a', decreasing_line_color='#ef5350'
+        ))
+    else:
+        tipo_linha = go.Scattergl if len(barras) > limiar_webgl else go.Scatter
+        fig.add_trace(tipo_linha(x=x, y=fechamento, mode='lines', name='Cotação', line=dict(color='blue')))
+    fig.add_trace(go.Bar(x=x, y=exibidas.volume, name='Volume', yaxis='y2', marker_color='gray', opacity=0.5))
+
+    _adicionar_preco_medio(fig, ticker, precos_medios, x[0], x[-1], fechamento[-1])
+
+    fig.update_layout(
+        title=f"Cotação do {ticker} nos últimos {num_dias} pregões (barras de {rotulo}) em comparação com preço médio",
+        title_font=dict(size=20),
+        template="plotly_dark",
+        xaxis=dict(type='category', nticks=12, tickangle=-25, rangeslider=dict(visible=False)),
+        yaxis=dict(title='Cotação (R$)', domain=[0.25, 1]),
+        yaxis2=dict(title='Volume', domain=[0, 0.2], showgrid=False),
+    )
+    return fig
+
+
+@metricas.cronometrado('grafico.gerar_grafico_dividendos')
 def gerar_grafico_dividendos(ticker, meses, df_dividendos):
     """
     Gera um gráfico de dividendos para um determinado ticker a partir de um DataFrame.
@@ -127,38 +199,27 @@ def gerar_grafico_dividendos(ticker, meses, df_dividendos):
     Args:
         ticker (str): O ticker do ativo para o qual gerar o gráfico.
         meses (int): O número de meses recentes a serem exibidos no gráfico.
-        df_dividendos (pd.DataFrame): DataFrame contendo as colunas 'ticker', 'date' e 'dividendo'.
+        df_dividendos (pd.DataFrame | SeriesPorTicker): DataFrame contendo as colunas 'ticker', 'date' e
+                                                        'dividendo', ou o índice já construído por indexar().
 
     Returns:
         plotly.graph_objects.Figure: Um objeto Figure do Plotly contendo o gráfico de dividendos,
                                       ou None se não houver dados suficientes para o ticker.
     """
 
-    # Criamos um novo DataFrame contendo apenas as linhas correspondentes ao ticker desejado.
-    df_ticker_dividendos = df_dividendos[df_dividendos['ticker'] == ticker].copy()
-
-    # Conversão da coluna de data para o tipo datetime.
-    # Isso garante que as datas sejam tratadas corretamente para filtragem e ordenação.
-    df_ticker_dividendos['date'] = pd.to_datetime(df_dividendos['date'], format='%d/%m/%Y')
-
-    # Verifica se há dados para o ticker especificado após a filtragem.
-    if df_ticker_dividendos.empty:
-        return None
-
-    # Mantemos apenas os dividendos que ocorreram nos últimos 'meses' meses.
-    data_filtrada = df_ticker_dividendos[df_ticker_dividendos['date'] >= (pd.Timestamp.now() - pd.DateOffset(months=meses))]
+    # Mantemos apenas os dividendos que ocorreram nos últimos 'meses' meses (busca binária no índice por ticker).
+    datas, valores = indexar(df_dividendos, 'dividendo').desde(ticker, pd.Timestamp.now() - pd.DateOffset(months=meses))
+    data_filtrada = pd.DataFrame({'date': datas, 'dividendo': valores.astype('float64').round(6)})
 
     # Verifica se há dados dentro do período de tempo especificado.
     if data_filtrada.empty:
         return None
 
-    # Ordenação dos dados por data. Isso garante que o gráfico exiba os dividendos em ordem cronológica.
-    data_filtrada = data_filtrada.sort_values(by='date')
-
     # Cálculo da variação percentual dos dividendos. Isso adiciona uma coluna com a variação do dividendo em relação ao pagamento anterior.
     data_filtrada['Variação %'] = data_filtrada['dividendo'].pct_change().round(2) * 100
 
     # Cria a figura do gráfico utilizando a biblioteca Plotly.
+    import plotly.graph_objects as go
     fig = go.Figure()
 
     # Adiciona um traço ao gráfico, que representa a linha dos dividendos ao longo do tempo.
@@ -194,4 +255,163 @@ def gerar_grafico_dividendos(ticker, meses, df_dividendos):
         )
     )
 
-    return fig
\ No newline at end of file
+    return fig
+
+def _layout_analise(fig, titulo, num_dias, eixo_y):
+    # Layout comum dos gráficos de análise móvel (mesmo tema e formato de datas dos demais)
+    fig.update_layout(
+        title=titulo,
+        title_font=dict(size=20),
+        template="plotly_dark",
+        hovermode="x unified",
+        xaxis=dict(
+            tickformat="%d-%m-%Y",
+            tickangle=-25,
+            dtick="M1" if num_dias > 30 else "W1" if num_dias > 10 else "D1"
+        ),
+        yaxis=dict(title=eixo_y)
+    )
+    return fig
+
+
+@metricas.cronometrado('grafico.gerar_grafico_medias_moveis')
+def gerar_grafico_medias_moveis(ticker, num_dias, analise, max_pontos=None):
+    """
+    Gera o gráfico da cotação com as médias móveis calculadas em src.analise.
+
+    Args:
+        ticker (str): O ticker do ativo.
+        num_dias (int): Quantidade de pregões recentes exibidos.
+        analise (AnaliseMovel): Resultado de src.analise.calcular_analise.
+        max_pontos (int, optional): Orçamento de pontos por linha (LTTB). None desativa.
+
+    Returns:
+        plotly.graph_objects.Figure: A figura, ou None se não houver cotações do ticker.
+    """
+    serie = analise.serie(ticker, num_dias)
+    if serie.empty:
+        return None
+
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    colunas = [('cotacao', 'Cotação', 'blue')] + [
+        (f'mm_{janela}', f'Média móvel {janela}', cor)
+        for janela, cor in zip(analise.medias_moveis, ('orange', 'limegreen', 'violet', 'gold'))
+    ]
+    for coluna, nome, cor in colunas:
+        valores = serie[coluna].dropna()
+        if valores.empty:
+            continue
+        if max_pontos is not None and len(valores) > max_pontos:
+            valores = valores.iloc[lttb(valores.index.to_numpy(), valores.to_numpy(), max_pontos)]
+        fig.add_trace(go.Scatter(x=valores.index, y=valores.round(2), mode='lines', name=nome, line=dict(color=cor)))
+
+    return _layout_analise(fig, f"Cotação e médias móveis do {ticker} nos últimos {num_dias} dias",
+                           num_dias, "Cotação (R$)")
+
+
+@metricas.cronometrado('grafico.gerar_grafico_yields')
+def gerar_grafico_yields(ticker, num_dias, analise):
+    """
+    Gera o gráfico da evolução do Dividend Yield e do Yield on Cost dos últimos 12 meses.
+
+    Args:
+        ticker (str): O ticker do ativo.
+        num_dias (int): Quantidade de pregões recentes exibidos.
+        analise (AnaliseMovel): Resultado de src.analise.calcular_analise.
+
+    Returns:
+        plotly.graph_objects.Figure: A figura, ou None se o ticker não tiver dividendos no período.
+    """
+    serie = analise.serie(ticker, num_dias)
+    if serie.empty or not (serie['dividendos_12m'] > 0).any():
+        return None
+
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=serie.index, y=serie['dy_12m'].round(2), mode='lines',
+                             name='DY 12m (%)', line=dict(color='blue')))
+    if serie['yoc_12m'].notna().any():
+        fig.add_trace(go.Scatter(x=serie.index, y=serie['yoc_12m'].round(2), mode='lines',
+                                 name='YOC 12m (%)', line=dict(color='orange')))
+
+    fig = _layout_analise(fig, f"Dividend Yield e Yield on Cost (12 meses) do {ticker} nos últimos {num_dias} dias",
+                          num_dias, "Yield (%)")
+    fig.update_layout(yaxis=dict(ticksuffix="%"))
+    return fig
+
+
+@metricas.cronometrado('grafico.gerar_grafico_risco')
+def gerar_grafico_risco(ticker, num_dias, analise):
+    """
+    Gera o gráfico de risco: volatilidade anualizada e drawdown em relação ao maior preço anterior.
+
+    Args:
+        ticker (str): O ticker do ativo.
+        num_dias (int): Quantidade de pregões recentes exibidos.
+        analise (AnaliseMovel): Resultado de src.analise.calcular_analise.
+
+    Returns:
+        plotly.graph_objects.Figure: A figura, ou None se não houver cotações do ticker.
+    """
+    serie = analise.serie(ticker, num_dias)
+    if serie.empty:
+        return None
+
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=serie.index, y=serie['drawdown'].round(2), mode='lines', name='Drawdown (%)',
+                             fill='tozeroy', line=dict(color='firebrick')))
+    fig.add_trace(go.Scatter(x=serie.index, y=serie['volatilidade'].round(2), mode='lines',
+                             name='Volatilidade anualizada (%)', line=dict(color='gold'), yaxis='y2'))
+
+    fig = _layout_analise(fig, f"Drawdown e volatilidade do {ticker} nos últimos {num_dias} dias",
+                          num_dias, "Drawdown (%)")
+    fig.update_layout(
+        yaxis=dict(ticksuffix="%"),
+        yaxis2=dict(title="Volatilidade (%)", ticksuffix="%", overlaying='y', side='right', showgrid=False),
+        legend=dict(orientation='h', y=-0.25)
+    )
+    return fig
+
+
+@metricas.cronometrado('grafico.gerar_grafico_simulacao')
+def gerar_grafico_simulacao(curvas, titulo, eixo_y, referencia=None, nome_referencia=None, barras=False):
+    """
+    Gera o gráfico das curvas de uma simulação (src.simulacao), uma linha por cenário.
+
+    Args:
+        curvas (pd.DataFrame): Índice de datas e uma coluna por cenário.
+        titulo (str): Título do gráfico.
+        eixo_y (str): Título do eixo y.
+        referencia (pd.Series, optional): Curva tracejada de comparação (ex.: total investido).
+        nome_referencia (str, optional): Nome da curva de referência na legenda.
+        barras (bool): Desenha os cenários como barras agrupadas (ex.: renda mensal).
+
+    Returns:
+        plotly.graph_objects.Figure: A figura, ou None se não houver curvas.
+    """
+    if curvas is None or curvas.empty:
+        return None
+
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    for cenario in curvas.columns:
+        if barras:
+            fig.add_trace(go.Bar(x=curvas.index, y=curvas[cenario].round(2), name=str(cenario)))
+        else:
+            fig.add_trace(go.Scatter(x=curvas.index, y=curvas[cenario].round(2), mode='lines', name=str(cenario)))
+    if referencia is not None:
+        fig.add_trace(go.Scatter(x=referencia.index, y=referencia.round(2), mode='lines', name=nome_referencia,
+                                 line=dict(color='gray', dash='dash')))
+
+    fig.update_layout(
+        title=titulo,
+        title_font=dict(size=20),
+        template="plotly_dark",
+        hovermode="x unified",
+        barmode="group",
+        xaxis=dict(tickformat="%m-%Y", tickangle=-25),
+        yaxis=dict(title=eixo_y, tickprefix="R$ ")
+    )
+    return fig
@@ -0,0 +1,217 @@
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from src.dados_online import iterar_cotacoes_e_dividendos_yahoo
+from src import metricas
+from src.esquema import de_arrays, normalizar, vazio
+
+# Banco local com o histórico de cada ticker
+CAMINHO_BANCO = os.path.join('data', 'historico.sqlite')
+
+# Dias de histórico de dividendos devolvidos (e usados nos indicadores e na avaliação)
+DIAS_DIVIDENDOS = 365
+
+# Dias reprocessados antes da última data armazenada (corrige o fechamento do último pregão)
+SOBREPOSICAO_DIAS = 5
+
+# Tempo (s) que uma conexão espera por outra que esteja gravando, em vez de falhar com "database is locked"
+ESPERA_TRAVA_BANCO_SEGUNDOS = 30
+
+# Situação dos dados de cada ticker após uma atualização
+ATUALIZADO = 'atualizado'      # baixado agora
+LOCAL = 'local'                # download falhou; dados do histórico local (podem estar defasados)
+INDISPONIVEL = 'indisponível'  # download falhou e não há histórico local
+
+_TABELAS = {
+    'cotacoes': 'valor_cotação',
+    'dividendos': 'dividendo',
+}
+
+
+def conectar(caminho=CAMINHO_BANCO) -> sqlite3.Connection:
+    """
+    Abre (e cria, se necessário) o banco de histórico local.
+    Cada tabela tem chave primária (ticker, date), o que garante que não haja duplicatas.
+    """
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+
+    conexao = sqlite3.connect(caminho, timeout=ESPERA_TRAVA_BANCO_SEGUNDOS)
+    # WAL: leitores (interface, relatório) não bloqueiam nem são bloqueados pela gravação da atualização
+    conexao.execute('PRAGMA journal_mode=WAL')
+    with conexao:
+        for tabela, coluna in _TABELAS.items():
+            conexao.execute(
+                f'CREATE TABLE IF NOT EXISTS {tabela} ('
+                f'ticker TEXT NOT NULL, date TEXT NOT NULL, "{coluna}" REAL, '
+                f'PRIMARY KEY (ticker, date)) WITHOUT ROWID'
+            )
+    return conexao
+
+
+def ultimas_datas(conexao, tabela='cotacoes') -> dict:
+    """Retorna a última data armazenada (datetime) de cada ticker da tabela."""
+    linhas = conexao.execute(f'SELECT ticker, MAX(date) FROM {tabela} GROUP BY ticker').fetchall()
+    return {ticker: datetime.strptime(data, '%Y-%m-%d') for ticker, data in linhas}
+
+
+@metricas.cronometrado('historico_local.gravar')
+def gravar(conexao, tabela, df):
+    """
+    Insere ou atualiza (upsert) as linhas do DataFrame na tabela, deduplicando por (ticker, date).
+    O DataFrame deve estar no esquema canônico (src.esquema).
+    """
+    if df is None or df.empty:
+        return 0
+
+    coluna = _TABELAS[tabela]
+    datas = np.datetime_as_string(df['date'].to_numpy(dtype='datetime64[D]'))
+    # Volta para float64 arredondando o ruído da conversão de float32
+    valores = df[coluna].astype('float64').round(6)
+    linhas = list(zip(df['ticker'].astype(str), datas, valores))
+
+    with conexao:
+        conexao.executemany(
+            f'INSERT INTO {tabela} (ticker, date, "{coluna}") VALUES (?, ?, ?) '
+            f'ON CONFLICT (ticker, date) DO UPDATE SET "{coluna}" = excluded."{coluna}"',
+            linhas
+        )
+    return len(linhas)
+
+
+@metricas.cronometrado('historico_local.ler')
+def ler(conexao, tabela, tickers, days_range=None) -> pd.DataFrame:
+    """
+    Lê o histórico armazenado dos tickers, opcionalmente limitado aos últimos 'days_range' dias.
+
+    Retorna DataFrame no esquema canônico (src.esquema): date | ticker | valor
+    """
+    coluna = _TABELAS[tabela]
+    tickers = list(tickers)
+    if not tickers:
+        return vazio(tabela)
+
+    consulta = f'SELECT date, ticker, "{coluna}" FROM {tabela} WHERE ticker IN ({",".join("?" * len(tickers))})'
+    parametros = tickers
+    if days_range is not None:
+        consulta += ' AND date >= ?'
+        parametros = tickers + [(datetime.today() - timedelta(days=days_range)).strftime('%Y-%m-%d')]
+    consulta += ' ORDER BY ticker, date'
+
+    df = pd.read_sql_query(consulta, conexao, params=parametros)
+    datas = df['date'].to_numpy(dtype='datetime64[D]')
+    if len(tickers) == 1:
+        # Um ticker: a chave primária garante datas únicas e o ORDER BY, a ordem
+        return de_arrays(datas, tickers[0], df[coluna], tabela)
+    df['date'] = datas.astype('datetime64[ns]')
+    return normalizar(df, tabela)
+
+
+def tickers_armazenados(conexao, tabela='cotacoes') -> list:
+    """Tickers com histórico na tabela, em ordem alfabética."""
+    return [ticker for (ticker,) in conexao.execute(f'SELECT DISTINCT ticker FROM {tabela} ORDER BY ticker')]
+
+
+def ler_armazenados(caminho=CAMINHO_BANCO, days_range=520, dividendos_days_range=DIAS_DIVIDENDOS) -> tuple:
+    """
+    Lê o histórico de todos os tickers do banco, inclusive os que não foram atualizados
+    agora (ex.: base dos snapshots offline).
+
+    Returns:
+        tuple: (df_cotacoes, df_dividendos) no esquema canônico.
+    """
+    conexao = conectar(caminho)
+    try:
+        tickers = tickers_armazenados(conexao)
+        return (ler(conexao, 'cotacoes', tickers, days_range),
+                ler(conexao, 'dividendos', tickers, dividendos_days_range))
+    finally:
+        conexao.close()
+
+
+def situacao_do_ticker(registro, df_cotacoes):
+    """Classifica os dados de um ticker em ATUALIZADO, LOCAL ou INDISPONIVEL."""
+    if registro is not None and registro['status'] == 'ok':
+        return ATUALIZADO
+    return LOCAL if not df_cotacoes.empty else INDISPONIVEL
+
+
+def atualizar_historico(tickers: list,
+                        caminho=CAMINHO_BANCO,
+                        days_range=520,
+                        dividendos_days_range=DIAS_DIVIDENDOS,
+                        sobreposicao_dias=SOBREPOSICAO_DIAS,
+                        **kwargs) -> tuple:
+    """
+    Atualiza o histórico local de forma incremental e devolve os dados armazenados.
+
+    Para tickers já presentes no banco, busca apenas a partir de
+    (última data armazenada - sobreposicao_dias); para os demais, baixa o intervalo completo.
+    As novas linhas são gravadas com upsert em (ticker, date). Tickers cujo download
+    falhou (mesmo após as retentativas) são completados com o histórico já armazenado.
+
+    Args:
+        tickers (list): Lista de tickers a atualizar.
+        caminho (str): Caminho do banco SQLite.
+        days_range (int): Dias de histórico de cotações devolvidos.
+        dividendos_days_range (int): Dias de histórico de dividendos devolvidos.
+        sobreposicao_dias (int): Dias rebaixados antes da última data armazenada.
+        **kwargs: Repassados a iterar_cotacoes_e_dividendos_yahoo (limites, relatorio...).
+
+    Returns:
+        tuple: (df_cotacoes, df_dividendos, situacao), com os DataFrames no esquema canônico
+               e situacao = {ticker: ATUALIZADO | LOCAL | INDISPONIVEL}.
+    """
+    situacao = {ticker: estado for ticker, _, _, estado in
+                iterar_historico(tickers, caminho, days_range, dividendos_days_range, sobreposicao_dias, **kwargs)}
+
+    conexao = conectar(caminho)
+    try:
+        df_cotacoes = ler(conexao, 'cotacoes', tickers, days_range)
+        df_dividendos = ler(conexao, 'dividendos', tickers, dividendos_days_range)
+        return df_cotacoes, df_dividendos, situacao
+    finally:
+        conexao.close()
+
+
+def iterar_historico(tickers: list,
+                     caminho=CAMINHO_BANCO,
+                     days_range=520,
+                     dividendos_days_range=DIAS_DIVIDENDOS,
+                     sobreposicao_dias=SOBREPOSICAO_DIAS,
+                     **kwargs):
+    """
+    Gerador: versão progressiva de atualizar_historico. Cada ticker é gravado no banco
+    assim que sua resposta chega e é entregue já com o histórico armazenado completo.
+
+    Args:
+        Os mesmos de atualizar_historico; **kwargs são repassados a
+        iterar_cotacoes_e_dividendos_yahoo.
+
+    Yields:
+        tuple: (ticker, df_cotacoes, df_dividendos, situacao) na ordem de chegada, com os
+               DataFrames no esquema canônico e a situação como em situacao_do_ticker.
+    """
+    conexao = conectar(caminho)
+    try:
+        period1_por_ticker = {
+            ticker: int((data - timedelta(days=sobreposicao_dias)).timestamp())
+            for ticker, data in ultimas_datas(conexao, 'cotacoes').items()
+            if ticker in tickers
+        }
+        print(f"{len(period1_por_ticker)}/{len(tickers)} tickers com histórico local (busca incremental).")
+
+        for ticker, df_cot, df_div, registro in iterar_cotacoes_e_dividendos_yahoo(
+                tickers, days_range, dividendos_days_range,
+                period1_por_ticker=period1_por_ticker, **kwargs):
+            gravar(conexao, 'cotacoes', df_cot)
+            gravar(conexao, 'dividendos', df_div)
+            # Com ou sem download, o ticker sai do banco: falhas ficam com o último histórico salvo
+            df_cotacoes = ler(conexao, 'cotacoes', [ticker], days_range)
+            df_dividendos = ler(conexao, 'dividendos', [ticker], dividendos_days_range)
+            yield ticker, df_cotacoes, df_dividendos, situacao_do_ticker(registro, df_cotacoes)
+    finally:
+        conexao.close()
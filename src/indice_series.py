@@ -0,0 +1,170 @@
+import hashlib
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+from src import metricas
+
+
+class SeriesPorTicker:
+    """
+    Índice de séries por ticker construído uma única vez a partir de um DataFrame no
+    esquema canônico (src.esquema). Guarda as datas e os valores em arrays NumPy
+    contíguos, ordenados por (ticker, date), e o intervalo [início, fim) de cada ticker.
+
+    Os recortes ("últimos N pregões", "desde a data X") são views obtidas por busca
+    binária, sem varrer a tabela inteira.
+    """
+
+    def __init__(self, df, coluna_valor):
+        codigos = df['ticker'].cat.codes.to_numpy()
+        datas = df['date'].to_numpy(dtype='datetime64[ns]')
+        valores = df[coluna_valor].to_numpy()
+
+        # O esquema canônico já vem ordenado; reordena apenas se necessário
+        if len(codigos) > 1 and (np.any(np.diff(codigos) < 0) or not _datas_ordenadas(codigos, datas)):
+            ordem = np.lexsort((datas, codigos))
+            codigos, datas, valores = codigos[ordem], datas[ordem], valores[ordem]
+
+        self.coluna_valor = coluna_valor
+        self.datas = np.ascontiguousarray(datas)
+        self.valores = np.ascontiguousarray(valores)
+
+        categorias = df['ticker'].cat.categories
+        inicios = np.flatnonzero(np.r_[True, codigos[1:] != codigos[:-1]]) if len(codigos) else np.array([], dtype=int)
+        fins = np.r_[inicios[1:], len(codigos)] if len(codigos) else np.array([], dtype=int)
+        self._limites = {
+            str(categorias[codigos[inicio]]): (int(inicio), int(fim))
+            for inicio, fim in zip(inicios, fins)
+        }
+        self._soma_acumulada = None
+
+        # Identifica o conteúdo; usado como versão dos dados em caches posteriores
+        resumo = hashlib.sha1()
+        resumo.update(self.datas.view('int64').tobytes())
+        resumo.update(np.ascontiguousarray(self.valores).tobytes())
+        resumo.update(repr(sorted(self._limites.items())).encode('utf-8'))
+        self.versao = resumo.hexdigest()[:16]
+
+    @property
+    def tickers(self):
+        return list(self._limites)
+
+    def __contains__(self, ticker):
+        return ticker in self._limites
+
+    def serie(self, ticker):
+        """Retorna (datas, valores) completos do ticker; arrays vazios se ele não existir."""
+        inicio, fim = self._limites.get(ticker, (0, 0))
+        return self.datas[inicio:fim], self.valores[inicio:fim]
+
+    def ultimos(self, ticker, n):
+        """Retorna (datas, valores) dos últimos 'n' registros do ticker."""
+        inicio, fim = self._limites.get(ticker, (0, 0))
+        inicio = max(inicio, fim - int(n))
+        return self.datas[inicio:fim], self.valores[inicio:fim]
+
+    def desde(self, ticker, data_inicio):
+        """Retorna (datas, valores) do ticker com date >= data_inicio (busca binária)."""
+        inicio, fim = self._limites.get(ticker, (0, 0))
+        posicao = inicio + np.searchsorted(self.datas[inicio:fim], np.datetime64(pd.Timestamp(data_inicio), 'ns'), 'left')
+        return self.datas[posicao:fim], self.valores[posicao:fim]
+
+    def ultimos_valores(self, tickers):
+        """Último valor de cada ticker (NaN para tickers sem dados)."""
+        resultado = np.full(len(tickers), np.nan)
+        for i, ticker in enumerate(tickers):
+            inicio, fim = self._limites.get(ticker, (0, 0))
+            if fim > inicio:
+                resultado[i] = self.valores[fim - 1]
+        return resultado
+
+    def somas_desde(self, tickers, data_inicio):
+        """
+        Soma e quantidade de valores com date >= data_inicio para cada ticker, usando
+        busca binária por ticker e uma soma acumulada calculada uma vez.
+
+        Returns:
+            tuple: (somas, contagens) como arrays NumPy alinhados a 'tickers'.
+        """
+        if self._soma_acumulada is None:
+            self._soma_acumulada = np.r_[0.0, np.cumsum(self.valores, dtype='float64')]
+
+        limite = np.datetime64(pd.Timestamp(data_inicio), 'ns')
+        posicoes = np.zeros(len(tickers), dtype='int64')
+        fins = np.zeros(len(tickers), dtype='int64')
+        for i, ticker in enumerate(tickers):
+            inicio, fim = self._limites.get(ticker, (0, 0))
+            posicoes[i] = inicio + np.searchsorted(self.datas[inicio:fim], limite, 'left')
+            fins[i] = fim
+        somas = self._soma_acumulada[fins] - self._soma_acumulada[posicoes]
+        return somas, fins - posicoes
+
+    def larga(self, tickers=None, somar=False):
+        """
+        Matriz larga data × ticker montada de uma vez a partir dos arrays contíguos
+        (sem filtrar o DataFrame ticker a ticker).
+
+        Args:
+            tickers (list, optional): Colunas da matriz, nesta ordem (padrão: todos os tickers).
+            somar (bool): Soma os registros do mesmo ticker no mesmo dia (dividendos); senão
+                          vale o último.
+
+        Returns:
+            tuple: (datas únicas ordenadas, matriz float64 [datas × tickers], NaN onde não há registro)
+        """
+        tickers = self.tickers if tickers is None else list(tickers)
+        limites = np.array([self._limites.get(ticker, (0, 0)) for ticker in tickers], dtype='int64').reshape(-1, 2)
+        tamanhos = limites[:, 1] - limites[:, 0]
+        total = int(tamanhos.sum())
+
+        # Posições dos registros de cada ticker, concatenadas, e a coluna de cada registro
+        deslocamentos = np.repeat(limites[:, 0] - (np.cumsum(tamanhos) - tamanhos), tamanhos)
+        posicoes = deslocamentos + np.arange(total)
+        colunas = np.repeat(np.arange(len(tickers)), tamanhos)
+
+        datas, linhas = np.unique(self.datas[posicoes], return_inverse=True)
+        valores = self.valores[posicoes].astype('float64')
+        if somar:
+            matriz = np.zeros((len(datas), len(tickers)))
+            np.add.at(matriz, (linhas, colunas), valores)
+            preenchidas = np.zeros(matriz.shape, dtype=bool)
+            preenchidas[linhas, colunas] = True
+            matriz[~preenchidas] = np.nan
+        else:
+            matriz = np.full((len(datas), len(tickers)), np.nan)
+            matriz[linhas, colunas] = valores
+        return datas, matriz
+
+
+def _datas_ordenadas(codigos, datas):
+    # Dentro de cada ticker as datas precisam ser crescentes
+    mesma_serie = codigos[1:] == codigos[:-1]
+    return not np.any(mesma_serie & (datas[1:] < datas[:-1]))
+
+
+_indices = {}
+_lock = threading.Lock()
+
+
+def indexar(df, coluna_valor):
+    """
+    Retorna o SeriesPorTicker do DataFrame, construindo-o apenas na primeira chamada.
+    O índice fica associado ao próprio objeto DataFrame e é descartado junto com ele;
+    se já for um SeriesPorTicker, é devolvido sem alterações.
+    """
+    if isinstance(df, SeriesPorTicker):
+        return df
+
+    chave = (id(df), coluna_valor)
+    with _lock:
+        registro = _indices.get(chave)
+    if registro is not None and registro[0]() is df:
+        return registro[1]
+
+    with metricas.cronometro('indice_series.indexar'):
+        indice = SeriesPorTicker(df, coluna_valor)
+    with _lock:
+        _indices[chave] = (weakref.ref(df), indice)
+    weakref.finalize(df, _indices.pop, chave, None)
+    return indice
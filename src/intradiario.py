@@ -0,0 +1,336 @@
+"""
+Barras intradiárias (5m, 15m e 60m) com OHLCV completo.
+
+As barras ficam em arrays colunares: tempo em epoch (int64, segundos UTC) e abertura,
+máxima, mínima, fechamento e volume em float32, 28 bytes por barra. Em disco, cada
+ticker tem um bloco .npy por pregão (data/intradiario/<intervalo>/<ticker>/<AAAA-MM-DD>.npy):
+a atualização regrava apenas os pregões novos e a leitura carrega só os dias pedidos,
+então a memória depende do período exibido e não do histórico guardado.
+
+Para exibição, as barras são reamostradas para barras maiores (ex.: 5m -> 1h -> 1d) de
+forma vetorizada (np.*.reduceat), até caberem no orçamento de candles do gráfico.
+"""
+import os
+import json
+import time
+import tempfile
+import numpy as np
+from src.cache_lru import CacheLRU
+from src import cache_compartilhado, dados_online, metricas
+
+PASTA_INTRADIARIO = os.path.join('data', 'intradiario')
+
+# Duração de cada intervalo armazenado, em segundos
+INTERVALOS = {'5m': 300, '15m': 900, '60m': 3600}
+
+# Histórico máximo oferecido pelo Yahoo para cada intervalo, em dias corridos (60 e 730,
+# com um dia de folga)
+LIMITE_DIAS = {'5m': 59, '15m': 59, '60m': 729}
+
+# Pregões guardados em disco por ticker e intervalo; os mais antigos são apagados
+MAX_DIAS_GUARDADOS = 800
+
+# Após este tempo o último pregão é buscado de novo (pode ainda estar em formação)
+ATUALIZACAO_MINUTOS = 15
+
+# Barras de exibição, da menor para a maior: o gráfico usa a primeira que caiba no orçamento
+BARRAS_EXIBICAO = {'5m': 300, '15m': 900, '30m': 1800, '1h': 3600, '2h': 7200, '1d': 86400, '1sem': 7 * 86400}
+
+# Orçamento de candles por gráfico (limita o tempo de renderização no navegador)
+MAX_CANDLES = 400
+
+# Conjuntos de barras mantidos em memória (ticker, intervalo e período)
+TAMANHO_CACHE = 16
+
+# Layout de cada pregão em disco
+DTYPE_BLOCO = np.dtype([('tempo', '<i8'), ('abertura', '<f4'), ('maxima', '<f4'), ('minima', '<f4'),
+                        ('fechamento', '<f4'), ('volume', '<f4')])
+
+# O epoch 0 caiu numa quinta-feira; as barras semanais começam na segunda
+_ANCORA_SEMANA = 3 * 86400
+
+_DIA = 86400
+
+
+class BarrasOHLCV:
+    """
+    Barras OHLCV de um ticker em arrays colunares contíguos, ordenadas pelo tempo.
+
+    Args:
+        tempo (np.ndarray): Início de cada barra, em epoch (int64, segundos UTC).
+        abertura, maxima, minima, fechamento, volume (np.ndarray): Valores em float32.
+        deslocamento (int): Deslocamento da bolsa em relação ao UTC, em segundos
+                            (meta.gmtoffset do Yahoo); define o dia de cada barra.
+        segundos (int): Duração de cada barra (0 se desconhecida).
+        versao (str): Identifica os dados (usado como chave dos gráficos em cache).
+    """
+
+    COLUNAS = ('abertura', 'maxima', 'minima', 'fechamento', 'volume')
+
+    def __init__(self, tempo, abertura, maxima, minima, fechamento, volume, deslocamento=0, segundos=0, versao=''):
+        self.tempo = np.ascontiguousarray(tempo, dtype='int64')
+        self.abertura = np.ascontiguousarray(abertura, dtype='float32')
+        self.maxima = np.ascontiguousarray(maxima, dtype='float32')
+        self.minima = np.ascontiguousarray(minima, dtype='float32')
+        self.fechamento = np.ascontiguousarray(fechamento, dtype='float32')
+        self.volume = np.ascontiguousarray(volume, dtype='float32')
+        self.deslocamento = int(deslocamento)
+        self.segundos = int(segundos)
+        self.versao = versao
+
+    def __len__(self):
+        return len(self.tempo)
+
+    @property
+    def nbytes(self):
+        return self.tempo.nbytes + sum(getattr(self, coluna).nbytes for coluna in self.COLUNAS)
+
+    @property
+    def datas(self):
+        """Início de cada barra no horário local da bolsa (datetime64[s])."""
+        return (self.tempo + self.deslocamento).astype('datetime64[s]')
+
+    @property
+    def dias(self):
+        """Dia local (número de dias desde o epoch) de cada barra."""
+        return (self.tempo + self.deslocamento) // _DIA
+
+    def _recorte(self, posicoes, versao=''):
+        return BarrasOHLCV(self.tempo[posicoes], *(getattr(self, coluna)[posicoes] for coluna in self.COLUNAS),
+                           deslocamento=self.deslocamento, segundos=self.segundos, versao=versao)
+
+    def ultimos_dias(self, dias):
+        """
+        Barras dos últimos 'dias' pregões com negociação. Volta um pregão por vez com
+        busca binária em 'tempo' (O(dias · log n)), sem percorrer todas as barras.
+        """
+        inicio = len(self.tempo)
+        for _ in range(int(dias)):
+            if inicio == 0:
+                break
+            dia = (int(self.tempo[inicio - 1]) + self.deslocamento) // _DIA
+            inicio = int(np.searchsorted(self.tempo, dia * _DIA - self.deslocamento, 'left'))
+        if inicio == 0:
+            return self
+        return self._recorte(slice(inicio, None), f'{self.versao}:{int(dias)}d')
+
+    def reamostrar(self, segundos):
+        """
+        Agrega as barras em barras de 'segundos' (múltiplo da duração original), alinhadas
+        ao horário local: abertura da primeira, máxima e mínima do grupo, fechamento da
+        última e volume somado. Barras semanais começam na segunda-feira.
+        """
+        if not len(self):
+            return self
+        ancora = _ANCORA_SEMANA if segundos % (7 * _DIA) == 0 else 0
+        grupo = (self.tempo + self.deslocamento + ancora) // segundos
+        inicios = np.flatnonzero(np.r_[True, grupo[1:] != grupo[:-1]])
+        fins = np.r_[inicios[1:], len(grupo)] - 1
+        return BarrasOHLCV(
+            grupo[inicios] * segundos - self.deslocamento - ancora,
+            self.abertura[inicios],
+            np.maximum.reduceat(self.maxima, inicios),
+            np.minimum.reduceat(self.minima, inicios),
+            self.fechamento[fins],
+            np.add.reduceat(self.volume, inicios, dtype='float64'),
+            deslocamento=self.deslocamento,
+            segundos=segundos,
+            versao=f'{self.versao}:{segundos}s',
+        )
+
+    def para_exibicao(self, max_barras=None):
+        """
+        Reamostra para a menor barra de BARRAS_EXIBICAO (não menor que as barras atuais)
+        que deixe no máximo 'max_barras' barras (padrão: MAX_CANDLES).
+
+        Returns:
+            tuple: (BarrasOHLCV, rótulo da barra, ex.: '1h')
+        """
+        max_barras = MAX_CANDLES if max_barras is None else max_barras
+        escolhida = list(BARRAS_EXIBICAO.items())[-1]
+        for rotulo, segundos in BARRAS_EXIBICAO.items():
+            if segundos < self.segundos:
+                continue
+            escolhida = (rotulo, segundos)
+            # Cota superior barata: quantos grupos distintos existem nesse tamanho
+            grupo = (self.tempo + self.deslocamento) // segundos
+            if len(grupo) <= max_barras or np.count_nonzero(grupo[1:] != grupo[:-1]) + 1 <= max_barras:
+                break
+        rotulo, segundos = escolhida
+        return self.reamostrar(segundos), rotulo
+
+
+def _pasta(ticker, intervalo, pasta):
+    return os.path.join(pasta, intervalo, ticker)
+
+
+def _ler_meta(pasta_ticker):
+    try:
+        with open(os.path.join(pasta_ticker, 'meta.json'), encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+def _gravar_atomico(caminho, escrever):
+    descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'wb') as arquivo:
+            escrever(arquivo)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def gravar_blocos(ticker, intervalo, barras, pasta=PASTA_INTRADIARIO, desde=None):
+    """
+    Grava as barras em um bloco por pregão (escrita atômica), substituindo os pregões
+    que já existiam, e apaga os blocos além de MAX_DIAS_GUARDADOS.
+
+    'desde' (AAAA-MM-DD) é o início do período pedido ao Yahoo; o meta.json guarda o mais
+    antigo coberto sem lacunas, para a próxima atualização saber se o histórico está
+    completo mesmo sem blocos nos fins de semana e feriados.
+    """
+    pasta_ticker = _pasta(ticker, intervalo, pasta)
+    os.makedirs(pasta_ticker, exist_ok=True)
+
+    # A cobertura anterior só continua valendo se o período novo emenda com o último pregão guardado
+    coberto = (_ler_meta(pasta_ticker) or {}).get('desde')
+    anteriores = sorted(nome for nome in os.listdir(pasta_ticker) if nome.endswith('.npy'))
+    if coberto is not None and (desde is None or (anteriores and desde <= anteriores[-1][:-len('.npy')])):
+        desde = min(coberto, desde or coberto)
+
+    if len(barras):
+        bloco = np.empty(len(barras), dtype=DTYPE_BLOCO)
+        bloco['tempo'] = barras.tempo
+        for coluna in BarrasOHLCV.COLUNAS:
+            bloco[coluna] = getattr(barras, coluna)
+        dias = barras.dias
+        inicios = np.flatnonzero(np.r_[True, dias[1:] != dias[:-1]])
+        for inicio, fim in zip(inicios, np.r_[inicios[1:], len(dias)]):
+            nome = f"{np.datetime64(int(dias[inicio]), 'D')}.npy"
+            _gravar_atomico(os.path.join(pasta_ticker, nome), lambda arquivo: np.save(arquivo, bloco[inicio:fim]))
+
+    nomes = sorted(nome for nome in os.listdir(pasta_ticker) if nome.endswith('.npy'))
+    for nome in nomes[:-MAX_DIAS_GUARDADOS]:
+        os.remove(os.path.join(pasta_ticker, nome))
+
+    meta = {'gmtoffset': barras.deslocamento, 'atualizado_em': time.time(), 'desde': desde}
+    _gravar_atomico(os.path.join(pasta_ticker, 'meta.json'),
+                    lambda arquivo: arquivo.write(json.dumps(meta).encode('utf-8')))
+
+
+def ler_blocos(ticker, intervalo, dias, pasta=PASTA_INTRADIARIO):
+    """
+    Lê os blocos dos últimos 'dias' pregões guardados do ticker.
+
+    Returns:
+        BarrasOHLCV | None: As barras, ou None se não houver nada guardado.
+    """
+    pasta_ticker = _pasta(ticker, intervalo, pasta)
+    meta = _ler_meta(pasta_ticker)
+    if meta is None:
+        return None
+    nomes = sorted(nome for nome in os.listdir(pasta_ticker) if nome.endswith('.npy'))[-int(dias):]
+    if not nomes:
+        return None
+    bloco = np.concatenate([np.load(os.path.join(pasta_ticker, nome)) for nome in nomes])
+    return BarrasOHLCV(bloco['tempo'], *(bloco[coluna] for coluna in BarrasOHLCV.COLUNAS),
+                       deslocamento=meta['gmtoffset'], segundos=INTERVALOS[intervalo],
+                       versao=f"{ticker}:{intervalo}:{meta['atualizado_em']}:{nomes[0]}:{len(nomes)}")
+
+
+def _dias_a_buscar(ticker, intervalo, dias, pasta):
+    # Dias corridos a pedir ao Yahoo: do último pregão guardado em diante, ou o período todo
+    # se o que já foi buscado não cobre o início do período pedido
+    limite = LIMITE_DIAS[intervalo]
+    pasta_ticker = _pasta(ticker, intervalo, pasta)
+    meta = _ler_meta(pasta_ticker)
+    # Pregões -> dias corridos (fins de semana e feriados), com folga
+    necessarios = min(limite, int(dias * 7 / 5) + 5)
+    if meta is None:
+        return necessarios
+    if time.time() - meta['atualizado_em'] < ATUALIZACAO_MINUTOS * 60:
+        return 0
+    nomes = sorted(nome for nome in os.listdir(pasta_ticker) if nome.endswith('.npy'))
+    if not nomes:
+        return necessarios
+    hoje = np.datetime64('today', 'D')
+    # Blocos gravados antes do 'desde' no meta.json: vale o primeiro pregão guardado
+    desde = np.datetime64(meta.get('desde') or nomes[0][:-len('.npy')], 'D')
+    if desde > hoje - necessarios:
+        return necessarios
+    ultimo = np.datetime64(nomes[-1][:-len('.npy')], 'D')
+    return min(limite, int((hoje - ultimo).astype(int)) + 2)
+
+
+@metricas.cronometrado('intradiario.atualizar')
+def atualizar_barras(tickers, intervalo, dias, pasta=PASTA_INTRADIARIO, **kwargs):
+    """
+    Busca no Yahoo apenas o trecho que falta das barras de cada ticker (a partir do
+    último pregão guardado, que é substituído) e grava os pregões recebidos. Tickers
+    atualizados há menos de ATUALIZACAO_MINUTOS não são buscados.
+
+    Args:
+        tickers (list): Tickers a atualizar.
+        intervalo (str): '5m', '15m' ou '60m'.
+        dias (int): Pregões que devem estar disponíveis.
+        **kwargs: Repassados a dados_online.buscar_barras_yahoo (limites de taxa, relatório).
+    """
+    if intervalo not in INTERVALOS:
+        raise ValueError(f"Intervalo não suportado: {intervalo} (use {', '.join(INTERVALOS)}).")
+
+    # Tickers com o mesmo trecho a buscar vão na mesma leva de requisições paralelas
+    por_periodo = {}
+    for ticker in tickers:
+        dias_busca = _dias_a_buscar(ticker, intervalo, dias, pasta)
+        if dias_busca:
+            por_periodo.setdefault(dias_busca, []).append(ticker)
+
+    for dias_busca, grupo in por_periodo.items():
+        desde = str(np.datetime64('today', 'D') - dias_busca)
+        for ticker, arrays in dados_online.buscar_barras_yahoo(grupo, dias_busca, intervalo, **kwargs).items():
+            deslocamento = arrays.pop('gmtoffset')
+            gravar_blocos(ticker, intervalo, BarrasOHLCV(**arrays, deslocamento=deslocamento,
+                                                         segundos=INTERVALOS[intervalo]), pasta, desde)
+
+
+def pregoes_disponiveis(intervalo):
+    """Pregões (cinco por semana) que cabem no histórico que o Yahoo oferece para o intervalo."""
+    return LIMITE_DIAS[intervalo] * 5 // 7
+
+
+_cache = CacheLRU(TAMANHO_CACHE, nome='intradiario')
+
+
+def carregar_barras(ticker, intervalo, dias, pasta=PASTA_INTRADIARIO):
+    """
+    Barras dos últimos 'dias' pregões do ticker (limitados ao histórico do intervalo,
+    ver pregoes_disponiveis). Com barras já guardadas, elas são devolvidas na hora e o
+    trecho que falta é buscado em segundo plano (stale-while-revalidate, como em
+    src.cache_compartilhado), aparecendo na próxima execução; só a primeira carga do
+    ticker espera pelo Yahoo. Se a busca falhar, fica o que estiver guardado.
+
+    Returns:
+        BarrasOHLCV | None: As barras, ou None se não houver dados.
+    """
+    dias = max(1, min(int(dias), pregoes_disponiveis(intervalo)))
+    pasta_ticker = _pasta(ticker, intervalo, pasta)
+    if _ler_meta(pasta_ticker) is None:
+        try:
+            atualizar_barras([ticker], intervalo, dias, pasta)
+        except Exception as e:
+            print(f"Erro ao atualizar as barras de {intervalo} de {ticker}: {e}")
+    elif _dias_a_buscar(ticker, intervalo, dias, pasta):
+        chave = cache_compartilhado.chave_cache([f'intradiario:{intervalo}:{ticker}:{os.path.abspath(pasta)}'])
+        cache_compartilhado.atualizar_em_segundo_plano(
+            chave, lambda: atualizar_barras([ticker], intervalo, dias, pasta), salvar=lambda _: None)
+
+    meta = _ler_meta(pasta_ticker)
+    if meta is None:
+        return None
+    chave = (ticker, intervalo, dias, os.path.abspath(pasta), meta['atualizado_em'])
+    barras = _cache.obter(chave, lambda: ler_blocos(ticker, intervalo, dias, pasta))
+    return None if barras is None else barras.ultimos_dias(dias)
@@ -0,0 +1,245 @@
+"""
+Instrumentação leve: tempo por etapa, latência HTTP por ticker, contadores de cache e
+bytes baixados.
+
+As medições vão para a coleta corrente (ex.: um rerun da interface ou uma execução da
+atualização agendada) e também para o total acumulado do processo. A coleta corrente fica
+em uma ContextVar, então cada sessão do Streamlit enxerga apenas as suas medições; para
+que as threads do motor de busca registrem na coleta certa, as tarefas são submetidas com
+contextvars.copy_context() (ver dados_online.iterar_charts).
+
+Uso:
+    with metricas.cronometro('tabela.calcular'):
+        ...
+
+    @metricas.cronometrado('grafico.gerar')
+    def gerar_grafico(...): ...
+
+    coleta = metricas.iniciar_coleta('interface')
+    ...
+    metricas.encerrar_coleta(coleta)   # grava uma linha JSON em CAMINHO_LOG
+"""
+import os
+import json
+import time
+import bisect
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+
+# Log estruturado: uma linha JSON por coleta encerrada
+CAMINHO_LOG = os.path.join('data', 'metricas.jsonl')
+
+# Ao passar deste tamanho, o log atual vira CAMINHO_LOG + '.1' e um novo é iniciado
+TAMANHO_MAXIMO_LOG_BYTES = 5 * 1024 * 1024
+
+# Limites superiores (ms) das faixas do histograma de latência; a última faixa é "acima de"
+LIMITES_LATENCIA_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Coleta:
+    """
+    Medições acumuladas de uma execução. Segura para uso entre threads.
+
+    Com latencias_brutas=False (total do processo), cada ticker guarda só as contagens por
+    faixa do histograma, o total e o máximo, em vez de uma lista que cresce a cada requisição;
+    o resumo traz então a média no lugar da mediana.
+    """
+
+    def __init__(self, nome, latencias_brutas=True):
+        self.nome = nome
+        self.inicio = time.time()
+        self.latencias_brutas = latencias_brutas
+        self.etapas = {}       # etapa -> [chamadas, total_s, max_s]
+        self.latencias = {}    # ticker -> [latência_s, ...] ou [contagens por faixa, total_s, max_s]
+        self.contadores = {}   # nome -> valor
+        self.bytes_baixados = 0
+        self._lock = threading.Lock()
+
+    def registrar_etapa(self, etapa, segundos):
+        with self._lock:
+            estatistica = self.etapas.setdefault(etapa, [0, 0.0, 0.0])
+            estatistica[0] += 1
+            estatistica[1] += segundos
+            estatistica[2] = max(estatistica[2], segundos)
+
+    def registrar_latencia(self, ticker, segundos):
+        with self._lock:
+            if self.latencias_brutas:
+                self.latencias.setdefault(ticker, []).append(segundos)
+                return
+            estatistica = self.latencias.setdefault(ticker, [[0] * (len(LIMITES_LATENCIA_MS) + 1), 0.0, 0.0])
+            estatistica[0][_faixa(segundos)] += 1
+            estatistica[1] += segundos
+            estatistica[2] = max(estatistica[2], segundos)
+
+    def contar(self, nome, quantidade=1):
+        with self._lock:
+            self.contadores[nome] = self.contadores.get(nome, 0) + quantidade
+
+    def somar_bytes(self, quantidade):
+        with self._lock:
+            self.bytes_baixados += quantidade
+
+    def histograma(self, latencias=None):
+        """Contagem de requisições por faixa de latência (rótulos '<=25ms' ... '>5000ms')."""
+        if latencias is None:
+            with self._lock:
+                if not self.latencias_brutas:
+                    return _rotular([sum(contagens) for contagens in
+                                     zip(*(contagens for contagens, _, _ in self.latencias.values()))])
+                latencias = [valor for valores in self.latencias.values() for valor in valores]
+        contagens = [0] * (len(LIMITES_LATENCIA_MS) + 1)
+        for segundos in latencias:
+            contagens[_faixa(segundos)] += 1
+        return _rotular(contagens)
+
+    def resumo(self):
+        """Dicionário serializável em JSON com todas as medições da coleta."""
+        with self._lock:
+            etapas = {etapa: {'chamadas': chamadas, 'total_ms': round(total * 1000, 3), 'max_ms': round(maximo * 1000, 3)}
+                      for etapa, (chamadas, total, maximo) in sorted(self.etapas.items())}
+            if self.latencias_brutas:
+                latencias = {ticker: list(valores) for ticker, valores in self.latencias.items()}
+            else:
+                latencias = {ticker: (list(contagens), total, maximo)
+                             for ticker, (contagens, total, maximo) in self.latencias.items()}
+            contadores = dict(sorted(self.contadores.items()))
+            bytes_baixados = self.bytes_baixados
+
+        por_ticker = {}
+        for ticker, valores in sorted(latencias.items()):
+            if self.latencias_brutas:
+                ordenados = sorted(valores)
+                por_ticker[ticker] = {
+                    'requisicoes': len(ordenados),
+                    'p50_ms': round(ordenados[len(ordenados) // 2] * 1000, 1),
+                    'max_ms': round(ordenados[-1] * 1000, 1),
+                    'histograma': self.histograma(ordenados),
+                }
+            else:
+                contagens, total, maximo = valores
+                por_ticker[ticker] = {
+                    'requisicoes': sum(contagens),
+                    'media_ms': round(total / sum(contagens) * 1000, 1),
+                    'max_ms': round(maximo * 1000, 1),
+                    'histograma': _rotular(contagens),
+                }
+        histograma = [0] * (len(LIMITES_LATENCIA_MS) + 1)
+        for estatistica in por_ticker.values():
+            histograma = [total + contagem for total, contagem in zip(histograma, estatistica['histograma'].values())]
+        return {
+            'coleta': self.nome,
+            'inicio': datetime.fromtimestamp(self.inicio).isoformat(timespec='seconds'),
+            'duracao_ms': round((time.time() - self.inicio) * 1000, 3),
+            'etapas': etapas,
+            'contadores': contadores,
+            'bytes_baixados': bytes_baixados,
+            'latencia_http': {
+                'histograma': _rotular(histograma),
+                'por_ticker': por_ticker,
+            },
+        }
+
+
+def _faixa(segundos):
+    # Índice da faixa do histograma em que a latência cai
+    return bisect.bisect_left(LIMITES_LATENCIA_MS, segundos * 1000)
+
+
+def _rotular(contagens):
+    rotulos = [f'<={limite}ms' for limite in LIMITES_LATENCIA_MS] + [f'>{LIMITES_LATENCIA_MS[-1]}ms']
+    contagens = list(contagens) or [0] * len(rotulos)
+    return dict(zip(rotulos, contagens))
+
+
+# Total acumulado do processo (latências só por faixa, para não crescer sem limite)
+# e coleta corrente do contexto (sessão / thread)
+_processo = Coleta('processo', latencias_brutas=False)
+_coleta_atual = contextvars.ContextVar('coleta_metricas', default=None)
+
+
+def _destinos():
+    coleta = _coleta_atual.get()
+    return (_processo,) if coleta is None else (_processo, coleta)
+
+
+def iniciar_coleta(nome) -> Coleta:
+    """Cria uma coleta e a torna a corrente no contexto atual."""
+    coleta = Coleta(nome)
+    _coleta_atual.set(coleta)
+    return coleta
+
+
+def encerrar_coleta(coleta, gravar_log=True) -> dict:
+    """Desassocia a coleta do contexto, grava seu resumo no log JSON e o devolve."""
+    if _coleta_atual.get() is coleta:
+        _coleta_atual.set(None)
+    resumo = coleta.resumo()
+    if gravar_log:
+        registrar_em_log(resumo)
+    return resumo
+
+
+def coleta_atual():
+    return _coleta_atual.get()
+
+
+def total_do_processo() -> Coleta:
+    return _processo
+
+
+@contextmanager
+def cronometro(etapa):
+    """Mede o tempo do bloco e registra em 'etapa'."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        for coleta in _destinos():
+            coleta.registrar_etapa(etapa, segundos)
+
+
+def cronometrado(etapa):
+    """Decorador: mede cada chamada da função como 'etapa'."""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with cronometro(etapa):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+
+def registrar_latencia(ticker, segundos):
+    for coleta in _destinos():
+        coleta.registrar_latencia(ticker, segundos)
+
+
+def contar(nome, quantidade=1):
+    for coleta in _destinos():
+        coleta.contar(nome, quantidade)
+
+
+def somar_bytes(quantidade):
+    for coleta in _destinos():
+        coleta.somar_bytes(quantidade)
+
+
+_lock_log = threading.Lock()
+
+
+def registrar_em_log(resumo, caminho=CAMINHO_LOG):
+    """Acrescenta o resumo como uma linha JSON no log, girando o arquivo quando ele fica grande."""
+    with _lock_log:
+        try:
+            os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+            if os.path.exists(caminho) and os.path.getsize(caminho) > TAMANHO_MAXIMO_LOG_BYTES:
+                os.replace(caminho, caminho + '.1')
+            with open(caminho, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(json.dumps(resumo, ensure_ascii=False) + '\n')
+        except OSError as e:
+            print(f"Não foi possível gravar as métricas em {caminho}: {e}")
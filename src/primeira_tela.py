@@ -0,0 +1,121 @@
+"""
+Prévia da primeira tela: a última tabela de indicadores e as figuras do gráfico padrão,
+gravadas pela atualização agendada (src.atualiza_cotacoes) em um JSON comprimido.
+
+A interface exibe a prévia assim que a sessão abre, antes de importar pandas, plotly e
+requests e de carregar os dados ao vivo, que a substituem em seguida. Por isso este
+módulo só usa a biblioteca padrão no nível do módulo; tabela e gráficos são importados
+apenas por gravar(), executado na atualização.
+"""
+import os
+import json
+import gzip
+import tempfile
+from datetime import datetime
+
+CAMINHO_PRIMEIRA_TELA = os.path.join('data', 'primeira_tela.json.gz')
+
+# Valores iniciais dos controles da interface; a prévia só vale para eles
+DIAS_GRAFICO_PADRAO = 15
+MESES_GRAFICO_PADRAO = 12
+
+# Orçamento de pontos da linha de cotação (séries maiores são reduzidas com LTTB)
+MAX_PONTOS_GRAFICO = 300
+
+
+def _figura_em_dict(figura):
+    # to_json converte datas e arrays numpy; o resultado é aceito de volta por st.plotly_chart
+    return None if figura is None else json.loads(figura.to_json())
+
+
+def gravar(df_cotacoes, df_dividendos, situacao, ativos, precos_medios, caminho=CAMINHO_PRIMEIRA_TELA) -> dict:
+    """
+    Monta e grava (de forma atômica) a prévia da primeira tela: a tabela formatada de
+    todos os ativos e as figuras de cotação e dividendos do primeiro ativo, nos valores
+    padrão dos controles.
+
+    Args:
+        df_cotacoes (pd.DataFrame | SeriesPorTicker): Cotações no esquema canônico.
+        df_dividendos (pd.DataFrame | SeriesPorTicker): Dividendos no esquema canônico.
+        situacao (dict): ticker -> situação dos dados (src.historico_local).
+        ativos (list): Tickers na ordem da interface.
+        precos_medios (dict): Preço médio por ticker.
+        caminho (str): Arquivo de destino.
+
+    Returns:
+        dict: A prévia gravada.
+    """
+    from src.tabela import calcular_dividendos_yields, formatar_tabela_dividendos
+    from src.grafico import gerar_grafico, gerar_grafico_dividendos
+    from src.indice_series import indexar
+
+    ativos = list(ativos)
+    indice_cotacoes = indexar(df_cotacoes, 'valor_cotação')
+    indice_dividendos = indexar(df_dividendos, 'dividendo')
+    tabela = formatar_tabela_dividendos(
+        calcular_dividendos_yields(ativos, precos_medios, indice_dividendos, indice_cotacoes, situacao), avisos=False)
+
+    ticker = ativos[0]
+    previa = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'ativos': ativos,
+        'precos_medios': dict(precos_medios),
+        'tabela': {'colunas': list(tabela.columns), 'linhas': tabela.values.tolist()},
+        'grafico': {
+            'ticker': ticker,
+            'num_dias': DIAS_GRAFICO_PADRAO,
+            'meses': MESES_GRAFICO_PADRAO,
+            'cotacao': _figura_em_dict(gerar_grafico(ticker, DIAS_GRAFICO_PADRAO, precos_medios, indice_cotacoes,
+                                                     max_pontos=MAX_PONTOS_GRAFICO)),
+            'dividendos': _figura_em_dict(gerar_grafico_dividendos(ticker, MESES_GRAFICO_PADRAO, indice_dividendos)),
+        },
+    }
+
+    pasta = os.path.dirname(caminho) or '.'
+    os.makedirs(pasta, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=pasta, suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'wb') as arquivo:
+            arquivo.write(gzip.compress(json.dumps(previa, ensure_ascii=False).encode('utf-8'), 6))
+        os.chmod(temporario, 0o644)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    return previa
+
+
+def ler(ativos, precos_medios, caminho=CAMINHO_PRIMEIRA_TELA):
+    """
+    Lê a prévia gravada, desde que ela corresponda à carteira atual (mesmos ativos, na
+    mesma ordem, e mesmos preços médios).
+
+    Returns:
+        dict | None: A prévia, ou None se não existir, estiver corrompida ou for de outra carteira.
+    """
+    try:
+        with open(caminho, 'rb') as arquivo:
+            previa = json.loads(gzip.decompress(arquivo.read()))
+    except (OSError, EOFError, ValueError):
+        return None
+    if previa.get('ativos') != list(ativos) or previa.get('precos_medios') != dict(precos_medios):
+        return None
+    return previa
+
+
+def tabela(previa) -> dict:
+    """Tabela da prévia como {coluna: valores}, aceito por st.dataframe."""
+    colunas = previa['tabela']['colunas']
+    return {coluna: [linha[i] for linha in previa['tabela']['linhas']] for i, coluna in enumerate(colunas)}
+
+
+def figuras(previa, ticker, num_dias, meses):
+    """
+    Figuras (cotação, dividendos) da prévia, como dicts do Plotly, quando os controles
+    estão nos valores em que ela foi gerada; senão (None, None).
+    """
+    grafico = previa['grafico']
+    if (ticker, num_dias, meses) != (grafico['ticker'], grafico['num_dias'], grafico['meses']):
+        return None, None
+    return grafico['cotacao'], grafico['dividendos']
@@ -0,0 +1,353 @@
+"""
+Relatório em lote, sem interface, para listas grandes de tickers (ex.: todos os FIIs).
+
+Uso, a partir da raiz do projeto:
+    python -m src.relatorio_lote --arquivo fiis.txt                  # um ticker por linha
+    python -m src.relatorio_lote --tickers HGRU11 MXRF11 --formato png --processos 4
+
+Os dados são buscados no processo principal (src.dados_online, com o limite de taxa de
+sempre) em janelas de tickers e repassados, em lotes, a um pool de processos que calcula
+os indicadores de calcular_dividendos_yields e exporta os gráficos de cotação e de
+dividendos de cada ativo. Cada lote concluído é acrescentado a um arquivo parcial em
+disco; no fim, o relatório consolidado e ordenado pelo DY é gravado em CSV e HTML.
+Tickers recusados pelo disjuntor do host (src.dados_online) são buscados de novo
+depois que ele volta a deixar passar requisições.
+A memória fica limitada a poucas janelas de dados, qualquer que seja o total de tickers.
+"""
+import os
+import re
+import sys
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+import pandas as pd
+from src.dados_online import (iterar_cotacoes_e_dividendos_yahoo, obter_disjuntor, REQUISICOES_POR_SEGUNDO,
+                              MAX_SIMULTANEAS, ESPERA_BASE_SEGUNDOS)
+from src.esquema import normalizar, vazio
+from src.indice_series import indexar
+from src.tabela import calcular_dividendos_yields, COLUNAS_TABELA
+from src.grafico import gerar_grafico, gerar_grafico_dividendos
+from src.historico_local import ATUALIZADO, INDISPONIVEL
+from src.primeira_tela import MAX_PONTOS_GRAFICO
+from src.carteiras import carregar_carteiras
+from src import dados_online, metricas
+
+PASTA_RELATORIOS = os.path.join('data', 'relatorios')
+
+# Tickers por lote enviado ao pool de processos
+TICKERS_POR_LOTE = 25
+
+# Tickers buscados por vez (as respostas de uma janela ficam em memória até serem processadas)
+TICKERS_POR_JANELA = 100
+
+# Lotes aguardando processamento, por processo, antes de a busca esperar
+LOTES_PENDENTES_POR_PROCESSO = 2
+
+# Pregões do gráfico de cotação e meses do gráfico de dividendos
+DIAS_GRAFICO = 252
+MESES_GRAFICO = 12
+
+# Formatos de figura: HTML interativo (plotly.js gravado uma vez na pasta) ou imagem estática (kaleido)
+FORMATOS_FIGURA = ('html', 'png', 'svg', 'nenhum')
+
+# Colunas gravadas por lote: as da tabela da interface, a situação dos dados e as figuras
+COLUNAS_RELATORIO = COLUNAS_TABELA + ["Dados", "Gráfico cotação", "Gráfico dividendos"]
+
+# Rodadas seguidas em que o disjuntor recusa todos os tickers adiados antes de desistir deles
+RODADAS_DISJUNTOR = 3
+
+# Coluna usada na ordenação do relatório (maior primeiro)
+COLUNA_ORDEM = "% Yield Atual (DY)"
+
+
+def _nome_arquivo(ticker):
+    return re.sub(r'[^A-Za-z0-9_-]', '_', ticker)
+
+
+def _exportar(figura, caminho, formato):
+    if formato == 'html':
+        # 'directory' grava o plotly.min.js uma única vez ao lado das figuras
+        figura.write_html(caminho, include_plotlyjs='directory', full_html=True)
+    else:
+        figura.write_image(caminho)
+
+
+def processar_lote(lote, precos_medios, pasta_saida, formato=FORMATOS_FIGURA[0], num_dias=DIAS_GRAFICO,
+                   meses=MESES_GRAFICO) -> pd.DataFrame:
+    """
+    Calcula os indicadores e exporta os gráficos de um lote de tickers. Roda nos
+    processos do pool, então recebe e devolve apenas objetos serializáveis.
+
+    Args:
+        lote (list): (ticker, df_cotacoes, df_dividendos, situacao) de cada ticker.
+        precos_medios (dict): Preço médio por ticker (base do YOC; ausente para os demais).
+        pasta_saida (str): Pasta do relatório; as figuras vão para a subpasta 'figuras'.
+        formato (str): Um de FORMATOS_FIGURA.
+        num_dias (int): Pregões do gráfico de cotação.
+        meses (int): Meses do gráfico de dividendos.
+
+    Returns:
+        pd.DataFrame: Uma linha por ticker, com as colunas de calcular_dividendos_yields,
+                      "Dados" e o caminho relativo de cada figura exportada.
+    """
+    tickers = [item[0] for item in lote]
+    situacao = {item[0]: item[3] for item in lote}
+    indice_cotacoes = indexar(normalizar(pd.concat([item[1] for item in lote], ignore_index=True), 'cotacoes'),
+                              'valor_cotação')
+    indice_dividendos = indexar(normalizar(pd.concat([item[2] for item in lote], ignore_index=True), 'dividendos'),
+                                'dividendo')
+    linhas = calcular_dividendos_yields(tickers, precos_medios, indice_dividendos, indice_cotacoes, situacao)
+
+    figuras = {"Gráfico cotação": [], "Gráfico dividendos": []}
+    pasta_figuras = os.path.join(pasta_saida, 'figuras')
+    if formato != 'nenhum':
+        os.makedirs(pasta_figuras, exist_ok=True)
+    for ticker in tickers:
+        geradas = {
+            "Gráfico cotação": lambda: gerar_grafico(ticker, num_dias, precos_medios, indice_cotacoes,
+                                                     max_pontos=MAX_PONTOS_GRAFICO),
+            "Gráfico dividendos": lambda: gerar_grafico_dividendos(ticker, meses, indice_dividendos),
+        }
+        for (coluna, gerar), sufixo in zip(geradas.items(), ('cotacao', 'dividendos')):
+            figura = gerar() if formato != 'nenhum' else None
+            if figura is None:
+                figuras[coluna].append('')
+                continue
+            relativo = os.path.join('figuras', f"{_nome_arquivo(ticker)}_{sufixo}.{formato}")
+            try:
+                _exportar(figura, os.path.join(pasta_saida, relativo), formato)
+            except Exception as e:
+                print(f" Erro ao exportar {relativo}: {e}", file=sys.stderr)
+                relativo = ''
+            figuras[coluna].append(relativo)
+
+    for coluna, caminhos in figuras.items():
+        linhas[coluna] = caminhos
+    return linhas[COLUNAS_RELATORIO]
+
+
+def _buscar(tickers, tamanho_janela, adiados, **kwargs):
+    # Busca os tickers janela a janela; os recusados pelo disjuntor vão para 'adiados'
+    for inicio in range(0, len(tickers), tamanho_janela):
+        for ticker, df_cot, df_div, registro in iterar_cotacoes_e_dividendos_yahoo(
+                tickers[inicio:inicio + tamanho_janela], **kwargs):
+            if registro['status'] == 'recusada':
+                adiados.append(ticker)
+                continue
+            yield ticker, df_cot, df_div, ATUALIZADO if not df_cot.empty else INDISPONIVEL
+
+
+def _respostas(tickers, tamanho_janela, recusados, **kwargs):
+    # Repete a busca dos tickers recusados pelo disjuntor depois que ele libera a sondagem,
+    # até RODADAS_DISJUNTOR rodadas seguidas sem nenhum ticker passar; os que sobram
+    # são entregues sem dados e registrados em 'recusados'
+    pendentes, sem_progresso = list(tickers), 0
+    while pendentes:
+        adiados = []
+        yield from _buscar(pendentes, tamanho_janela, adiados, **kwargs)
+        if not adiados:
+            return
+        sem_progresso = sem_progresso + 1 if len(adiados) == len(pendentes) else 0
+        if sem_progresso > RODADAS_DISJUNTOR:
+            recusados.extend(adiados)
+            for ticker in adiados:
+                yield ticker, vazio('cotacoes'), vazio('dividendos'), INDISPONIVEL
+            return
+        espera = max(ESPERA_BASE_SEGUNDOS, obter_disjuntor(dados_online.YAHOO_CHART_URL).segundos_para_sondar())
+        print(f" Disjuntor aberto: {len(adiados)} tickers adiados, nova tentativa em {espera:.0f}s.",
+              file=sys.stderr, flush=True)
+        time.sleep(espera)
+        pendentes = adiados
+
+
+def _lotes(tickers, tamanho_lote, tamanho_janela, recusados, **kwargs):
+    # Agrupa as respostas em lotes, na ordem de chegada
+    lote = []
+    for item in _respostas(tickers, tamanho_janela, recusados, **kwargs):
+        lote.append(item)
+        if len(lote) == tamanho_lote:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _imprimir_progresso(feitos, total, falhas, inicio):
+    decorrido = time.perf_counter() - inicio
+    restante = decorrido / feitos * (total - feitos) if feitos else 0
+    print(f"[{feitos:>{len(str(total))}}/{total}] {feitos / total:.0%} | {falhas} sem dados | "
+          f"{decorrido:.0f}s decorridos, ~{restante:.0f}s restantes", file=sys.stderr, flush=True)
+
+
+def _consolidar(caminho_parcial, pasta_saida):
+    # Ordena as linhas gravadas pelos lotes e grava o relatório final em CSV e HTML
+    relatorio = pd.read_csv(caminho_parcial, keep_default_na=True)
+    relatorio = relatorio.sort_values(COLUNA_ORDEM, ascending=False, na_position='last', kind='stable')
+    relatorio.insert(0, "Posição", range(1, len(relatorio) + 1))
+    caminho_csv = os.path.join(pasta_saida, 'relatorio.csv')
+    relatorio.to_csv(caminho_csv, index=False)
+
+    html = relatorio.copy()
+    for coluna in ("Gráfico cotação", "Gráfico dividendos"):
+        html[coluna] = [f'<a href="{caminho}">abrir</a>' if isinstance(caminho, str) and caminho else ''
+                        for caminho in html[coluna]]
+    caminho_html = os.path.join(pasta_saida, 'relatorio.html')
+    with open(caminho_html, 'w', encoding='utf-8') as arquivo:
+        arquivo.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Relatório de ativos</title></head>'
+                      f'<body><h1>Relatório de ativos ({len(relatorio)} tickers)</h1>\n')
+        arquivo.write(html.to_html(index=False, escape=False, na_rep='', float_format='{:.2f}'.format))
+        arquivo.write('\n</body></html>\n')
+    os.remove(caminho_parcial)
+    return caminho_csv, relatorio
+
+
+def executar_relatorio(tickers, pasta_saida=None, formato=FORMATOS_FIGURA[0], processos=None,
+                       tamanho_lote=TICKERS_POR_LOTE, tamanho_janela=TICKERS_POR_JANELA,
+                       num_dias=DIAS_GRAFICO, meses=MESES_GRAFICO,
+                       requisicoes_por_segundo=REQUISICOES_POR_SEGUNDO, max_simultaneas=MAX_SIMULTANEAS) -> dict:
+    """
+    Gera o relatório em lote dos tickers.
+
+    Args:
+        tickers (list): Tickers a avaliar.
+        pasta_saida (str, optional): Pasta do relatório (padrão: data/relatorios/<data e hora>).
+        formato (str): Formato das figuras, um de FORMATOS_FIGURA.
+        processos (int, optional): Processos do pool (padrão: núcleos da máquina; 1 processa
+                                   no próprio processo).
+        tamanho_lote (int): Tickers por lote enviado ao pool.
+        tamanho_janela (int): Tickers buscados por vez.
+
+    Returns:
+        dict: Resumo (pasta, relatório, tickers, sem dados, recusados pelo disjuntor mesmo
+              após as novas tentativas e duração).
+    """
+    tickers = list(dict.fromkeys(tickers))
+    pasta_saida = pasta_saida or os.path.join(PASTA_RELATORIOS, datetime.now().strftime('%Y-%m-%d_%H%M%S'))
+    os.makedirs(pasta_saida, exist_ok=True)
+    processos = max(1, int(processos or os.cpu_count() or 1))
+    if formato in ('png', 'svg'):
+        try:
+            import kaleido  # noqa: F401 (usado pelo plotly em write_image)
+        except ImportError:
+            print("Exportação estática requer o pacote 'kaleido'; gravando as figuras em HTML.", file=sys.stderr)
+            formato = 'html'
+
+    # Preços médios das carteiras, para o YOC dos tickers que fazem parte delas
+    precos_medios = {}
+    for carteira in carregar_carteiras().values():
+        precos_medios.update(carteira.precos_medios)
+
+    coleta = metricas.iniciar_coleta('relatorio_lote')
+    try:
+        inicio = time.perf_counter()
+        caminho_parcial = os.path.join(pasta_saida, 'relatorio.parcial.csv')
+        if os.path.exists(caminho_parcial):
+            os.remove(caminho_parcial)
+        feitos = falhas = 0
+        recusados = []
+
+        def gravar(futuro, tickers_lote):
+            # Acrescenta as linhas do lote ao arquivo parcial e descarta o resultado
+            nonlocal feitos, falhas
+            try:
+                linhas = futuro.result()
+            except Exception as e:
+                print(f" Erro ao processar o lote {tickers_lote[0]}..{tickers_lote[-1]}: {e}", file=sys.stderr)
+                linhas = pd.DataFrame({"Ativo": tickers_lote, "Dados": INDISPONIVEL}).reindex(columns=COLUNAS_RELATORIO)
+            linhas.to_csv(caminho_parcial, mode='a', index=False, header=not os.path.exists(caminho_parcial))
+            feitos += len(linhas)
+            falhas += int((linhas['Dados'] == INDISPONIVEL).sum())
+            _imprimir_progresso(feitos, len(tickers), falhas, inicio)
+
+        argumentos = (precos_medios, pasta_saida, formato, num_dias, meses)
+        executor = ProcessPoolExecutor(max_workers=processos) if processos > 1 else None
+        try:
+            pendentes = {}
+            for lote in _lotes(tickers, tamanho_lote, tamanho_janela, recusados,
+                               requisicoes_por_segundo=requisicoes_por_segundo, max_simultaneas=max_simultaneas):
+                tickers_lote = [item[0] for item in lote]
+                if executor is None:
+                    futuro = Future()
+                    try:
+                        futuro.set_result(processar_lote(lote, *argumentos))
+                    except Exception as e:
+                        futuro.set_exception(e)
+                    gravar(futuro, tickers_lote)
+                    continue
+                pendentes[executor.submit(processar_lote, lote, *argumentos)] = tickers_lote
+                # Limita os lotes em memória: a busca espera enquanto o pool está ocupado
+                while len(pendentes) >= processos * LOTES_PENDENTES_POR_PROCESSO:
+                    for concluido in wait(pendentes, return_when=FIRST_COMPLETED).done:
+                        gravar(concluido, pendentes.pop(concluido))
+            for concluido in wait(pendentes).done:
+                gravar(concluido, pendentes[concluido])
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+        if not feitos:
+            raise RuntimeError("Nenhum ticker processado.")
+        caminho_relatorio, relatorio = _consolidar(caminho_parcial, pasta_saida)
+        return {
+            'pasta': pasta_saida,
+            'relatorio': caminho_relatorio,
+            'tickers': feitos,
+            'sem_dados': relatorio.loc[relatorio['Dados'] == INDISPONIVEL, 'Ativo'].tolist(),
+            'recusados_pelo_disjuntor': len(recusados),
+            'duracao_s': round(time.perf_counter() - inicio, 3),
+            'formato_figuras': formato,
+        }
+    finally:
+        # Também registra a coleta quando o relatório é interrompido por um erro
+        metricas.encerrar_coleta(coleta)
+
+
+def ler_tickers(caminho, sufixo='.SA') -> list:
+    """
+    Lê uma lista de tickers de um arquivo texto (um por linha ou separados por vírgula;
+    linhas iniciadas por '#' são ignoradas). Tickers sem sufixo de bolsa recebem 'sufixo'.
+    """
+    with open(caminho, encoding='utf-8') as arquivo:
+        texto = '\n'.join(linha for linha in arquivo if not linha.lstrip().startswith('#'))
+    return normalizar_tickers(re.split(r'[\s,;]+', texto), sufixo)
+
+
+def normalizar_tickers(tickers, sufixo='.SA') -> list:
+    """Tickers em maiúsculas, sem repetição, com 'sufixo' nos que não têm sufixo de bolsa."""
+    normalizados = (ticker.strip().upper() for ticker in tickers if ticker.strip())
+    return list(dict.fromkeys(ticker if '.' in ticker or not sufixo else ticker + sufixo for ticker in normalizados))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera o relatório de indicadores e gráficos de uma lista de tickers.")
+    origem = parser.add_mutually_exclusive_group(required=True)
+    origem.add_argument('--tickers', nargs='+', help="Tickers a avaliar.")
+    origem.add_argument('--arquivo', help="Arquivo com os tickers (um por linha ou separados por vírgula).")
+    parser.add_argument('--sufixo', default='.SA', help="Sufixo dos tickers sem bolsa (padrão: .SA).")
+    parser.add_argument('--saida', help="Pasta do relatório (padrão: data/relatorios/<data e hora>).")
+    parser.add_argument('--formato', choices=FORMATOS_FIGURA, default=FORMATOS_FIGURA[0],
+                        help="Formato das figuras (png/svg requerem o pacote kaleido).")
+    parser.add_argument('--processos', type=int, help="Processos do pool (padrão: núcleos da máquina).")
+    parser.add_argument('--lote', type=int, default=TICKERS_POR_LOTE, help="Tickers por lote.")
+    parser.add_argument('--dias', type=int, default=DIAS_GRAFICO, help="Pregões do gráfico de cotação.")
+    parser.add_argument('--requisicoes-por-segundo', type=float, default=REQUISICOES_POR_SEGUNDO)
+    parser.add_argument('--max-simultaneas', type=int, default=MAX_SIMULTANEAS)
+    args = parser.parse_args(argv)
+
+    tickers = ler_tickers(args.arquivo, args.sufixo) if args.arquivo else normalizar_tickers(args.tickers, args.sufixo)
+    try:
+        resumo = executar_relatorio(tickers, args.saida, args.formato, args.processos, args.lote,
+                                    num_dias=args.dias, requisicoes_por_segundo=args.requisicoes_por_segundo,
+                                    max_simultaneas=args.max_simultaneas)
+    except Exception as e:
+        print(f"Erro no relatório: {e}", file=sys.stderr)
+        return 1
+    print(f"Relatório de {resumo['tickers']} tickers em {resumo['duracao_s']:.1f}s: {resumo['relatorio']} "
+          f"({len(resumo['sem_dados'])} sem dados, {resumo['recusados_pelo_disjuntor']} deles recusados "
+          f"pelo disjuntor).")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
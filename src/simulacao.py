@@ -0,0 +1,353 @@
+"""
+Simulação de reinvestimento de dividendos (DRIP) e de aportes mensais para a carteira toda.
+
+O mercado é um conjunto de matrizes alinhadas data × ticker: preço de cada pregão (ou mês,
+na projeção) e dividendo por cota creditado naquela data. Cada cenário define a fração dos
+dividendos reinvestida e o aporte mensal. A quantidade de cotas segue a recorrência
+
+    q[t] = q[t-1] * (1 + r * D[t] / P[t]) + a[t]
+
+(r: fração reinvestida, D: dividendo por cota, P: preço, a: cotas compradas com o aporte),
+que tem solução fechada com produto e soma acumulados no tempo. Assim todos os cenários,
+datas e tickers são calculados de uma vez, com arrays [cenário × data × ticker], sem laço
+em Python por dia ou por ativo. Cotas fracionárias são permitidas (simplificação).
+"""
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from src.indice_series import indexar
+from src.cache_lru import CacheLRU
+from src import metricas
+
+# Valor investido em cada ativo na posição inicial, comprado ao preço do início da simulação
+VALOR_INICIAL_POR_ATIVO = 1000.0
+
+# Simulações mantidas em memória (uma por versão dos dados e conjunto de parâmetros)
+TAMANHO_CACHE = 8
+
+# Máximo de células (cenário × data × ticker) por lote; lotes maiores são divididos
+CELULAS_POR_LOTE = 20_000_000
+
+
+class Mercado:
+    """
+    Matrizes alinhadas de uma simulação.
+
+    Args:
+        datas (np.ndarray): Datas (datetime64[ns]) das linhas, crescentes.
+        tickers (list): Colunas.
+        precos (np.ndarray): Preço de cada ticker em cada data [datas × tickers]; NaN antes da
+                             primeira cotação (o ativo ainda não pode ser comprado).
+        dividendos (np.ndarray): Dividendo por cota creditado em cada data [datas × tickers].
+        inicio_mes (np.ndarray): True nas datas em que o aporte mensal é feito.
+        precos_iniciais (np.ndarray, optional): Preço de compra da posição inicial por ticker
+                                                (padrão: a primeira linha de 'precos').
+    """
+
+    def __init__(self, datas, tickers, precos, dividendos, inicio_mes, precos_iniciais=None):
+        self.datas = datas
+        self.tickers = list(tickers)
+        self.precos = precos
+        self.dividendos = dividendos
+        self.inicio_mes = inicio_mes
+        if precos_iniciais is None:
+            precos_iniciais = precos[0] if len(precos) else np.full(len(self.tickers), np.nan)
+        self.precos_iniciais = precos_iniciais
+
+
+def _inicio_de_cada_mes(datas):
+    meses = datas.astype('datetime64[M]')
+    return np.r_[True, meses[1:] != meses[:-1]] if len(datas) else np.zeros(0, dtype=bool)
+
+
+def mercado_historico(df_cotacoes, df_dividendos, tickers, anos=None) -> Mercado:
+    """
+    Mercado a partir do histórico carregado (saídas de carregar_dados). Cada dividendo é
+    creditado, e pode ser reinvestido, no primeiro pregão posterior à sua data.
+
+    Args:
+        df_cotacoes (pd.DataFrame | SeriesPorTicker): Cotações no esquema canônico.
+        df_dividendos (pd.DataFrame | SeriesPorTicker): Dividendos no esquema canônico.
+        tickers (list): Ativos simulados (colunas).
+        anos (float, optional): Limita aos últimos 'anos' do histórico.
+    """
+    tickers = list(tickers)
+    datas, cotacoes = indexar(df_cotacoes, 'valor_cotação').larga(tickers)
+    datas_div, dividendos_por_data = indexar(df_dividendos, 'dividendo').larga(tickers, somar=True)
+
+    if anos is not None and len(datas):
+        inicio = np.searchsorted(datas, datas[-1] - np.timedelta64(int(anos * 365.25), 'D'), 'left')
+        datas, cotacoes = datas[inicio:], cotacoes[inicio:]
+
+    precos = pd.DataFrame(cotacoes).ffill().to_numpy()
+    dividendos = np.zeros_like(precos)
+    linhas = np.searchsorted(datas, datas_div, 'right')
+    creditados = (linhas > 0) & (linhas < len(datas))
+    np.add.at(dividendos, linhas[creditados], np.nan_to_num(dividendos_por_data[creditados]))
+    return Mercado(datas, tickers, precos, dividendos, _inicio_de_cada_mes(datas))
+
+
+def meses_de_historico(df_cotacoes, tickers, inicio_dividendos=None) -> int:
+    """
+    Meses completos cobertos pelas cotações carregadas dos tickers, do primeiro ao último
+    pregão: o limite do período do mercado_historico. Com 'inicio_dividendos' (data desde
+    a qual os dividendos carregados estão completos), o período começa no mais tardio dos
+    dois inícios, para nenhum mês simulado ficar sem os dividendos.
+    """
+    indice = indexar(df_cotacoes, 'valor_cotação')
+    series = [datas for datas, _ in map(indice.serie, tickers) if len(datas)]
+    if not series:
+        return 0
+    inicio = min(datas[0] for datas in series)
+    if inicio_dividendos is not None:
+        inicio = max(inicio, np.datetime64(pd.Timestamp(inicio_dividendos), 'ns'))
+    dias = (max(datas[-1] for datas in series) - inicio) / np.timedelta64(1, 'D')
+    return max(0, int(dias // (365.25 / 12)))
+
+
+def mercado_projetado(df_cotacoes, df_dividendos, tickers, anos, crescimento_precos=0.0,
+                      crescimento_dividendos=0.0) -> Mercado:
+    """
+    Mercado projetado mês a mês a partir de hoje: preço inicial = última cotação e
+    dividendo mensal = média mensal dos últimos 12 meses, ambos corrigidos pelas taxas
+    anuais de crescimento informadas.
+
+    Args:
+        df_cotacoes (pd.DataFrame | SeriesPorTicker): Cotações no esquema canônico.
+        df_dividendos (pd.DataFrame | SeriesPorTicker): Dividendos no esquema canônico.
+        tickers (list): Ativos simulados (colunas).
+        anos (int): Horizonte da projeção.
+        crescimento_precos (float): Valorização anual das cotas (ex.: 0.03 = 3% a.a.).
+        crescimento_dividendos (float): Crescimento anual dos dividendos.
+    """
+    tickers = list(tickers)
+    ultimos_precos = indexar(df_cotacoes, 'valor_cotação').ultimos_valores(tickers)
+    somas, _ = indexar(df_dividendos, 'dividendo').somas_desde(tickers, pd.Timestamp.now() - pd.DateOffset(months=12))
+
+    meses = np.arange(1, int(round(anos * 12)) + 1)
+    datas = (np.datetime64(pd.Timestamp.now().date(), 'M') + meses).astype('datetime64[ns]')
+    anos_decorridos = (meses / 12.0)[:, None]
+    precos = ultimos_precos[None, :] * (1 + crescimento_precos) ** anos_decorridos
+    dividendos = (np.nan_to_num(somas) / 12.0)[None, :] * (1 + crescimento_dividendos) ** anos_decorridos
+    return Mercado(datas, tickers, precos, dividendos, np.ones(len(datas), dtype=bool),
+                   precos_iniciais=ultimos_precos)
+
+
+def posicoes_iniciais(mercado, valor_por_ativo=VALOR_INICIAL_POR_ATIVO):
+    """
+    Cotas iniciais de cada ticker: 'valor_por_ativo' comprado ao preço do início da simulação
+    (Mercado.precos_iniciais). Tickers ainda sem cotação nessa data começam sem cotas.
+    """
+    precos = np.asarray(mercado.precos_iniciais, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(precos > 0, valor_por_ativo / precos, 0.0)
+
+
+def grade_de_cenarios(reinvestir=(0.0, 1.0), aportes_mensais=(0.0,)):
+    """
+    Todas as combinações de fração reinvestida × aporte mensal.
+
+    Returns:
+        tuple: (reinvestir, aportes_mensais) como arrays alinhados, um elemento por cenário.
+    """
+    grade_reinvestir, grade_aportes = np.meshgrid(np.asarray(reinvestir, dtype='float64'),
+                                                  np.asarray(aportes_mensais, dtype='float64'), indexing='ij')
+    return grade_reinvestir.ravel(), grade_aportes.ravel()
+
+
+def _simular_lote(precos, dividendos, inicio_mes, quantidades, custo_inicial, reinvestir, aportes, pesos):
+    # Arrays [cenário × data × ticker]; NaN de preço = ativo ainda sem cotação (sem compra nem dividendo)
+    negociavel = ~np.isnan(precos)
+    precos_zerados = np.where(negociavel, precos, 0.0)
+    dividendos = np.where(negociavel, dividendos, 0.0)
+    precos_validos = np.where(negociavel, precos, 1.0)
+
+    # Aporte dividido pelos pesos dos ativos negociáveis em cada data (renormalizados)
+    pesos_data = np.where(negociavel, pesos[None, :], 0.0)
+    soma_pesos = pesos_data.sum(axis=1, keepdims=True)
+    pesos_data = np.divide(pesos_data, soma_pesos, out=np.zeros_like(pesos_data), where=soma_pesos > 0)
+    cotas_por_real = np.where(inicio_mes[:, None], pesos_data / precos_validos, 0.0)   # [data × ticker]
+
+    # Fator de crescimento das cotas com o reinvestimento: G[t] = prod (1 + r * D / P)
+    crescimento = reinvestir[:, None, None] * (dividendos / precos_validos)[None]
+    crescimento += 1.0
+    np.cumprod(crescimento, axis=1, out=crescimento)
+
+    # q[t] = G[t] * (q0 + soma dos aportes em cotas / G até t); operações no mesmo buffer
+    cotas = aportes[:, None, None] * cotas_por_real[None]
+    cotas /= crescimento
+    np.cumsum(cotas, axis=1, out=cotas)
+    cotas += quantidades
+    cotas *= crescimento
+    del crescimento
+
+    # Dividendos recebidos em t usam as cotas de t-1 (no primeiro dia, as iniciais)
+    renda = np.empty(cotas.shape[:2])
+    if renda.shape[1]:
+        renda[:, 0] = quantidades @ dividendos[0]
+        renda[:, 1:] = np.einsum('stn,tn->st', cotas[:, :-1], dividendos[1:])
+    valor = np.einsum('stn,tn->st', cotas, precos_zerados)
+    aportado = np.cumsum(aportes[:, None] * (inicio_mes & negociavel.any(axis=1))[None], axis=1)
+    caixa = np.cumsum(renda * (1.0 - reinvestir[:, None]), axis=1)
+    return {
+        'valor': valor,
+        'renda': renda,
+        'caixa': caixa,
+        'investido': custo_inicial + aportado,
+        'cotas_finais': cotas[:, -1] if cotas.shape[1] else np.broadcast_to(quantidades, (len(reinvestir), len(quantidades))),
+    }
+
+
+@metricas.cronometrado('simulacao.simular')
+def simular(mercado, quantidades, reinvestir, aportes_mensais, pesos=None, custo_inicial=0.0,
+            processos=1) -> dict:
+    """
+    Simula todos os cenários sobre o mercado.
+
+    Args:
+        mercado (Mercado): Matrizes alinhadas (mercado_historico ou mercado_projetado).
+        quantidades (np.ndarray): Cotas iniciais por ticker (posicoes_iniciais).
+        reinvestir (array): Fração dos dividendos reinvestida em cada cenário (0 a 1).
+        aportes_mensais (array): Aporte mensal (R$) de cada cenário.
+        pesos (array, optional): Divisão do aporte entre os tickers (padrão: partes iguais).
+        custo_inicial (float): Valor pago pela posição inicial (base do "investido").
+        processos (int): Processos usados quando há vários lotes (1 = no próprio processo).
+
+    Returns:
+        dict: Arrays [cenário × data] 'valor' (cotas × preço), 'renda' (dividendos recebidos
+              na data), 'caixa' (dividendos não reinvestidos acumulados) e 'investido';
+              e 'cotas_finais' [cenário × ticker].
+    """
+    reinvestir = np.atleast_1d(np.asarray(reinvestir, dtype='float64'))
+    aportes = np.broadcast_to(np.asarray(aportes_mensais, dtype='float64'), reinvestir.shape)
+    quantidades = np.asarray(quantidades, dtype='float64')
+    pesos = np.ones(len(mercado.tickers)) if pesos is None else np.asarray(pesos, dtype='float64')
+    argumentos = (mercado.precos, mercado.dividendos, mercado.inicio_mes, quantidades, custo_inicial)
+
+    # Lotes de cenários que cabem em CELULAS_POR_LOTE
+    celulas_por_cenario = max(1, mercado.precos.size)
+    tamanho = max(1, CELULAS_POR_LOTE // celulas_por_cenario)
+    lotes = [(reinvestir[i:i + tamanho], aportes[i:i + tamanho]) for i in range(0, len(reinvestir), tamanho)]
+
+    if processos > 1 and len(lotes) > 1:
+        with ProcessPoolExecutor(max_workers=min(processos, len(lotes), os.cpu_count() or 1)) as executor:
+            parciais = list(executor.map(_simular_lote, *zip(*[argumentos + (r, a, pesos) for r, a in lotes])))
+    else:
+        parciais = [_simular_lote(*argumentos, r, a, pesos) for r, a in lotes]
+    return {chave: np.concatenate([parcial[chave] for parcial in parciais]) for chave in parciais[0]}
+
+
+def curvas(resultado, mercado, nomes, mensal=True) -> dict:
+    """
+    Curvas de valor (patrimônio = valor das cotas + caixa) e de renda de cada cenário,
+    como DataFrames data × cenário; com mensal=True, a renda é somada por mês e o
+    patrimônio é o do fim de cada mês.
+    """
+    indice = pd.DatetimeIndex(mercado.datas, name='date')
+    patrimonio = pd.DataFrame((resultado['valor'] + resultado['caixa']).T, index=indice, columns=nomes)
+    renda = pd.DataFrame(resultado['renda'].T, index=indice, columns=nomes)
+    investido = pd.DataFrame(resultado['investido'].T, index=indice, columns=nomes)
+    if mensal:
+        patrimonio = patrimonio.resample('ME').last()
+        renda = renda.resample('ME').sum()
+        investido = investido.resample('ME').last()
+    return {'patrimonio': patrimonio, 'renda': renda, 'investido': investido}
+
+
+def resumo(resultado, nomes) -> pd.DataFrame:
+    """Situação final de cada cenário: patrimônio (cotas + caixa), total investido e dividendos recebidos."""
+    patrimonio = resultado['valor'][:, -1] + resultado['caixa'][:, -1] if resultado['valor'].shape[1] else 0.0
+    investido = resultado['investido'][:, -1] if resultado['investido'].shape[1] else 0.0
+    return pd.DataFrame({
+        'Patrimônio final (R$)': patrimonio,
+        'Total investido (R$)': investido,
+        'Dividendos recebidos (R$)': resultado['renda'].sum(axis=1),
+    }, index=pd.Index(nomes, name='Cenário'))
+
+
+def nomes_dos_cenarios(reinvestir, aportes_mensais):
+    """Rótulo de cada cenário da grade (ex.: "Reinvestindo + R$ 500/mês")."""
+    return [('Reinvestindo' if fracao else 'Sem reinvestir') + (f" + R$ {aporte:,.0f}/mês" if aporte else '')
+            for fracao, aporte in zip(reinvestir, aportes_mensais)]
+
+
+class SimulacaoCarteira:
+    """
+    Simulação da carteira toda pronta para exibição.
+
+    - mercado: matrizes usadas (Mercado)
+    - nomes: rótulo de cada cenário
+    - resultado: arrays de simular
+    - curvas: DataFrames mensais de curvas (patrimônio, renda e investido)
+    - versao: identifica os dados e os parâmetros usados no cálculo
+    """
+
+    def __init__(self, mercado, nomes, resultado, curvas, versao):
+        self.mercado = mercado
+        self.nomes = nomes
+        self.resultado = resultado
+        self.curvas = curvas
+        self.versao = versao
+
+    def resumo(self) -> pd.DataFrame:
+        return resumo(self.resultado, self.nomes)
+
+
+def _simular_carteira(indice_cotacoes, indice_dividendos, tickers, valor_por_ativo, reinvestir, aportes_mensais,
+                      anos, projetar, crescimento_precos, crescimento_dividendos, processos, versao):
+    if projetar:
+        mercado = mercado_projetado(indice_cotacoes, indice_dividendos, tickers, anos,
+                                    crescimento_precos, crescimento_dividendos)
+    else:
+        mercado = mercado_historico(indice_cotacoes, indice_dividendos, tickers, anos=anos)
+    grade_reinvestir, grade_aportes = grade_de_cenarios(reinvestir, aportes_mensais)
+    nomes = nomes_dos_cenarios(grade_reinvestir, grade_aportes)
+    quantidades = posicoes_iniciais(mercado, valor_por_ativo)
+    resultado = simular(mercado, quantidades, grade_reinvestir, grade_aportes,
+                        custo_inicial=valor_por_ativo * int((quantidades > 0).sum()), processos=processos)
+    return SimulacaoCarteira(mercado, nomes, resultado, curvas(resultado, mercado, nomes), versao)
+
+
+_cache = CacheLRU(TAMANHO_CACHE, nome='simulacao')
+
+
+def simular_carteira(df_cotacoes, df_dividendos, tickers, anos, valor_por_ativo=VALOR_INICIAL_POR_ATIVO,
+                     reinvestir=(0.0, 1.0), aportes_mensais=(0.0,), projetar=False,
+                     crescimento_precos=0.0, crescimento_dividendos=0.0, processos=1) -> SimulacaoCarteira:
+    """
+    Monta o mercado (histórico ou projetado), compra a posição inicial e simula a grade de
+    cenários reinvestir × aportes_mensais, ou devolve a simulação do cache.
+
+    Args:
+        df_cotacoes (pd.DataFrame | SeriesPorTicker): Cotações no esquema canônico, ou o índice já construído.
+        df_dividendos (pd.DataFrame | SeriesPorTicker): Dividendos no esquema canônico, ou o índice já construído.
+        tickers (list): Ativos simulados.
+        anos (float): Anos de histórico ou, com projetar=True, horizonte da projeção.
+        valor_por_ativo (float): Valor da posição inicial em cada ativo.
+        reinvestir (array): Frações dos dividendos reinvestidas (eixo da grade).
+        aportes_mensais (array): Aportes mensais (eixo da grade).
+        projetar (bool): Usa mercado_projetado em vez do histórico.
+        crescimento_precos (float): Valorização anual das cotas na projeção.
+        crescimento_dividendos (float): Crescimento anual dos dividendos na projeção.
+        processos (int): Processos usados quando a grade tem vários lotes (ver simular); não
+                         altera o resultado, por isso fica fora da chave do cache.
+
+    Returns:
+        SimulacaoCarteira: Mercado, resultado e curvas mensais de cada cenário.
+    """
+    indice_cotacoes = indexar(df_cotacoes, 'valor_cotação')
+    indice_dividendos = indexar(df_dividendos, 'dividendo')
+    tickers = list(tickers)
+    reinvestir = tuple(float(valor) for valor in reinvestir)
+    aportes_mensais = tuple(float(valor) for valor in aportes_mensais)
+    # A projeção parte de hoje (datas e janela de 12 meses dos dividendos), então a data entra na chave
+    chave = (indice_cotacoes.versao, indice_dividendos.versao, tuple(tickers), anos, valor_por_ativo,
+             reinvestir, aportes_mensais, projetar,
+             (crescimento_precos, crescimento_dividendos, pd.Timestamp.now().date()) if projetar else None)
+    versao = hashlib.sha1(repr(chave).encode('utf-8')).hexdigest()[:16]
+    return _cache.obter(chave, lambda: _simular_carteira(indice_cotacoes, indice_dividendos, tickers, valor_por_ativo,
+                                                         reinvestir, aportes_mensais, anos, projetar,
+                                                         crescimento_precos, crescimento_dividendos, processos,
+                                                         versao))
@@ -1,110 +1,127 @@
 import pandas as pd
 import numpy as np
 import streamlit as st
+from src import metricas
+from src.indice_series import indexar
+from src.historico_local import ATUALIZADO, LOCAL, INDISPONIVEL
 
-def calcular_dividendos_yields(ativos, precos_medios, df_dividendos_excel, df_cotacoes_atual):
+COLUNAS_TABELA = ["Ativo", "Preço Médio", "Cotação Atual", "Dividendo 12 Mês", "Dividendo Mês atual",
+                  "Média dos Dividendos (12m)", "% Yield Atual (DY)", "% Yield on Cost (YOC)"]
+
+# Rótulos da coluna "Dados" (situação de cada ticker na última carga)
+ROTULOS_SITUACAO = {
+    ATUALIZADO: "🟢 Atualizado",
+    LOCAL: "🟡 Histórico local",
+    INDISPONIVEL: "🔴 Indisponível",
+}
+
+
+@metricas.cronometrado('tabela.calcular_dividendos_yields')
+def calcular_dividendos_yields(ativos, precos_medios, df_dividendos_excel, df_cotacoes_atual, situacao=None):
     """
     Calcula indicadores financeiros de dividendos e yields (DY e YOC) para uma lista de ativos.
+    Usa o índice por ticker (src.indice_series): o último valor e a soma dos últimos 12 meses
+    de cada ativo saem por busca binária e soma acumulada, sem varrer os DataFrames.
 
     Parâmetros:
     - ativos: lista de tickers (ex: ['HGRU11', 'TAEE11'])
     - precos_medios: dicionário com preço médio de compra por ativo
     - df_dividendos_excel: DataFrame com histórico de dividendos pagos (colunas: 'ticker', 'date', 'dividendo')
+                           ou o índice já construído por indexar()
     - df_cotacoes_atual: DataFrame com últimas cotações dos ativos (colunas: 'ticker', 'date', 'valor_cotação')
+                         ou o índice já construído por indexar()
+    - situacao: dicionário opcional ticker -> situação dos dados (src.historico_local);
+                quando informado, acrescenta a coluna "Dados"
 
     Retorna:
-    - DataFrame consolidado com métricas por ativo
+    - DataFrame numérico com uma linha por ativo (valores ausentes como NaN).
+      Use formatar_tabela_dividendos para obter a versão de exibição.
+    """
+    ativos = list(ativos)
+    indice = pd.Index(ativos, name="Ativo")
+    data_limite = pd.Timestamp.now() - pd.DateOffset(months=12)  # Referência dos últimos 12 meses
+
+    # --- Dividendos: recortes por busca binária no índice por ticker ---
+    indice_dividendos = indexar(df_dividendos_excel, 'dividendo')
+    ultimo_dividendo = pd.Series(indice_dividendos.ultimos_valores(ativos), index=indice)
+    tem_dividendos = ultimo_dividendo.notna()
+
+    somas, contagens = indice_dividendos.somas_desde(ativos, data_limite)
+    somas = pd.Series(somas, index=indice)
+    contagens = pd.Series(contagens, index=indice)
+    # Ativos com histórico, mas sem pagamentos nos últimos 12 meses, ficam com 0
+    dividendos_12m = somas.where(tem_dividendos).round(2)
+    media_dividendos = (somas / contagens.where(contagens > 0)).fillna(0).where(tem_dividendos).round(2)
+
+    # --- Cotação atual: último fechamento de cada ativo ---
+    cotacao_atual = pd.Series(indexar(df_cotacoes_atual, 'valor_cotação').ultimos_valores(ativos), index=indice).round(2)
+
+    # --- Preço médio e cálculos de yield ---
+    preco_medio = pd.Series(precos_medios, dtype=float).reindex(indice)
+    dy_atual = (dividendos_12m / cotacao_atual.where(cotacao_atual != 0) * 100).round(2)
+    yoc = (dividendos_12m / preco_medio.where(preco_medio != 0) * 100).round(2)
+
+    resultado = pd.DataFrame({
+        "Preço Médio": preco_medio,
+        "Cotação Atual": cotacao_atual,
+        "Dividendo 12 Mês": dividendos_12m,
+        "Dividendo Mês atual": ultimo_dividendo.round(2),
+        "Média dos Dividendos (12m)": media_dividendos,
+        "% Yield Atual (DY)": dy_atual,
+        "% Yield on Cost (YOC)": yoc,
+    }, index=indice)
+    colunas = COLUNAS_TABELA
+    if situacao is not None:
+        resultado["Dados"] = pd.Series(situacao, dtype=object).reindex(indice).fillna(INDISPONIVEL)
+        colunas = COLUNAS_TABELA + ["Dados"]
+    return resultado.reset_index()[colunas]
+
+
+@metricas.cronometrado('tabela.formatar_tabela_dividendos')
+def formatar_tabela_dividendos(df_indicadores, avisos=True):
     """
+    Etapa de apresentação: converte o DataFrame numérico de calcular_dividendos_yields
+    em textos "R$ …" / "%" e indica a variação do último dividendo em relação à média.
 
-    dados_ativos = []  # Lista que armazenará os dados processados
-    agora = pd.Timestamp.now()  # Data e hora atual para referência dos últimos 12 meses
-    df_dividendos_excel['date'] = pd.to_datetime(df_dividendos_excel['date'], format='%d/%m/%Y')
-
-    for ticker in ativos:
-        try:
-            # --- Carregar dividendos do ativo atual ---
-            df_ticker_dividendos = df_dividendos_excel[df_dividendos_excel['ticker'] == ticker].copy()
-
-            # Caso não existam dados de dividendos
-            if df_ticker_dividendos.empty:
-                st.warning(f"Não foram encontrados dividendos no arquivo para o ativo: {ticker}")
-                preco_medio_raw = precos_medios.get(ticker, None)
-
-                dados_ativos.append({
-                    "Ativo": ticker,
-                    "Preço Médio": f"R$ {preco_medio_raw:.2f}" if preco_medio_raw is not None else "-",
-                    "Cotação Atual": "-",
-                    "Dividendo 12 Mês": "-",
-                    "Dividendo Mês atual": "-",
-                    "Média dos Dividendos (12m)": "-",
-                    "% Yield Atual (DY)": "-",
-                    "% Yield on Cost (YOC)": "-"
-                })
-                continue  # Vai para o próximo ticker
-
-            # --- Processar datas e filtrar dividendos dos últimos 12 meses ---
-            df_ticker_dividendos['date'] = pd.to_datetime(df_ticker_dividendos['date'], format='%d/%m/%Y')
-            data_limite = agora - pd.DateOffset(months=12)
-            data_12_meses = df_ticker_dividendos[df_ticker_dividendos['date'] >= data_limite]
-
-            # --- Cálculo dos dividendos e média ---
-            dividendos_12m = round(data_12_meses['dividendo'].sum(), 2)
-            media_dividendos = round(data_12_meses['dividendo'].mean(), 2) if not data_12_meses.empty else 0
-            ultimo_dividendo = round(df_ticker_dividendos.iloc[-1]['dividendo'], 2)
-
-            # Indicador de variação do último dividendo em relação à média
-            if media_dividendos > 0:
-                if ultimo_dividendo > media_dividendos:
-                    variacao = "▲"
-                elif ultimo_dividendo < media_dividendos:
-                    variacao = "▼"
-                else:
-                    variacao = "-"
-            else:
-                variacao = ""
-
-            # --- Cotação atual ---
-            df_ticker_cotacoes = df_cotacoes_atual[df_cotacoes_atual['ticker'] == ticker].copy()
-            if not df_ticker_cotacoes.empty:
-                df_ticker_cotacoes['date'] = pd.to_datetime(df_ticker_cotacoes['date'], format='%d/%m/%Y')
-                df_ticker_cotacoes_ordenado = df_ticker_cotacoes.sort_values(by='date', ascending=False)
-                cotacao_atual = df_ticker_cotacoes_ordenado.iloc[0]['valor_cotação']
-            else:
-                cotacao_atual = np.nan
-                st.warning(f"Não foram encontradas cotações para o ativo: {ticker}")
-
-            # --- Preço médio e cálculos de yield ---
-            preco_medio_raw = precos_medios.get(ticker, None)
-            dy_atual = round((dividendos_12m / cotacao_atual) * 100, 2) if pd.notna(cotacao_atual) and cotacao_atual != 0 else np.nan
-            yoc = round((dividendos_12m / preco_medio_raw) * 100, 2) if preco_medio_raw not in [None, 0] else np.nan
-
-            # --- Consolidar dados no resultado final ---
-            dados_ativos.append({
-                "Ativo": ticker,
-                "Preço Médio": f"R$ {preco_medio_raw:.2f}" if preco_medio_raw is not None else "-",
-                "Cotação Atual": f"R$ {cotacao_atual:.2f}" if pd.notna(cotacao_atual) else "-",
-                "Dividendo 12 Mês": f"R$ {dividendos_12m:.2f}",
-                "Dividendo Mês atual": f"R$ {ultimo_dividendo:.2f}  ({variacao})",
-                "Média dos Dividendos (12m)": f"R$ {media_dividendos:.2f}",
-                "% Yield Atual (DY)": f"{dy_atual:.2f}%" if not np.isnan(dy_atual) else "-",
-                "% Yield on Cost (YOC)": f"{yoc:.2f}%" if not np.isnan(yoc) else "-"
-            })
-
-        except Exception as e:
-            # Em caso de erro durante o processamento de um ativo
-            st.error(f"Erro ao processar o ativo {ticker}: {e}")
-            preco_medio_raw = precos_medios.get(ticker, None)
-
-            dados_ativos.append({
-                "Ativo": ticker,
-                "Preço Médio": f"R$ {preco_medio_raw:.2f}" if preco_medio_raw is not None else "-",
-                "Cotação Atual": "-",
-                "Dividendo 12 Mês": "-",
-                "Dividendo Mês atual": "-",
-                "Média dos Dividendos (12m)": "-",
-                "% Yield Atual (DY)": "-",
-                "% Yield on Cost (YOC)": "-"
-            })
-
-    # Converte lista final em DataFrame
-    return pd.DataFrame(dados_ativos)
\ No newline at end of file
+    Parâmetros:
+    - df_indicadores: DataFrame retornado por calcular_dividendos_yields
+    - avisos: Exibe st.warning para ativos sem dividendos ou cotações (desligado
+      nas atualizações parciais da carga progressiva)
+
+    Retorna:
+    - DataFrame pronto para exibição
+    """
+    df = df_indicadores
+
+    if avisos:
+        for ticker in df.loc[df["Dividendo Mês atual"].isna(), "Ativo"]:
+            st.warning(f"Não foram encontrados dividendos no arquivo para o ativo: {ticker}")
+        for ticker in df.loc[df["Dividendo Mês atual"].notna() & df["Cotação Atual"].isna(), "Ativo"]:
+            st.warning(f"Não foram encontradas cotações para o ativo: {ticker}")
+
+    def reais(serie):
+        return serie.map(lambda valor: f"R$ {valor:.2f}" if pd.notna(valor) else "-")
+
+    def percentual(serie):
+        return serie.map(lambda valor: f"{valor:.2f}%" if pd.notna(valor) else "-")
+
+    # Indicador de variação do último dividendo em relação à média
+    ultimo = df["Dividendo Mês atual"]
+    media = df["Média dos Dividendos (12m)"]
+    variacao = np.select([media <= 0, ultimo > media, ultimo < media], ["", "▲", "▼"], default="-")
+    variacao = pd.Series(np.where(media.isna(), "", variacao), index=df.index)
+    dividendo_atual = reais(ultimo) + "  (" + variacao + ")"
+
+    tabela = pd.DataFrame({
+        "Ativo": df["Ativo"],
+        "Preço Médio": reais(df["Preço Médio"]),
+        "Cotação Atual": reais(df["Cotação Atual"]),
+        "Dividendo 12 Mês": reais(df["Dividendo 12 Mês"]),
+        "Dividendo Mês atual": dividendo_atual.where(ultimo.notna(), "-"),
+        "Média dos Dividendos (12m)": reais(media),
+        "% Yield Atual (DY)": percentual(df["% Yield Atual (DY)"]),
+        "% Yield on Cost (YOC)": percentual(df["% Yield on Cost (YOC)"]),
+    })
+    if "Dados" in df:
+        tabela["Dados"] = df["Dados"].map(ROTULOS_SITUACAO)
+    return tabela
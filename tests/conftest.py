@@ -0,0 +1,19 @@
+import pytest
+from benchmarks.servidor_falso import ServidorFalso
+from src import dados_online
+
+
+@pytest.fixture
+def pasta_projeto(tmp_path, monkeypatch):
+    """Executa o teste numa pasta vazia: data/, carteiras/ e os caches saem em tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def servidor(pasta_projeto, monkeypatch):
+    """Servidor falso do chart com 4 tickers sintéticos, sem o cache de respostas em disco."""
+    with ServidorFalso.sintetico(4, anos=1) as servidor:
+        monkeypatch.setattr(dados_online, 'YAHOO_CHART_URL', servidor.url)
+        monkeypatch.setattr(dados_online, 'USAR_CACHE_RESPOSTAS', False)
+        yield servidor
@@ -0,0 +1,36 @@
+import numpy as np
+
+from src.amostragem import lttb
+
+
+def test_lttb_mantem_as_pontas_e_devolve_o_limite_de_pontos():
+    x = np.arange(1000)
+    y = np.sin(x / 50.0)
+
+    indices = lttb(x, y, 100)
+
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_preserva_picos_isolados():
+    x = np.arange(500)
+    y = np.zeros(500)
+    y[123], y[377] = 10.0, -10.0
+
+    indices = lttb(x, y, 20)
+    assert 123 in indices and 377 in indices
+
+
+def test_lttb_aceita_datas():
+    x = np.arange('2024-01-01', '2025-01-01', dtype='datetime64[D]').astype('datetime64[ns]')
+    indices = lttb(x, np.arange(len(x), dtype='float64'), 50)
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+
+
+def test_lttb_sem_reducao_devolve_todos_os_pontos():
+    y = np.arange(10.0)
+    for limite in (None, 10, 50, 2):
+        assert lttb(np.arange(10), y, limite).tolist() == list(range(10))
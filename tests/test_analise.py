@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from benchmarks.servidor_falso import ServidorFalso
+from src import analise, dados_online
+from src.carrega_dados import dividendos_historicos
+from src.esquema import normalizar
+from src.historico_local import DIAS_DIVIDENDOS
+
+
+def _historico():
+    # Dois anos de pregões (dias úteis) a R$ 10 e um dividendo de R$ 0,10 no dia 15 de cada mês
+    datas = pd.bdate_range('2023-01-02', '2024-12-31')
+    df_cotacoes = normalizar(pd.DataFrame({'date': datas, 'ticker': 'AAAA11.SA', 'valor_cotação': 10.0}), 'cotacoes')
+    datas_div = pd.date_range('2023-01-15', '2024-12-15', freq='MS') + pd.Timedelta(days=14)
+    df_dividendos = normalizar(pd.DataFrame({'date': datas_div, 'ticker': 'AAAA11.SA', 'dividendo': 0.1}),
+                               'dividendos')
+    return df_cotacoes, df_dividendos
+
+
+def test_dividendos_12m_somam_a_janela_de_um_ano():
+    df_cotacoes, df_dividendos = _historico()
+    resultado = analise.calcular_analise(df_cotacoes, df_dividendos, {'AAAA11.SA': 8.0})
+
+    # Em 2024-06-28 a janela (2023-06-29, 2024-06-28] tem os dividendos de julho/2023 a junho/2024
+    dia = pd.Timestamp('2024-06-28')
+    assert resultado.dividendos_12m.loc[dia, 'AAAA11.SA'] == pytest.approx(1.2)
+    assert resultado.dy_12m.loc[dia, 'AAAA11.SA'] == pytest.approx(12.0)
+    assert resultado.yoc_12m.loc[dia, 'AAAA11.SA'] == pytest.approx(15.0)
+
+
+def test_janela_anterior_aos_dividendos_carregados_fica_sem_yield():
+    df_cotacoes, df_dividendos = _historico()
+    inicio = date(2024, 1, 1)
+    carregados = df_dividendos[df_dividendos['date'] >= pd.Timestamp(inicio)].reset_index(drop=True)
+    resultado = analise.calcular_analise(df_cotacoes, carregados, {'AAAA11.SA': 8.0}, inicio_dividendos=inicio)
+
+    incompletas = resultado.dy_12m.index < pd.Timestamp(inicio) + pd.Timedelta(days=analise.JANELA_DIVIDENDOS_DIAS)
+    assert resultado.dividendos_12m['AAAA11.SA'][incompletas].isna().all()
+    assert resultado.dy_12m['AAAA11.SA'][incompletas].isna().all()
+    assert resultado.yoc_12m['AAAA11.SA'][incompletas].isna().all()
+    assert resultado.dividendos_12m['AAAA11.SA'][~incompletas].iloc[-1] == pytest.approx(1.2)
+
+
+def test_dividendos_historicos_cobrem_a_janela_do_primeiro_pregao(pasta_projeto, monkeypatch):
+    with ServidorFalso.sintetico(2, anos=3) as servidor:
+        monkeypatch.setattr(dados_online, 'YAHOO_CHART_URL', servidor.url)
+        monkeypatch.setattr(dados_online, 'USAR_CACHE_RESPOSTAS', False)
+        cotacoes, carregados = dados_online.buscar_cotacoes_e_dividendos_yahoo(servidor.tickers,
+                                                                              requisicoes_por_segundo=0)
+        dividendos, inicio = dividendos_historicos(cotacoes, carregados, servidor.tickers)
+
+    primeiro_pregao = cotacoes['date'].min()
+    assert pd.Timestamp(inicio) <= primeiro_pregao - pd.Timedelta(days=analise.JANELA_DIVIDENDOS_DIAS)
+    assert dividendos['date'].min() < pd.Timestamp(date.today() - timedelta(days=DIAS_DIVIDENDOS))
+    # Com os dividendos completos, nenhum pregão fica sem a soma de 12 meses
+    resultado = analise.calcular_analise(cotacoes, dividendos, {}, inicio_dividendos=inicio)
+    assert not resultado.dividendos_12m.isna().to_numpy().any()
@@ -0,0 +1,39 @@
+import os
+import shutil
+
+import pandas as pd
+
+from src import armazenamento
+from src.esquema import normalizar
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_primeira_execucao_cria_os_snapshots_a_partir_das_planilhas(pasta_projeto):
+    os.makedirs('data')
+    for caminho in (armazenamento.CAMINHO_COTACOES_XLSX, armazenamento.CAMINHO_DIVIDENDOS_XLSX):
+        shutil.copy(os.path.join(RAIZ, caminho), caminho)
+    assert armazenamento.idade_snapshots() is None
+
+    df_cotacoes, df_dividendos = armazenamento.carregar_snapshots()
+
+    assert os.path.exists(armazenamento.CAMINHO_COTACOES) and os.path.exists(armazenamento.CAMINHO_DIVIDENDOS)
+    esperado = normalizar(pd.read_excel(armazenamento.CAMINHO_COTACOES_XLSX), 'cotacoes')
+    pd.testing.assert_frame_equal(df_cotacoes, esperado, check_categorical=False)
+    assert not df_dividendos.empty
+    # Nas execuções seguintes os snapshots existentes são mantidos
+    assert armazenamento.migrar_excel() == []
+
+
+def test_snapshot_gravado_e_lido_no_esquema_canonico(pasta_projeto):
+    df = normalizar(pd.DataFrame({
+        'date': pd.to_datetime(['2024-01-03', '2024-01-02']),
+        'ticker': ['AAAA11.SA', 'AAAA11.SA'],
+        'dividendo': [0.5, 0.4],
+    }), 'dividendos')
+    caminho = os.path.join('data', 'dividendos.feather')
+
+    armazenamento.salvar_snapshot(df, caminho, 'dividendos')
+
+    pd.testing.assert_frame_equal(armazenamento.ler_snapshot(caminho, 'dividendos'), df)
+    assert os.listdir('data') == ['dividendos.feather']
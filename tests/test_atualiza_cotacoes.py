@@ -0,0 +1,32 @@
+import json
+import os
+
+import pytest
+
+from src import metricas
+from src.armazenamento import CAMINHO_COTACOES, CAMINHO_DIVIDENDOS, ler_snapshot
+from src.atualiza_cotacoes import CAMINHO_TRAVA, AtualizacaoEmAndamento, executar_atualizacao
+
+
+def test_atualizar_parte_dos_tickers_mantem_os_demais_no_snapshot(servidor):
+    tickers = servidor.tickers
+    executar_atualizacao(tickers, requisicoes_por_segundo=0)
+    resumo = executar_atualizacao(tickers[:1], requisicoes_por_segundo=0)
+
+    assert resumo['tickers'] == 1
+    assert set(ler_snapshot(CAMINHO_COTACOES, 'cotacoes')['ticker'].astype(str)) == set(tickers)
+    assert set(ler_snapshot(CAMINHO_DIVIDENDOS, 'dividendos')['ticker'].astype(str)) == set(tickers)
+
+
+def test_trava_ocupada_encerra_a_coleta_de_metricas(servidor):
+    os.makedirs(os.path.dirname(CAMINHO_TRAVA), exist_ok=True)
+    with open(CAMINHO_TRAVA, 'w') as f:
+        f.write(str(os.getpid()))
+
+    with pytest.raises(AtualizacaoEmAndamento):
+        executar_atualizacao(servidor.tickers, requisicoes_por_segundo=0)
+
+    assert metricas.coleta_atual() is None
+    with open(metricas.CAMINHO_LOG, encoding='utf-8') as f:
+        linhas = [json.loads(linha) for linha in f if linha.strip()]
+    assert linhas[-1]['coleta'] == 'atualiza_cotacoes'
@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+import pandas as pd
+import pytest
+from benchmarks.dados_sinteticos import gerar_historico
+from benchmarks.servidor_falso import ServidorFalso
+from src import dados_online
+from src.avaliacao import calcular_avaliacao, compras_anteriores
+from src.carrega_dados import dividendos_para_avaliacao
+from src.carteiras import Carteira
+from src.historico_local import DIAS_DIVIDENDOS
+
+
+def test_compra_antiga_recebe_os_dividendos_desde_a_compra(pasta_projeto, monkeypatch):
+    df_cotacoes, df_dividendos = gerar_historico(2, anos=3)
+    ticker = str(df_cotacoes['ticker'].cat.categories[0])
+    compra = date.today() - timedelta(days=700)
+    carteira = Carteira('Teste', [ticker], {}, {ticker: 10.0}, {ticker: [(compra, 10.0, 50.0)]})
+
+    inicio = date.today() - timedelta(days=DIAS_DIVIDENDOS)
+    carregados = df_dividendos[df_dividendos['date'] >= pd.Timestamp(inicio)].reset_index(drop=True)
+    do_ticker = df_dividendos[(df_dividendos['ticker'] == ticker) & (df_dividendos['date'] > pd.Timestamp(compra))]
+    esperado = 10 * do_ticker['dividendo'].astype('float64').sum()
+
+    with ServidorFalso.sintetico(2, anos=3) as servidor:
+        monkeypatch.setattr(dados_online, 'YAHOO_CHART_URL', servidor.url)
+        monkeypatch.setattr(dados_online, 'USAR_CACHE_RESPOSTAS', False)
+        dividendos, completo = dividendos_para_avaliacao(carregados, compras_anteriores(carteira, inicio))
+
+    assert completo
+    recebidos = calcular_avaliacao(carteira, df_cotacoes, dividendos).total['Proventos Recebidos']
+    assert recebidos == pytest.approx(esperado, rel=1e-4)
+    # Só com os 12 meses carregados, a mesma compra ficaria subestimada
+    assert calcular_avaliacao(carteira, df_cotacoes, carregados).total['Proventos Recebidos'] < recebidos
+
+
+def test_compras_recentes_nao_precisam_de_mais_dividendos():
+    hoje = date.today()
+    carteira = Carteira('Teste', ['AAAA11.SA'], {}, {'AAAA11.SA': 1.0},
+                        {'AAAA11.SA': [(hoje - timedelta(days=30), 1.0, 10.0)]})
+    assert compras_anteriores(carteira, hoje - timedelta(days=DIAS_DIVIDENDOS)) == {}
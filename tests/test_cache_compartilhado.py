@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+
+from src import cache_compartilhado
+
+
+def test_excedentes_saem_do_disco_e_da_memoria_sem_reler_a_pasta_a_cada_gravacao(tmp_path, monkeypatch):
+    pasta = str(tmp_path / 'cache')
+    leituras = []
+    recontar = cache_compartilhado._recontar
+    monkeypatch.setattr(cache_compartilhado, '_recontar', lambda p: leituras.append(p) or recontar(p))
+
+    for indice in range(4):
+        cache_compartilhado.gravar(f'chave{indice}', b'x' * 1000, pasta, tamanho_maximo=10_000)
+        # Acessos em ordem: chave0 é a menos usada
+        os.utime(os.path.join(pasta, f'chave{indice}.pkl'), (indice, indice))
+    assert len(leituras) == 1
+
+    cache_compartilhado.gravar('grande', b'x' * 8000, pasta, tamanho_maximo=10_000)
+    assert len(leituras) == 2
+    assert not os.path.exists(os.path.join(pasta, 'chave0.pkl'))
+    assert 'chave0' not in cache_compartilhado._memoria
+    assert cache_compartilhado.ler('grande', 60, pasta)[0] == b'x' * 8000
+
+
+def _envelhecer(pasta, chave, segundos):
+    caminho = os.path.join(pasta, f'{chave}.pkl')
+    antes = time.time() - segundos
+    os.utime(caminho, (antes, antes))
+
+
+def test_entrada_vencida_e_servida_como_obsoleta_ate_a_idade_maxima(tmp_path):
+    pasta = str(tmp_path / 'cache')
+    cache_compartilhado.gravar('chave', {'valor': 1}, pasta)
+    assert cache_compartilhado.ler('chave', 60, pasta) == ({'valor': 1}, 'fresco')
+
+    _envelhecer(pasta, 'chave', 120)
+    assert cache_compartilhado.ler('chave', 60, pasta) == ({'valor': 1}, 'obsoleto')
+
+    _envelhecer(pasta, 'chave', 60 + cache_compartilhado.IDADE_MAXIMA_OBSOLETA_SEGUNDOS + 1)
+    assert cache_compartilhado.ler('chave', 60, pasta) == (None, None)
+    assert cache_compartilhado.ler('outra', 60, pasta) == (None, None)
+
+
+def test_atualizacao_em_segundo_plano_serve_a_entrada_obsoleta_enquanto_carrega(tmp_path):
+    pasta = str(tmp_path / 'cache')
+    cache_compartilhado.gravar('chave', 'antigo', pasta)
+    _envelhecer(pasta, 'chave', 120)
+    liberar = threading.Event()
+
+    def carregar():
+        liberar.wait(5)
+        return 'novo'
+
+    assert cache_compartilhado.atualizar_em_segundo_plano('chave', carregar, pasta)
+    # Durante a atualização: a entrada antiga continua servida e não se dispara outra
+    assert cache_compartilhado.ler('chave', 60, pasta) == ('antigo', 'obsoleto')
+    assert not cache_compartilhado.atualizar_em_segundo_plano('chave', carregar, pasta)
+
+    liberar.set()
+    limite = time.time() + 5
+    while cache_compartilhado.ler('chave', 60, pasta)[1] != 'fresco' and time.time() < limite:
+        time.sleep(0.01)
+    assert cache_compartilhado.ler('chave', 60, pasta) == ('novo', 'fresco')
+    while 'chave' in cache_compartilhado._em_atualizacao and time.time() < limite:
+        time.sleep(0.01)
+    assert not os.path.exists(os.path.join(pasta, 'chave.lock'))
+
+
+def test_atualizacoes_simultaneas_da_mesma_chave_carregam_uma_vez(tmp_path):
+    pasta = str(tmp_path / 'cache')
+    chamadas = []
+
+    def carregar():
+        chamadas.append(1)
+        time.sleep(0.3)
+        return 'dados'
+
+    resultados = []
+    threads = [threading.Thread(target=lambda: resultados.append(
+        cache_compartilhado.atualizar('chave', carregar, 60, pasta))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert resultados == ['dados'] * 3
+    assert len(chamadas) == 1
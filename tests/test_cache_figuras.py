@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.dados_sinteticos import gerar_historico
+from src import cache_figuras
+from src.cache_lru import CacheLRU
+
+
+def test_cache_lru_remove_a_entrada_usada_ha_mais_tempo():
+    cache = CacheLRU(2, nome='teste')
+    criadas = []
+
+    def criar(chave):
+        return lambda: criadas.append(chave) or chave.upper()
+
+    assert cache.obter('a', criar('a')) == 'A'
+    cache.obter('b', criar('b'))
+    assert cache.obter('a', criar('a')) == 'A'   # acerto: 'a' passa a ser a mais recente
+    cache.obter('c', criar('c'))                 # remove 'b'
+    cache.obter('a', criar('a'))
+    cache.obter('b', criar('b'))
+
+    assert criadas == ['a', 'b', 'c', 'b']
+    assert cache.estatisticas() == {'acertos': 2, 'faltas': 4, 'itens': 2}
+    cache.limpar()
+    assert cache.estatisticas()['itens'] == 0
+
+
+def test_figura_e_reaproveitada_ate_os_dados_ou_parametros_mudarem():
+    df_cotacoes, df_dividendos = gerar_historico(1, anos=1)
+    ticker = df_cotacoes['ticker'].cat.categories[0]
+    precos_medios = {ticker: 50.0}
+
+    figura = cache_figuras.grafico_cotacao(ticker, 60, precos_medios, df_cotacoes)
+    assert cache_figuras.grafico_cotacao(ticker, 60, precos_medios, df_cotacoes) is figura
+    assert cache_figuras.grafico_cotacao(ticker, 30, precos_medios, df_cotacoes) is not figura
+    assert cache_figuras.grafico_cotacao(ticker, 60, {ticker: 51.0}, df_cotacoes) is not figura
+
+    # Nova carga com outro conteúdo: outra versão do índice, outra figura
+    recarregado = df_cotacoes.copy()
+    recarregado['valor_cotação'] = recarregado['valor_cotação'] * 2
+    assert cache_figuras.grafico_cotacao(ticker, 60, precos_medios, recarregado) is not figura
+    # Mesmo conteúdo em outro DataFrame: mesma versão, figura reaproveitada
+    assert cache_figuras.grafico_cotacao(ticker, 60, precos_medios, df_cotacoes.copy()) is figura
+
+    dividendos = cache_figuras.grafico_dividendos(ticker, 12, df_dividendos)
+    assert cache_figuras.grafico_dividendos(ticker, 12, df_dividendos) is dividendos
+
+
+def test_tipo_de_grafico_de_analise_desconhecido():
+    with pytest.raises(ValueError, match='desconhecido'):
+        cache_figuras.grafico_analise('outro', 'AAAA11.SA', 30, SimpleNamespace(versao='x'))
@@ -0,0 +1,65 @@
+import os
+from datetime import datetime
+import pytest
+from src import cache_respostas, dados_online
+from src.cache_respostas import FUSO_B3, TTL_PREGAO_ABERTO_SEGUNDOS
+
+
+@pytest.mark.parametrize('agora, esperado', [
+    (datetime(2026, 10, 14, 11, 0, tzinfo=FUSO_B3), TTL_PREGAO_ABERTO_SEGUNDOS),   # quarta, pregão aberto
+    (datetime(2026, 10, 14, 9, 0, tzinfo=FUSO_B3), 60 * 60),                       # antes da abertura
+    (datetime(2026, 10, 14, 18, 30, tzinfo=FUSO_B3), 15.5 * 60 * 60),              # fechamento -> quinta 10h
+    (datetime(2026, 10, 16, 19, 0, tzinfo=FUSO_B3), 63 * 60 * 60),                 # sexta à noite -> segunda
+    (datetime(2026, 10, 17, 12, 0, tzinfo=FUSO_B3), 46 * 60 * 60),                 # sábado -> segunda
+    (datetime(2026, 10, 19, 9, 58, tzinfo=FUSO_B3), TTL_PREGAO_ABERTO_SEGUNDOS),   # nunca menos que o TTL curto
+])
+def test_ttl_segue_o_horario_da_b3(agora, esperado):
+    assert cache_respostas.ttl_segundos(agora) == esperado
+
+
+def test_ttl_aceita_outros_fusos():
+    # 14h UTC = 11h em Brasília, pregão aberto
+    assert cache_respostas.pregao_aberto(datetime.fromisoformat('2026-10-14T14:00:00+00:00'))
+
+
+def _buscar(ticker):
+    period1, period2 = dados_online._periodo(30)
+    params = {'period1': period1, 'period2': period2, 'interval': '1d', 'events': 'div|split'}
+    return dados_online.baixar_charts_em_paralelo([ticker], params, requisicoes_por_segundo=0)
+
+
+def test_resposta_valida_vem_do_disco_e_vencida_e_revalidada_com_etag(servidor, monkeypatch):
+    monkeypatch.setattr(dados_online, 'USAR_CACHE_RESPOSTAS', True)
+    ticker = servidor.tickers[0]
+
+    primeira = _buscar(ticker)
+    assert servidor.requisicoes == 1
+
+    assert _buscar(ticker) == primeira
+    assert servidor.requisicoes == 1
+
+    cache_respostas.expirar()
+    assert _buscar(ticker) == primeira
+    assert (servidor.requisicoes, servidor.nao_modificadas) == (2, 1)
+
+    # A revalidação estende a validade: a próxima busca volta a vir do disco
+    assert _buscar(ticker) == primeira
+    assert servidor.requisicoes == 2
+
+
+def test_limite_de_tamanho_sem_reler_a_pasta_a_cada_gravacao(pasta_projeto, monkeypatch):
+    pasta = str(pasta_projeto / 'http')
+    leituras = []
+    recontar = cache_respostas._recontar
+    monkeypatch.setattr(cache_respostas, '_recontar', lambda p: leituras.append(p) or recontar(p))
+
+    corpo = os.urandom(2000)
+    for i in range(100):
+        cache_respostas.gravar(f'chave{i}', corpo, pasta=pasta, tamanho_maximo=10 ** 6)
+    assert len(leituras) == 1
+
+    for i in range(100, 110):
+        cache_respostas.gravar(f'chave{i}', corpo, pasta=pasta, tamanho_maximo=50_000)
+    arquivos = [nome for nome in os.listdir(pasta) if nome.endswith('.resp')]
+    assert sum(os.path.getsize(os.path.join(pasta, nome)) for nome in arquivos) <= 50_000
+    assert 'chave109.resp' in arquivos and 'chave0.resp' not in arquivos
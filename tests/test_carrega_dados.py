@@ -0,0 +1,84 @@
+import time
+import threading
+
+import pandas as pd
+
+from src import carrega_dados
+from src.esquema import normalizar, vazio
+from src.historico_local import ATUALIZADO, INDISPONIVEL
+
+
+def test_falha_na_validacao_nao_e_relatada_como_falha_dos_dados_locais(pasta_projeto, monkeypatch, capsys):
+    def buscar_dados(ativos_config):
+        raise ValueError("Colunas inválidas para cotacoes")
+
+    monkeypatch.setattr(carrega_dados, '_buscar_dados', buscar_dados)
+    assert carrega_dados.carregar_dados(['AAAA3.SA'], use_cache=False) == (None, None, None)
+
+    saida = capsys.readouterr().out
+    assert "Erro ao buscar os dados: Colunas inválidas para cotacoes" in saida
+    assert "dados locais" not in saida
+
+
+def test_falha_dos_dados_locais_informada_no_fallback(pasta_projeto, monkeypatch, capsys):
+    def atualizar_historico(ativos_config):
+        raise ConnectionError("sem rede")
+
+    monkeypatch.setattr(carrega_dados, 'atualizar_historico', atualizar_historico)
+    assert carrega_dados.carregar_dados(['AAAA3.SA'], use_cache=False) == (None, None, None)
+
+    saida = capsys.readouterr().out
+    assert "Erro ao carregar dados online: sem rede" in saida
+    assert "Erro ao carregar dados locais" in saida
+
+
+def test_progressivo_sem_dados_online_nem_locais_entrega_tickers_indisponiveis(pasta_projeto, monkeypatch, capsys):
+    def iterar_historico(ativos_config):
+        raise ConnectionError("sem rede")
+        yield
+
+    monkeypatch.setattr(carrega_dados, 'iterar_historico', iterar_historico)
+    itens = list(carrega_dados.carregar_dados_progressivo(['AAAA3.SA', 'BBBB4.SA'], prioridade='BBBB4.SA'))
+
+    assert [item[0] for item in itens] == ['BBBB4.SA', 'AAAA3.SA']
+    assert all(item[1].empty and item[2].empty and item[3] == INDISPONIVEL for item in itens)
+    assert "Erro ao carregar dados locais" in capsys.readouterr().out
+
+
+def test_carteiras_com_tickers_em_comum_buscam_cada_ticker_uma_vez(pasta_projeto, monkeypatch):
+    buscados = []
+
+    def buscar_dados(tickers):
+        buscados.extend(tickers)
+        time.sleep(0.3)
+        return vazio('cotacoes'), vazio('dividendos'), {ticker: INDISPONIVEL for ticker in tickers}
+
+    monkeypatch.setattr(carrega_dados, '_buscar_dados', buscar_dados)
+    carteiras = (['AAAA3.SA', 'BBBB4.SA'], ['BBBB4.SA', 'CCCC3.SA'])
+    threads = [threading.Thread(target=carrega_dados._buscar_e_gravar, args=(tickers,)) for tickers in carteiras]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(buscados) == ['AAAA3.SA', 'BBBB4.SA', 'CCCC3.SA']
+    assert not carrega_dados._ler_entradas(['AAAA3.SA', 'BBBB4.SA', 'CCCC3.SA'])[2]
+
+
+def test_tickers_carregados_sao_combinados_mesmo_com_falha_no_meio(pasta_projeto, monkeypatch):
+    df_cotacoes = normalizar(pd.DataFrame({'date': pd.bdate_range('2026-01-05', periods=3), 'ticker': 'AAAA3.SA',
+                                           'valor_cotação': [10.0, 10.5, 11.0]}), 'cotacoes')
+
+    def iterar_historico(ativos_config):
+        yield 'AAAA3.SA', df_cotacoes, vazio('dividendos'), ATUALIZADO
+        raise ConnectionError("sem rede")
+
+    monkeypatch.setattr(carrega_dados, 'iterar_historico', iterar_historico)
+    tickers = ['AAAA3.SA', 'BBBB4.SA', 'CCCC3.SA']
+    itens = {ticker: resto for ticker, *resto in carrega_dados.carregar_dados_progressivo(tickers[:2])}
+    cotacoes, _, situacao = carrega_dados.combinar_carregados(tickers, itens)
+
+    assert situacao == {'AAAA3.SA': ATUALIZADO, 'BBBB4.SA': INDISPONIVEL, 'CCCC3.SA': INDISPONIVEL}
+    assert cotacoes['valor_cotação'].tolist() == [10.0, 10.5, 11.0]
+    # O ticker indisponível não foi para o cache: a página não pode depender de dados_em_cache
+    assert carrega_dados.dados_em_cache(tickers[:2]) is None
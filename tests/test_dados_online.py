@@ -0,0 +1,126 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from src import dados_online
+from src.esquema import validar
+
+
+def test_sondagem_com_erro_definitivo_nao_prende_o_disjuntor(servidor, pasta_projeto):
+    disjuntor = dados_online.obter_disjuntor(servidor.url)
+    disjuntor.aberto_segundos = 0.2
+    for _ in range(disjuntor.falhas_para_abrir):
+        disjuntor.registrar_falha()
+    time.sleep(0.25)
+
+    params = {'interval': '1d'}
+    relatorio = []
+    dados_online.baixar_charts_em_paralelo(['XXXX3.SA'], params, requisicoes_por_segundo=0, relatorio=relatorio)
+    assert relatorio[0]['status'] == 'falha'
+    assert 'HTTP 404' in relatorio[0]['erro']
+
+    time.sleep(0.25)
+    resultados = dados_online.baixar_charts_em_paralelo(servidor.tickers[:1], params, requisicoes_por_segundo=0)
+    assert list(resultados) == servidor.tickers[:1]
+    assert disjuntor.estado == 'fechado'
+
+
+def test_uma_requisicao_por_ticker_traz_cotacoes_e_dividendos(servidor):
+    servidor.zerar_contadores()
+    df_cotacoes, df_dividendos = dados_online.buscar_cotacoes_e_dividendos_yahoo(
+        servidor.tickers, days_range=200, dividendos_days_range=365, requisicoes_por_segundo=0)
+
+    assert servidor.requisicoes == len(servidor.tickers)
+    assert set(df_cotacoes['ticker'].astype(str)) == set(servidor.tickers)
+    assert set(df_dividendos['ticker'].astype(str)) == set(servidor.tickers)
+    # Cada tabela respeita a própria janela, mesmo vindo da mesma resposta
+    hoje = pd.Timestamp.now().normalize()
+    assert df_cotacoes['date'].min() >= hoje - pd.Timedelta(days=201)
+    assert df_dividendos['date'].min() < hoje - pd.Timedelta(days=201)
+
+
+def test_processar_chart_ordena_dividendos_e_descarta_fechamentos_nulos():
+    dia = 86400
+    inicio = int(pd.Timestamp('2024-01-01', tz='UTC').timestamp())
+    result = {
+        'meta': {'gmtoffset': -3 * 3600},
+        # Pregões às 13h UTC; o primeiro fica fora da janela de cotações e o terceiro não tem fechamento
+        'timestamp': [inicio + 13 * 3600 + i * dia for i in range(4)],
+        'indicators': {'quote': [{'close': [9.0, 10.0, None, 10.456]}]},
+        'events': {'dividends': {
+            '3': {'date': inicio + 3 * dia + 13 * 3600, 'amount': 0.3},
+            '1': {'date': inicio + 1 * dia + 13 * 3600, 'amount': 0.1},
+            '0': {'date': inicio - 30 * dia, 'amount': 0.5},
+        }},
+    }
+
+    df_cot, df_div = dados_online._processar_chart(result, 'AAAA11.SA', inicio + dia, inicio)
+
+    assert df_cot['date'].tolist() == list(pd.to_datetime(['2024-01-02', '2024-01-04']))
+    np.testing.assert_allclose(df_cot['valor_cotação'], [10.0, 10.46], rtol=1e-6)
+    assert df_div['date'].tolist() == list(pd.to_datetime(['2024-01-02', '2024-01-04']))
+    np.testing.assert_allclose(df_div['dividendo'], [0.1, 0.3], rtol=1e-6)
+    validar(df_cot, 'cotacoes')
+    validar(df_div, 'dividendos')
+
+
+def test_limitador_respeita_a_taxa_e_as_requisicoes_simultaneas():
+    limitador = dados_online.LimitadorTaxa(requisicoes_por_segundo=20, max_simultaneas=2)
+    em_andamento, maximo = [0], [0]
+    lock = threading.Lock()
+
+    def requisicao():
+        with limitador:
+            with lock:
+                em_andamento[0] += 1
+                maximo[0] = max(maximo[0], em_andamento[0])
+            time.sleep(0.02)
+            with lock:
+                em_andamento[0] -= 1
+
+    inicio = time.monotonic()
+    threads = [threading.Thread(target=requisicao) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Rajada de 1: a primeira passa direto, as outras 5 esperam 1/20 s cada
+    assert time.monotonic() - inicio >= 5 / 20 * 0.9
+    assert maximo[0] <= 2
+
+
+def test_chamadas_simultaneas_dividem_o_mesmo_limitador(servidor):
+    assert dados_online.obter_limitador(servidor.url, 10, 2) is dados_online.obter_limitador(servidor.url, 10, 2)
+    assert dados_online.obter_limitador(servidor.url, 10, 2) is not dados_online.obter_limitador(servidor.url, 5, 2)
+
+    params = {'interval': '1d'}
+    resultados = []
+
+    def buscar():
+        resultados.append(dados_online.baixar_charts_em_paralelo(servidor.tickers, params,
+                                                                 requisicoes_por_segundo=10))
+
+    inicio = time.monotonic()
+    threads = [threading.Thread(target=buscar) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 8 requisições a 10/s numa cota única levam ~0,7 s; com uma cota por chamada, ~0,3 s
+    assert time.monotonic() - inicio >= 7 / 10 * 0.9
+    assert [sorted(r) for r in resultados] == [sorted(servidor.tickers)] * 2
+
+
+def test_iterar_charts_entrega_todos_os_tickers_inclusive_as_falhas(servidor):
+    tickers = servidor.tickers + ['XXXX3.SA']
+    registros = {ticker: (result, registro) for ticker, result, registro in
+                 dados_online.iterar_charts(tickers, {'interval': '1d'}, requisicoes_por_segundo=0)}
+
+    assert set(registros) == set(tickers)
+    assert all(registros[t][0] is not None and registros[t][1]['status'] == 'ok' for t in servidor.tickers)
+    assert registros['XXXX3.SA'][0] is None
+    assert registros['XXXX3.SA'][1]['status'] == 'falha'
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.esquema import de_arrays, datas_de_epoch, normalizar, validar, vazio
+
+
+def _datas(*dias):
+    return np.array(dias, dtype='datetime64[D]').astype('datetime64[ns]')
+
+
+def test_normalizar_ordena_descarta_duplicatas_e_converte_os_tipos():
+    df = normalizar(pd.DataFrame({
+        'date': ['03/01/2024', '02/01/2024', '03/01/2024', '02/01/2024'],
+        'ticker': ['BBBB11.SA', 'AAAA11.SA', 'BBBB11.SA', 'BBBB11.SA'],
+        'valor_cotação': [20.0, 10.0, 21.0, None],
+    }), 'cotacoes')
+
+    assert df['ticker'].astype(str).tolist() == ['AAAA11.SA', 'BBBB11.SA']
+    assert df['date'].tolist() == [pd.Timestamp('2024-01-02'), pd.Timestamp('2024-01-03')]
+    # Na data repetida vale a última linha; a linha sem valor é descartada
+    assert df['valor_cotação'].tolist() == [10.0, 21.0]
+    assert df['valor_cotação'].dtype == np.float32
+    assert validar(vazio('cotacoes'), 'cotacoes').empty
+
+
+def test_validar_rejeita_colunas_e_tipos_fora_do_esquema():
+    df = normalizar(pd.DataFrame({'date': _datas('2024-01-02'), 'ticker': ['AAAA11.SA'],
+                                  'dividendo': [1.0]}), 'dividendos')
+    with pytest.raises(ValueError, match='Colunas'):
+        validar(df, 'cotacoes')
+    with pytest.raises(ValueError, match="'dividendo'"):
+        validar(df.astype({'dividendo': 'float64'}), 'dividendos')
+
+
+@pytest.mark.parametrize('dias', [('2024-01-03', '2024-01-02'), ('2024-01-02', '2024-01-02')])
+def test_validar_rejeita_datas_que_nao_sao_crescentes(dias):
+    df = pd.DataFrame({
+        'date': _datas(*dias),
+        'ticker': pd.Categorical(['AAAA11.SA', 'AAAA11.SA']),
+        'valor_cotação': np.array([10.0, 11.0], dtype='float32'),
+    })
+    with pytest.raises(ValueError, match='fora de ordem ou repetidas para AAAA11.SA'):
+        validar(df, 'cotacoes')
+
+    # A mesma data em tickers diferentes é válida
+    df['ticker'] = pd.Categorical(['AAAA11.SA', 'BBBB11.SA'])
+    assert validar(df, 'cotacoes') is df
+
+
+def test_de_arrays_reordena_datas_que_nao_sao_crescentes():
+    df = de_arrays(_datas('2024-01-04', '2024-01-02', '2024-01-04', '2024-01-03'), 'AAAA11.SA',
+                   [1.0, 2.0, 3.0, np.nan], 'dividendos')
+
+    # Fora de ordem: passa por normalizar (ordena e fica com o último valor da data repetida)
+    assert df['date'].tolist() == list(pd.to_datetime(['2024-01-02', '2024-01-04']))
+    assert df['dividendo'].tolist() == [2.0, 3.0]
+    assert validar(df, 'dividendos') is df
+
+
+def test_de_arrays_com_datas_crescentes_monta_o_dataframe_canonico():
+    df = de_arrays(_datas('2024-01-02', '2024-01-03'), 'AAAA11.SA', [10.0, 11.0], 'cotacoes')
+    assert df['ticker'].cat.categories.tolist() == ['AAAA11.SA']
+    assert df['valor_cotação'].tolist() == [10.0, 11.0]
+    assert de_arrays(_datas(), 'AAAA11.SA', [], 'cotacoes').empty
+
+
+def test_datas_de_epoch_usa_o_dia_do_pregao():
+    # 2024-01-02 01:30 UTC é 2024-01-01 22:30 em São Paulo (UTC-3)
+    timestamps = [int(pd.Timestamp('2024-01-02 01:30', tz='UTC').timestamp())]
+    assert datas_de_epoch(timestamps).tolist() == [pd.Timestamp('2024-01-02').value]
+    assert datas_de_epoch(timestamps, -3 * 3600).tolist() == [pd.Timestamp('2024-01-01').value]
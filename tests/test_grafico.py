@@ -0,0 +1,38 @@
+from benchmarks.dados_sinteticos import gerar_historico, gerar_barras
+from src import cache_figuras, intradiario
+from src.indice_series import indexar
+from src.primeira_tela import MAX_PONTOS_GRAFICO
+
+
+def _historico():
+    df_cotacoes, _ = gerar_historico(1, anos=2)
+    return indexar(df_cotacoes, 'valor_cotação')
+
+
+def test_serie_longa_da_interface_usa_webgl():
+    indice = _historico()
+    ticker = indice.tickers[0]
+    # Mesmos parâmetros da interface: 520 dias no slider e o orçamento de pontos da primeira tela
+    dias = min(520, len(indice.serie(ticker)[0]) - 1)
+    figura = cache_figuras.grafico_cotacao(ticker, dias, {ticker: 50.0}, indice, max_pontos=MAX_PONTOS_GRAFICO)
+
+    linha = figura.data[0]
+    assert linha.type == 'scattergl'
+    assert len(linha.x) <= MAX_PONTOS_GRAFICO
+
+
+def test_serie_curta_continua_em_svg():
+    indice = _historico()
+    ticker = indice.tickers[0]
+    figura = cache_figuras.grafico_cotacao(ticker, 60, {}, indice, max_pontos=MAX_PONTOS_GRAFICO)
+    assert figura.data[0].type == 'scatter'
+
+
+def test_linha_de_barras_intradiarias_usa_webgl():
+    indice = _historico()
+    ticker = indice.tickers[0]
+    datas, fechamentos = indice.ultimos(ticker, 30)
+    barras = intradiario.BarrasOHLCV(**gerar_barras(datas.astype('datetime64[s]').astype('int64'), fechamentos, 300),
+                                     segundos=300)
+    figura = cache_figuras.grafico_cotacao(ticker, 30, {}, indice, max_pontos=MAX_PONTOS_GRAFICO, barras=barras)
+    assert figura.data[0].type == 'scattergl'
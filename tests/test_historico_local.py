@@ -0,0 +1,18 @@
+from src.historico_local import conectar
+
+
+def test_leitura_nao_e_bloqueada_por_gravacao_em_andamento(pasta_projeto):
+    escrita = conectar()
+    assert escrita.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert escrita.execute('PRAGMA busy_timeout').fetchone()[0] > 0
+
+    escrita.execute('BEGIN IMMEDIATE')
+    escrita.execute("INSERT INTO cotacoes VALUES ('AAAA3', '2024-01-02', 10.0)")
+
+    leitura = conectar()
+    assert leitura.execute('SELECT COUNT(*) FROM cotacoes').fetchone()[0] == 0
+
+    escrita.commit()
+    assert leitura.execute('SELECT COUNT(*) FROM cotacoes').fetchone()[0] == 1
+    leitura.close()
+    escrita.close()
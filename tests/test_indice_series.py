@@ -0,0 +1,117 @@
+import gc
+
+import numpy as np
+import pandas as pd
+
+from src import indice_series
+from src.esquema import normalizar
+from src.indice_series import SeriesPorTicker, indexar
+
+
+def _cotacoes():
+    return normalizar(pd.DataFrame([
+        (pd.Timestamp('2024-01-02'), 'AAAA11.SA', 10.0),
+        (pd.Timestamp('2024-01-03'), 'AAAA11.SA', 11.0),
+        (pd.Timestamp('2024-01-04'), 'AAAA11.SA', 12.0),
+        (pd.Timestamp('2024-01-03'), 'BBBB11.SA', 20.0),
+        (pd.Timestamp('2024-01-05'), 'BBBB11.SA', 21.0),
+    ], columns=['date', 'ticker', 'valor_cotação']), 'cotacoes')
+
+
+def test_desde_e_ultimos_respeitam_os_limites_do_intervalo():
+    indice = SeriesPorTicker(_cotacoes(), 'valor_cotação')
+
+    # Data exatamente igual a um registro entra no recorte
+    datas, valores = indice.desde('AAAA11.SA', '2024-01-03')
+    assert valores.tolist() == [11.0, 12.0]
+    assert datas[0] == np.datetime64(pd.Timestamp('2024-01-03'), 'ns')
+    # Antes do primeiro e depois do último registro
+    assert indice.desde('AAAA11.SA', '2023-12-31')[1].tolist() == [10.0, 11.0, 12.0]
+    assert indice.desde('AAAA11.SA', '2024-01-05')[1].tolist() == []
+    # O recorte de um ticker não avança sobre o seguinte
+    assert indice.desde('AAAA11.SA', '2024-01-04')[1].tolist() == [12.0]
+    assert indice.desde('BBBB11.SA', '2024-01-01')[1].tolist() == [20.0, 21.0]
+
+    assert indice.ultimos('AAAA11.SA', 2)[1].tolist() == [11.0, 12.0]
+    assert indice.ultimos('AAAA11.SA', 10)[1].tolist() == [10.0, 11.0, 12.0]
+    assert indice.ultimos('BBBB11.SA', 0)[1].tolist() == []
+
+    somas, contagens = indice.somas_desde(['AAAA11.SA', 'BBBB11.SA'], '2024-01-03')
+    assert somas.tolist() == [23.0, 41.0]
+    assert contagens.tolist() == [2, 2]
+
+
+def test_ticker_sem_registros_devolve_recortes_vazios():
+    indice = SeriesPorTicker(_cotacoes(), 'valor_cotação')
+
+    assert 'CCCC11.SA' not in indice
+    for datas, valores in (indice.serie('CCCC11.SA'), indice.ultimos('CCCC11.SA', 5),
+                           indice.desde('CCCC11.SA', '2024-01-01')):
+        assert len(datas) == 0 and len(valores) == 0
+
+    ultimos = indice.ultimos_valores(['AAAA11.SA', 'CCCC11.SA', 'BBBB11.SA'])
+    assert ultimos[0] == 12.0 and np.isnan(ultimos[1]) and ultimos[2] == 21.0
+
+    somas, contagens = indice.somas_desde(['CCCC11.SA'], '2024-01-01')
+    assert somas.tolist() == [0.0] and contagens.tolist() == [0]
+
+    datas, matriz = indice.larga(['AAAA11.SA', 'CCCC11.SA'])
+    assert len(datas) == 3
+    assert np.isnan(matriz[:, 1]).all()
+
+
+def test_larga_soma_registros_do_mesmo_dia():
+    # normalizar descarta duplicatas; aqui o DataFrame chega com dois pagamentos no mesmo dia
+    df_dividendos = pd.DataFrame([
+        (pd.Timestamp('2024-01-10'), 'AAAA11.SA', 0.50),
+        (pd.Timestamp('2024-01-10'), 'AAAA11.SA', 0.25),
+        (pd.Timestamp('2024-02-10'), 'AAAA11.SA', 0.40),
+        (pd.Timestamp('2024-02-10'), 'BBBB11.SA', 0.10),
+    ], columns=['date', 'ticker', 'dividendo']).astype({'ticker': 'category'})
+    indice = SeriesPorTicker(df_dividendos, 'dividendo')
+
+    datas, matriz = indice.larga(['AAAA11.SA', 'BBBB11.SA'], somar=True)
+    assert datas.tolist() == pd.to_datetime(['2024-01-10', '2024-02-10']).as_unit('ns').to_numpy().tolist()
+    np.testing.assert_allclose(matriz, [[0.75, np.nan], [0.40, 0.10]])
+
+    # Sem somar, vale o último registro do dia
+    _, matriz = indice.larga(['AAAA11.SA', 'BBBB11.SA'])
+    np.testing.assert_allclose(matriz, [[0.25, np.nan], [0.40, 0.10]])
+
+
+def test_indexar_reaproveita_o_indice_do_mesmo_dataframe():
+    df = _cotacoes()
+    indice = indexar(df, 'valor_cotação')
+
+    assert indexar(df, 'valor_cotação') is indice
+    assert indexar(indice, 'valor_cotação') is indice
+
+
+def test_indexar_descarta_o_indice_de_dataframe_coletado():
+    df = _cotacoes()
+    chave = (id(df), 'valor_cotação')
+    indexar(df, 'valor_cotação')
+    assert chave in indice_series._indices
+
+    del df
+    gc.collect()
+    assert chave not in indice_series._indices
+
+
+def test_indexar_nao_reaproveita_indice_de_outro_dataframe_com_o_mesmo_id():
+    antigo = _cotacoes()
+    indice_antigo = SeriesPorTicker(antigo, 'valor_cotação')
+    novo = _cotacoes()
+    novo['valor_cotação'] = novo['valor_cotação'] * 2
+    # Registro deixado por um DataFrame cujo id foi reutilizado pelo novo
+    chave = (id(novo), 'valor_cotação')
+    indice_series._indices[chave] = (lambda: antigo, indice_antigo)
+    try:
+        indice = indexar(novo, 'valor_cotação')
+        assert indice is not indice_antigo
+        assert indice.ultimos_valores(['AAAA11.SA']).tolist() == [24.0]
+        assert indexar(novo, 'valor_cotação') is indice
+    finally:
+        del novo
+        gc.collect()
+    assert chave not in indice_series._indices
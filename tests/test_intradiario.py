@@ -0,0 +1,72 @@
+import json
+import os
+import time
+import numpy as np
+from src import intradiario
+
+
+def _envelhecer(ticker, intervalo):
+    # Simula a última atualização feita antes de ATUALIZACAO_MINUTOS
+    caminho = os.path.join(intradiario.PASTA_INTRADIARIO, intervalo, ticker, 'meta.json')
+    with open(caminho, encoding='utf-8') as arquivo:
+        meta = json.load(arquivo)
+    meta['atualizado_em'] -= intradiario.ATUALIZACAO_MINUTOS * 60 + 1
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(meta, arquivo)
+
+
+def test_historico_completo_busca_so_os_ultimos_dias(servidor):
+    ticker = servidor.tickers[0]
+    dias = intradiario.pregoes_disponiveis('5m')
+    intradiario.atualizar_barras([ticker], '5m', dias, requisicoes_por_segundo=0)
+    _envelhecer(ticker, '5m')
+
+    # Fins de semana não têm bloco, mas o período já foi coberto: só o trecho final é pedido
+    assert intradiario._dias_a_buscar(ticker, '5m', dias, intradiario.PASTA_INTRADIARIO) <= 5
+
+
+def test_periodo_maior_que_o_coberto_busca_tudo(servidor):
+    ticker = servidor.tickers[0]
+    intradiario.atualizar_barras([ticker], '60m', 20, requisicoes_por_segundo=0)
+    _envelhecer(ticker, '60m')
+
+    assert intradiario._dias_a_buscar(ticker, '60m', 200, intradiario.PASTA_INTRADIARIO) == 285
+
+
+def test_carregar_barras_guardadas_atualiza_em_segundo_plano(servidor):
+    ticker = servidor.tickers[0]
+    assert intradiario.carregar_barras(ticker, '15m', 10) is not None
+    _envelhecer(ticker, '15m')
+    atualizado_em = intradiario._ler_meta(os.path.join(intradiario.PASTA_INTRADIARIO, '15m', ticker))['atualizado_em']
+    servidor.latencia_ms = 500
+
+    inicio = time.perf_counter()
+    barras = intradiario.carregar_barras(ticker, '15m', 10)
+    assert time.perf_counter() - inicio < 0.4
+    assert barras is not None and len(barras)
+
+    # A busca em segundo plano regrava o meta.json ao terminar
+    limite = time.time() + 5
+    while time.time() < limite:
+        meta = intradiario._ler_meta(os.path.join(intradiario.PASTA_INTRADIARIO, '15m', ticker))
+        if meta['atualizado_em'] > atualizado_em:
+            break
+        time.sleep(0.05)
+    assert meta['atualizado_em'] > atualizado_em
+
+
+def test_ultimos_dias_recorta_pelo_dia_local_da_bolsa():
+    # Pregões com lacunas e barras de 60m a partir de 0h30 UTC: em Brasília (UTC-3) cada
+    # grupo começa às 21h30 de um dia e termina no seguinte
+    dias_utc = np.array([0, 1, 4, 5, 6, 7, 8, 11], dtype='int64')
+    tempo = (dias_utc[:, None] * 86400 + 1800 + np.arange(8) * 3600).ravel()
+    valores = np.arange(len(tempo), dtype='float32')
+    barras = intradiario.BarrasOHLCV(tempo, valores, valores, valores, valores, valores,
+                                     deslocamento=-3 * 3600, segundos=3600)
+    dias_locais = np.unique(barras.dias)
+
+    for quantidade in range(1, len(dias_locais)):
+        recorte = barras.ultimos_dias(quantidade)
+        assert np.array_equal(recorte.tempo, tempo[np.isin(barras.dias, dias_locais[-quantidade:])])
+    assert barras.ultimos_dias(len(dias_locais)) is barras
+    assert barras.ultimos_dias(len(dias_locais) + 1) is barras
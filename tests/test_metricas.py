@@ -0,0 +1,14 @@
+from src import metricas
+
+
+def test_total_do_processo_guarda_latencias_por_faixa():
+    coleta = metricas.Coleta('processo', latencias_brutas=False)
+    for milissegundos in (10, 40, 40, 6000):
+        coleta.registrar_latencia('AAAA3.SA', milissegundos / 1000)
+
+    assert coleta.latencias['AAAA3.SA'][0] == [1, 2, 0, 0, 0, 0, 0, 0, 1]
+    por_ticker = coleta.resumo()['latencia_http']['por_ticker']['AAAA3.SA']
+    assert por_ticker['requisicoes'] == 4
+    assert por_ticker['media_ms'] == 1522.5
+    assert por_ticker['max_ms'] == 6000.0
+    assert coleta.histograma() == por_ticker['histograma']
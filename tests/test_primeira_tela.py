@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+from benchmarks.dados_sinteticos import gerar_historico
+from src import primeira_tela
+
+
+def _gravar(caminho):
+    df_cotacoes, df_dividendos = gerar_historico(3, anos=1)
+    ativos = list(df_cotacoes['ticker'].cat.categories)
+    precos_medios = {ticker: 50.0 for ticker in ativos}
+    previa = primeira_tela.gravar(df_cotacoes, df_dividendos, {}, ativos, precos_medios, caminho)
+    return previa, ativos, precos_medios
+
+
+def test_previa_gravada_e_lida_para_a_mesma_carteira(tmp_path):
+    caminho = str(tmp_path / 'data' / 'primeira_tela.json.gz')
+    previa, ativos, precos_medios = _gravar(caminho)
+
+    lida = primeira_tela.ler(ativos, precos_medios, caminho)
+    assert lida == previa
+    tabela = primeira_tela.tabela(lida)
+    assert list(tabela) == previa['tabela']['colunas']
+    assert tabela['Ativo'] == ativos
+
+    cotacao, dividendos = primeira_tela.figuras(lida, ativos[0], primeira_tela.DIAS_GRAFICO_PADRAO,
+                                                primeira_tela.MESES_GRAFICO_PADRAO)
+    assert cotacao['data'] and dividendos['data']
+    assert len(cotacao['data'][0]['x']) <= primeira_tela.MAX_PONTOS_GRAFICO
+    # Fora dos valores padrão dos controles a prévia não tem as figuras
+    assert primeira_tela.figuras(lida, ativos[1], primeira_tela.DIAS_GRAFICO_PADRAO,
+                                 primeira_tela.MESES_GRAFICO_PADRAO) == (None, None)
+    assert primeira_tela.figuras(lida, ativos[0], 30, primeira_tela.MESES_GRAFICO_PADRAO) == (None, None)
+
+
+def test_previa_de_outra_carteira_ou_corrompida_e_ignorada(tmp_path):
+    caminho = str(tmp_path / 'primeira_tela.json.gz')
+    assert primeira_tela.ler(['AAAA11.SA'], {}, caminho) is None
+
+    _, ativos, precos_medios = _gravar(caminho)
+    assert primeira_tela.ler(list(reversed(ativos)), precos_medios, caminho) is None
+    assert primeira_tela.ler(ativos, {**precos_medios, ativos[0]: 51.0}, caminho) is None
+
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(b'corrompido')
+    assert primeira_tela.ler(ativos, precos_medios, caminho) is None
+    assert os.listdir(tmp_path) == ['primeira_tela.json.gz']
+
+
+def test_leitura_da_previa_nao_importa_as_bibliotecas_pesadas():
+    codigo = ('import sys, src.primeira_tela; '
+              'print(sorted(m for m in ("pandas", "plotly", "requests") if m in sys.modules))')
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    saida = subprocess.run([sys.executable, '-c', codigo], cwd=raiz, capture_output=True, text=True, check=True)
+    assert saida.stdout.strip() == '[]'
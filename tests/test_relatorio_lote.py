@@ -0,0 +1,53 @@
+import json
+
+import pandas as pd
+import pytest
+
+from src import dados_online, metricas
+from src.historico_local import ATUALIZADO, INDISPONIVEL
+from src.relatorio_lote import executar_relatorio
+
+
+def _abrir_disjuntor(servidor, aberto_segundos):
+    disjuntor = dados_online.obter_disjuntor(servidor.url)
+    disjuntor.aberto_segundos = aberto_segundos
+    for _ in range(disjuntor.falhas_para_abrir):
+        disjuntor.registrar_falha()
+    return disjuntor
+
+
+def _executar(servidor, pasta):
+    return executar_relatorio(servidor.tickers, str(pasta), formato='nenhum', processos=1, tamanho_lote=2,
+                              requisicoes_por_segundo=0)
+
+
+def test_tickers_recusados_pelo_disjuntor_sao_buscados_de_novo(servidor, pasta_projeto):
+    _abrir_disjuntor(servidor, 0.3)
+    resumo = _executar(servidor, pasta_projeto / 'relatorio')
+
+    relatorio = pd.read_csv(resumo['relatorio'])
+    assert sorted(relatorio['Ativo']) == sorted(servidor.tickers)
+    assert (relatorio['Dados'] == ATUALIZADO).all()
+    assert resumo['recusados_pelo_disjuntor'] == 0
+
+
+def test_tickers_ainda_recusados_entram_no_resumo(servidor, pasta_projeto):
+    # Reaberto por mais tempo que a espera da primeira retentativa: cada sondagem volta recusada
+    _abrir_disjuntor(servidor, dados_online.ESPERA_BASE_SEGUNDOS + 0.1)
+    servidor.taxa_erro = 1.0
+    resumo = _executar(servidor, pasta_projeto / 'relatorio')
+
+    relatorio = pd.read_csv(resumo['relatorio'])
+    assert sorted(relatorio['Ativo']) == sorted(servidor.tickers)
+    assert (relatorio['Dados'] == INDISPONIVEL).all()
+    assert resumo['recusados_pelo_disjuntor'] == len(servidor.tickers)
+
+
+def test_relatorio_interrompido_encerra_a_coleta_de_metricas(pasta_projeto):
+    with pytest.raises(RuntimeError, match="Nenhum ticker processado"):
+        executar_relatorio([], str(pasta_projeto / 'relatorio'), formato='nenhum', processos=1)
+
+    assert metricas.coleta_atual() is None
+    with open(metricas.CAMINHO_LOG, encoding='utf-8') as f:
+        linhas = [json.loads(linha) for linha in f if linha.strip()]
+    assert linhas[-1]['coleta'] == 'relatorio_lote'
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.dados_sinteticos import gerar_historico
+from src import simulacao
+from src.esquema import normalizar
+from src.indice_series import indexar
+
+
+@pytest.fixture
+def historico():
+    df_cotacoes, df_dividendos = gerar_historico(3, anos=3)
+    return indexar(df_cotacoes, 'valor_cotação'), indexar(df_dividendos, 'dividendo')
+
+
+def test_posicao_inicial_comprada_ao_preco_do_inicio(historico):
+    indice_cotacoes, indice_dividendos = historico
+    tickers = list(indice_cotacoes.tickers)
+    resultado = simulacao.simular_carteira(indice_cotacoes, indice_dividendos, tickers, anos=1, valor_por_ativo=1000.0)
+
+    precos_no_inicio = resultado.mercado.precos[0]
+    assert np.allclose(simulacao.posicoes_iniciais(resultado.mercado, 1000.0) * precos_no_inicio, 1000.0)
+    # No primeiro dia, sem aporte, o patrimônio é exatamente o valor investido
+    assert resultado.curvas['investido'].iloc[0, 0] == pytest.approx(1000.0 * len(tickers))
+    assert resultado.resultado['valor'][0, 0] == pytest.approx(1000.0 * len(tickers))
+
+
+def test_simulacao_em_cache_pelos_dados_e_parametros(historico):
+    indice_cotacoes, indice_dividendos = historico
+    tickers = list(indice_cotacoes.tickers)
+    simulacao._cache.limpar()
+
+    primeira = simulacao.simular_carteira(indice_cotacoes, indice_dividendos, tickers, 2, aportes_mensais=(0.0, 500.0))
+    repetida = simulacao.simular_carteira(indice_cotacoes, indice_dividendos, tickers, 2, aportes_mensais=[0.0, 500.0])
+    outro_aporte = simulacao.simular_carteira(indice_cotacoes, indice_dividendos, tickers, 2, aportes_mensais=(0.0, 300.0))
+
+    assert repetida is primeira
+    assert outro_aporte is not primeira
+    assert simulacao._cache.estatisticas()['acertos'] == 1
+
+
+def test_grade_dividida_em_lotes_no_pool_de_processos(historico, monkeypatch):
+    indice_cotacoes, indice_dividendos = historico
+    tickers = list(indice_cotacoes.tickers)
+    parametros = dict(reinvestir=(0.0, 0.5, 1.0), aportes_mensais=(0.0, 500.0))
+    simulacao._cache.limpar()
+    sequencial = simulacao.simular_carteira(indice_cotacoes, indice_dividendos, tickers, 1, **parametros)
+
+    # Um cenário por lote: os 6 cenários vão para o pool
+    simulacao._cache.limpar()
+    monkeypatch.setattr(simulacao, 'CELULAS_POR_LOTE', 1)
+    paralela = simulacao.simular_carteira(indice_cotacoes, indice_dividendos, tickers, 1, processos=2, **parametros)
+
+    for chave in ('valor', 'renda', 'caixa', 'investido', 'cotas_finais'):
+        assert np.allclose(paralela.resultado[chave], sequencial.resultado[chave])
+    # O número de processos não muda o resultado nem a chave do cache
+    assert simulacao.simular_carteira(indice_cotacoes, indice_dividendos, tickers, 1, **parametros) is paralela
+
+
+def test_meses_de_historico_limitam_o_periodo_simulado(historico):
+    indice_cotacoes, indice_dividendos = historico
+    tickers = list(indice_cotacoes.tickers)
+    meses = simulacao.meses_de_historico(indice_cotacoes, tickers)
+    assert 34 <= meses <= 36
+    assert simulacao.meses_de_historico(indice_cotacoes, ['XXXX3.SA']) == 0
+
+    # Todo o histórico disponível cabe no período: a simulação começa no primeiro pregão carregado
+    resultado = simulacao.simular_carteira(indice_cotacoes, indice_dividendos, tickers, meses / 12)
+    primeiro_pregao = min(indice_cotacoes.serie(ticker)[0][0] for ticker in tickers)
+    assert (resultado.mercado.datas[0] - primeiro_pregao) / np.timedelta64(1, 'D') < 31
+
+
+def test_periodo_historico_comeca_quando_os_dividendos_estao_completos():
+    df_cotacoes, df_dividendos = gerar_historico(3, anos=3)
+    tickers = list(df_cotacoes['ticker'].cat.categories)
+    # Dividendos carregados só nos últimos 12 meses das cotações
+    inicio_dividendos = (df_cotacoes['date'].max() - pd.DateOffset(months=12)).date()
+    recentes = normalizar(df_dividendos[df_dividendos['date'] >= pd.Timestamp(inicio_dividendos)], 'dividendos')
+
+    meses = simulacao.meses_de_historico(df_cotacoes, tickers, inicio_dividendos)
+    assert meses <= 12 < simulacao.meses_de_historico(df_cotacoes, tickers)
+
+    # No período limitado, os dividendos creditados são os mesmos do histórico completo
+    limitado = simulacao.mercado_historico(df_cotacoes, recentes, tickers, anos=meses / 12)
+    completo = simulacao.mercado_historico(df_cotacoes, df_dividendos, tickers, anos=meses / 12)
+    assert pd.Timestamp(limitado.datas[0]) >= pd.Timestamp(inicio_dividendos)
+    assert limitado.dividendos.sum() > 0
+    assert np.allclose(limitado.dividendos, completo.dividendos)
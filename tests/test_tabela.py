@@ -0,0 +1,54 @@
+import pandas as pd
+
+from src.esquema import normalizar
+from src.historico_local import ATUALIZADO, LOCAL
+from src.tabela import calcular_dividendos_yields, formatar_tabela_dividendos
+
+
+def _meses_atras(meses):
+    return pd.Timestamp.now().normalize() - pd.DateOffset(months=meses)
+
+
+def _fixture():
+    hoje = pd.Timestamp.now().normalize()
+    df_cotacoes = normalizar(pd.DataFrame([
+        (hoje - pd.Timedelta(days=10), 'AAAA11.SA', 100.0),
+        (hoje - pd.Timedelta(days=3), 'AAAA11.SA', 102.5),
+        (hoje - pd.Timedelta(days=3), 'BBBB11.SA', 10.0),
+        (hoje - pd.Timedelta(days=3), 'CCCC11.SA', 50.0),
+    ], columns=['date', 'ticker', 'valor_cotação']), 'cotacoes')
+    df_dividendos = normalizar(pd.DataFrame([
+        (_meses_atras(14), 'AAAA11.SA', 0.80),   # fora dos 12 meses
+        (_meses_atras(9), 'AAAA11.SA', 1.00),
+        (_meses_atras(5), 'AAAA11.SA', 1.10),
+        (_meses_atras(1), 'AAAA11.SA', 1.30),
+        (_meses_atras(14), 'BBBB11.SA', 0.10),   # só pagamentos antigos
+        (_meses_atras(2), 'DDDD11.SA', 0.50),    # sem cotação
+    ], columns=['date', 'ticker', 'dividendo']), 'dividendos')
+    precos_medios = {'AAAA11.SA': 95.0, 'BBBB11.SA': 9.5, 'CCCC11.SA': 45.0, 'DDDD11.SA': 20.0}
+    return precos_medios, df_dividendos, df_cotacoes
+
+
+def test_tabela_formatada_mantem_os_valores_da_versao_anterior():
+    ativos = ['AAAA11.SA', 'BBBB11.SA', 'CCCC11.SA', 'DDDD11.SA']
+    tabela = formatar_tabela_dividendos(calcular_dividendos_yields(ativos, *_fixture()), avisos=False)
+
+    assert tabela.values.tolist() == [
+        ['AAAA11.SA', 'R$ 95.00', 'R$ 102.50', 'R$ 3.40', 'R$ 1.30  (▲)', 'R$ 1.13', '3.32%', '3.58%'],
+        ['BBBB11.SA', 'R$ 9.50', 'R$ 10.00', 'R$ 0.00', 'R$ 0.10  ()', 'R$ 0.00', '0.00%', '0.00%'],
+        # Sem dividendos a cotação continua aparecendo (antes saía "-")
+        ['CCCC11.SA', 'R$ 45.00', 'R$ 50.00', '-', '-', '-', '-', '-'],
+        ['DDDD11.SA', 'R$ 20.00', '-', 'R$ 0.50', 'R$ 0.50  (-)', 'R$ 0.50', '-', '2.50%'],
+    ]
+
+
+def test_tabela_numerica_e_coluna_de_situacao():
+    indicadores = calcular_dividendos_yields(['AAAA11.SA', 'BBBB11.SA', 'XXXX11.SA'], *_fixture(),
+                                             situacao={'AAAA11.SA': ATUALIZADO, 'BBBB11.SA': LOCAL})
+
+    linha = indicadores.set_index('Ativo').loc['AAAA11.SA']
+    assert linha['Dividendo 12 Mês'] == 3.40
+    assert linha['% Yield Atual (DY)'] == 3.32
+    assert indicadores.set_index('Ativo').loc['XXXX11.SA'].drop('Dados').isna().all()
+    assert formatar_tabela_dividendos(indicadores, avisos=False)['Dados'].tolist() == [
+        "🟢 Atualizado", "🟡 Histórico local", "🔴 Indisponível"]